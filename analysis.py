@@ -0,0 +1,199 @@
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from chess_core import ChessSet, move_name
+from engine import MATE_SCORE, Engine
+from fen import decode_position, encode_position, load_fen
+
+# Centipawns lost against the best move before a move is flagged, worst first
+JUDGEMENTS = [(300, "blunder"), (100, "mistake"), (50, "inaccuracy")]
+
+worker_engine = None  # one engine per worker process, so its table is reused across positions
+
+
+def analyse_position(data, count, depth):
+    # Worker entry point: the count best moves of a packed position (fen.encode_position)
+    global worker_engine
+    if worker_engine is None:
+        worker_engine = Engine(tt_size=1 << 16)
+    chess_set = decode_position(data)
+    return worker_engine.search_multipv(chess_set.board, chess_set.current_player, count, depth)
+
+
+def game_positions(chess_set):
+    # (packed position, key, color to move) before every ply of the game and after the last one.
+    # The game is taken back to its start and replayed, leaving chess_set as it was.
+    moves = []
+    while chess_set.move_history and chess_set.move_history[-1] is not None:
+        moves.append(chess_set.move_history[-1])
+        chess_set.undo_move()
+    moves.reverse()
+    positions = []
+    for move in moves + [None]:
+        positions.append((encode_position(chess_set), chess_set.board.zobrist_key, chess_set.current_player))
+        if move is not None:
+            start_pos, end_pos, promotion = move
+            chess_set.board.execute_move(chess_set.board.get_piece_at(start_pos), start_pos, end_pos, promotion)
+            chess_set.switch_turn()
+    return positions, moves
+
+
+class PlyAnalysis:
+    # One position of the game: candidates are [(move, score)] best first, scores in centipawns for
+    # the side to move; played is the move made from here (None after the last ply)
+    def __init__(self, ply, color, candidates, played=None):
+        self.ply = ply
+        self.color = color
+        self.candidates = candidates
+        self.played = played
+        self.played_score = None
+        self.loss = 0
+        self.judgement = None
+
+    def __str__(self):
+        best = ", ".join(f"{move_name(*move)} {score_text(score)}" for move, score in self.candidates) or "no legal moves"
+        text = f"{self.ply // 2 + 1}{'.' if self.color == 'White' else '...'} best {best}"
+        if self.played:
+            text += f"; played {move_name(*self.played)} {score_text(self.played_score)}"
+            if self.judgement:
+                text += f" ({self.judgement}, -{self.loss})"
+        return text
+
+
+def score_text(score):
+    if abs(score) >= MATE_SCORE - 1000:
+        plies = MATE_SCORE - abs(score)
+        return f"{'+' if score > 0 else '-'}M{(plies + 1) // 2}"
+    return f"{score / 100:+.2f}"
+
+
+def judge(plies, final_status):
+    # The played move is scored from the candidates if it is one of them, otherwise as the
+    # opponent's best reply from the next position, turned round. final_status is the
+    # ChessSet.game_status of the last position.
+    for index, ply in enumerate(plies[:-1]):
+        scores = dict(ply.candidates)
+        if ply.played in scores:
+            ply.played_score = scores[ply.played]
+        else:
+            following = plies[index + 1]
+            if following.candidates:
+                ply.played_score = -following.candidates[0][1]
+            else:
+                # The game ended with this move: mate scores a win, anything else a draw
+                ply.played_score = MATE_SCORE - 1 if final_status == "checkmate" else 0
+        if ply.candidates:
+            ply.loss = max(0, ply.candidates[0][1] - ply.played_score)
+            ply.judgement = next((name for threshold, name in JUDGEMENTS if ply.loss >= threshold), None)
+
+
+class Analyser:
+    # Scores every position of a game on a process pool. Results are kept by position key, so a
+    # game analysed again, or another game through the same positions, only searches what is new.
+    # With a position_cache.PositionCache they are also kept on disk for later sessions.
+
+    def __init__(self, count=3, depth=2, workers=None, position_cache=None):
+        self.count = count
+        self.depth = depth
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = {}  # (zobrist key, count, depth) -> [(move, score)]
+        self.position_cache = position_cache
+        self.hits = 0
+        self.misses = 0
+        self.pool = None
+
+    def analyse(self, chess_set):
+        # [PlyAnalysis] for every position of the game in chess_set, first position first
+        positions, moves = game_positions(chess_set)
+        return self.analyse_positions(positions, moves, chess_set.game_status(chess_set.current_player))
+
+    def analyse_positions(self, positions, moves, final_status):
+        # The same from game_positions output; does not touch any ChessSet, so it can run on a
+        # worker thread while the game stays with its owner
+        missing = {}
+        for data, key, _ in positions:
+            if key in missing:
+                continue
+            if (key, self.count, self.depth) in self.cache or self.load_cached(key) is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[key] = data
+        if missing:
+            if self.workers == 1:
+                results = [analyse_position(data, self.count, self.depth) for data in missing.values()]
+            else:
+                if self.pool is None:
+                    self.pool = ProcessPoolExecutor(self.workers)
+                results = self.pool.map(analyse_position, missing.values(), itertools.repeat(self.count),
+                                        itertools.repeat(self.depth))
+            for key, candidates in zip(missing, results):
+                self.cache[(key, self.count, self.depth)] = candidates
+                if self.position_cache is not None:
+                    self.position_cache.store_multipv(key, self.count, self.depth, candidates)
+
+        plies = []
+        for ply, (data, key, color) in enumerate(positions):
+            played = moves[ply] if ply < len(moves) else None
+            plies.append(PlyAnalysis(ply, color, self.cache[(key, self.count, self.depth)], played))
+        judge(plies, final_status)
+        return plies
+
+    def load_cached(self, key):
+        # Candidates from the disk cache, copied into the in-memory one, or None
+        if self.position_cache is None:
+            return None
+        candidates = self.position_cache.multipv(key, self.count, self.depth)
+        if candidates is not None:
+            self.cache[(key, self.count, self.depth)] = candidates
+        return candidates
+
+    def close(self):
+        if self.position_cache is not None:
+            self.position_cache.flush()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+
+def main():
+    from pgn import parse_san, read_games
+
+    parser = argparse.ArgumentParser(description="Score every position of a game and flag blunders")
+    parser.add_argument("pgn", help="PGN file holding the game")
+    parser.add_argument("--game", type=int, default=1, help="which game of the file to analyse")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--candidates", type=int, default=3, help="best moves to list per position")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--cache", help="position cache file to keep results in between runs")
+    args = parser.parse_args()
+
+    with open(args.pgn, encoding="utf-8", errors="replace") as f:
+        game = next(itertools.islice(read_games(f), args.game - 1, None))
+    chess_set = load_fen(game.headers["FEN"]) if game.headers.get("FEN") else ChessSet()
+    for san in game.san_moves():
+        chess_set.play_move(*parse_san(chess_set, chess_set.current_player, san))
+
+    position_cache = None
+    if args.cache:
+        from position_cache import PositionCache
+        position_cache = PositionCache(args.cache)
+    analyser = Analyser(args.candidates, args.depth, args.workers, position_cache)
+    for attempt in ("first", "cached"):
+        start = time.perf_counter()
+        plies = analyser.analyse(chess_set)
+        print(f"{attempt} run: {len(plies)} positions in {time.perf_counter() - start:.2f}s "
+              f"({analyser.hits} cache hits, {analyser.misses} misses so far)")
+    analyser.close()
+    if position_cache:
+        print(f"position cache hit rate {position_cache.hit_rate:.1%}")
+        position_cache.close()
+    for ply in plies:
+        print(ply)
+
+
+if __name__ == "__main__":
+    main()
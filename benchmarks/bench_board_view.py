@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board_view import piece_image_size, render_set
+from chessGUI import ChessGUI
+from chess_core import ChessSet
+from engine import Engine
+
+# Status of the numbers: the on-screen frame times below have still not been measured. The
+# machine this was written on has no display and no X server could be installed, so the
+# canvas's own redraw, drag and resize frames remain unverified. The headless part has been run:
+# rendering the 12 piece images took 109-121 ms at 56 px (64 px squares), 175-178 ms at 72 px and
+# 275-297 ms at 88 px. That now happens on PieceImages' worker thread, and while it rendered all
+# three sizes a 60 Hz loop on the calling thread woke p50 5.0-5.1 ms, p99 8.0-10.7 ms late (the
+# interpreter's 5 ms thread switch interval), against 109-297 ms when it rendered on the Tk thread.
+
+
+class PointerEvent:
+    def __init__(self, x, y, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+
+def percentiles(times):
+    ordered = sorted(times)
+    pick = lambda fraction: 1000 * ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    return f"p50 {pick(0.5):6.2f} ms  p99 {pick(0.99):6.2f} ms  max {1000 * ordered[-1]:6.2f} ms"
+
+
+def engine_game(root, gui, plies, depth):
+    # Both sides played by a shallow engine as fast as it can move; a frame is the board redraw
+    # plus Tk processing the resulting events, as the user would see it
+    engine = Engine(tt_size=1 << 14)
+    chess_set = gui.chess_set
+    frames = []
+    for _ in range(plies):
+        color = chess_set.current_player
+        if chess_set.is_game_over(color):
+            break
+        chess_set.play_move(*engine.search(chess_set.board, color, depth).best_move)
+        start = time.perf_counter()
+        for (row, col) in chess_set.board.dirty_squares:
+            gui.board_view.set_piece(row, col, chess_set.board.board[row][col])
+        chess_set.board.dirty_squares = set()
+        root.update()
+        frames.append(time.perf_counter() - start)
+    return frames
+
+
+def drag_and_resize(root, view):
+    # Drag a piece across the board, then resize the board through a range of sizes
+    drags = []
+    size = view.square_size
+    view.press(PointerEvent(4.5 * size, 1.5 * size))
+    for step in range(200):
+        start = time.perf_counter()
+        view.motion(PointerEvent(4.5 * size + step % 40, 1.5 * size + step % 90))
+        root.update()
+        drags.append(time.perf_counter() - start)
+    view.release(PointerEvent(-1, -1))
+    resizes = []
+    for width in list(range(480, 800, 8)) + list(range(800, 480, -8)):
+        start = time.perf_counter()
+        view.resize(PointerEvent(0, 0, width, width))
+        root.update()
+        resizes.append(time.perf_counter() - start)
+    return drags, resizes
+
+
+def render_costs(square_sizes=(64, 80, 100)):
+    # Headless: the pixel work behind one image size, which a resize to a new size step pays once
+    for square_size in square_sizes:
+        size = piece_image_size(square_size)
+        _, seconds = render_set(size)
+        print(f"piece images for {square_size} px squares ({size} px): {seconds * 1000:.0f} ms for 12")
+
+
+def tick_lateness(square_sizes=(64, 80, 100), frame=1 / 60):
+    # Headless: a loop on this thread wakes every frame, as the Tk event loop would, while the
+    # piece images of each size are rendered on a worker thread the way PieceImages does it.
+    # Lateness is how long past its frame a wake-up came; rendering on this thread instead
+    # would make one wake-up late by the whole render time above.
+    late = []
+    with ThreadPoolExecutor(1) as executor:
+        futures = [executor.submit(render_set, piece_image_size(size)) for size in square_sizes]
+        deadline = time.perf_counter() + frame
+        while not all(future.done() for future in futures):
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            now = time.perf_counter()
+            late.append(now - deadline)
+            deadline = now + frame
+    print(f"Tk-thread wake-ups while rendering in the background ({len(late)} frames): {percentiles(late)}")
+
+
+def main(plies=120, depth=1):
+    # The frame times need a display. A frame must stay under 16.7 ms to keep up with a 60 Hz screen.
+    render_costs()
+    tick_lateness()
+    for buttons in (False, True):
+        try:
+            root = tk.Tk()
+        except tk.TclError as error:
+            print(f"no display ({error}); frame times not measured")
+            return
+        gui = ChessGUI(root, ChessSet(), buttons=buttons)
+        root.update()
+        name = type(gui.board_view).__name__
+        frames = engine_game(root, gui, plies, depth)
+        print(f"{name:<12} engine vs engine  {len(frames):>4} frames  {percentiles(frames)}")
+        if not buttons:
+            drags, resizes = drag_and_resize(root, gui.board_view)
+            print(f"{name:<12} drag              {len(drags):>4} frames  {percentiles(drags)}")
+            print(f"{name:<12} resize            {len(resizes):>4} frames  {percentiles(resizes)}")
+            print(f"{name:<12} piece images rendered in {gui.board_view.images.render_time * 1000:.0f} ms "
+                  f"({len(gui.board_view.images.images)} images)")
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 120)
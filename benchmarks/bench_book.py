@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book import OpeningBook, write_book
+
+
+def synthetic_counts(size, rng):
+    # Random keys with one to four moves each; only the file size matters for this benchmark
+    counts = Counter()
+    while len(counts) < size:
+        key = rng.getrandbits(64)
+        for code in rng.sample(range(1 << 12), rng.randint(1, 4)):
+            counts[(key, code)] = rng.randint(1, 100)
+    return counts, [key for key, _ in counts]
+
+
+def main(probes=2000):
+    rng = random.Random(7)
+    print(f"{'records':>10}{'file MB':>10}{'open ms':>10}{'probe us':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (1000, 100000, 1000000):
+            path = os.path.join(directory, f"book{size}.bin")
+            counts, keys = synthetic_counts(size, rng)
+            write_book(counts, path)
+            lookups = [rng.choice(keys) for _ in range(probes)]
+
+            start = time.perf_counter()
+            book = OpeningBook(path)
+            opened = time.perf_counter() - start
+            start = time.perf_counter()
+            for key in lookups:
+                if not book.probe(key):
+                    raise AssertionError(f"key {key:#x} missing from the book")
+            probed = (time.perf_counter() - start) / probes
+            book.close()
+            print(f"{len(counts):>10}{os.path.getsize(path) / 1e6:>10.2f}{opened * 1000:>10.3f}{probed * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_core import Board, ChessSet, IllegalMoveError, Position
+
+# Middlegame positions reached by playing these moves from the start position.
+# Each one leaves the side to move either in check or checkmated, which is where
+# is_checkmate has to do real work.
+POSITIONS = {
+    "scholars mate": ("e2e4 e7e5 f1c4 b8c6 d1h5 g8f6 h5f7", "Black"),
+    "fools mate": ("f2f3 e7e5 g2g4 d8h4", "White"),
+    "italian, bishop check": ("e2e4 e7e5 g1f3 b8c6 f1c4 f8c5 e1g1 g8f6 d2d3 d7d6 "
+                              "c1g5 h7h6 g5h4 e8g8 b1c3 c8g4 h2h3 g4h5 c4f7", "Black"),
+    "queen check, many evasions": ("d2d4 d7d5 c2c4 e7e6 b1c3 g8f6 c1g5 f8e7 e2e3 e8g8 "
+                                   "g1f3 b8d7 f1d3 d5c4 d3c4 c7c5 e1g1 a7a6 d1e2 b7b5 "
+                                   "c4d3 c8b7 d4c5 d7c5 d3h7", "Black"),
+}
+
+
+def to_position(square):
+    return Position(int(square[1]) - 1, ord(square[0]) - ord("a"))
+
+
+def play(moves):
+    chess_set = ChessSet()
+    for move in moves.split():
+        try:
+            chess_set.board.move_piece(to_position(move[:2]), to_position(move[2:4]))
+        except IllegalMoveError as error:
+            raise ValueError(f"Illegal move in benchmark line: {move}") from error
+    return chess_set
+
+
+def legacy_is_position_under_attack(self, position, color):
+    # The original full-board scan, kept here only as the baseline to compare against
+    for row in self.board:
+        for piece in row:
+            if piece and piece.color != color:
+                if position in piece.possible_moves():
+                    return True
+    return False
+
+
+def legacy_legal_moves(self, color):
+    # The original generator: every pseudo-legal move is played on the board and tested for check.
+    # The full-board scan above only gives the right answer after the move has been made.
+    moves = []
+    for row in self.board:
+        for piece in row:
+            if piece and piece.color == color:
+                for end_pos in piece.possible_moves():
+                    if not self.move_puts_self_in_check(piece, end_pos):
+                        moves.append((piece.position, end_pos, None))
+    return moves
+
+
+def time_checkmate(chess_set, color, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        # Drop the per-ply move cache so every repeat generates the moves again
+        chess_set.legal_moves_cache = (None, [], {})
+        result = chess_set.is_checkmate(color)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main(repeat=20):
+    games = {name: (play(moves), color) for name, (moves, color) in POSITIONS.items()}
+
+    print(f"{'position':<30}{'legacy ms':>12}{'legal ms':>12}{'speedup':>10}  mate")
+    fast_attack = Board.is_position_under_attack
+    fast_legal_moves = Board.legal_moves
+    total_legacy = total_fast = 0.0
+    for name, (chess_set, color) in games.items():
+        Board.is_position_under_attack = legacy_is_position_under_attack
+        Board.legal_moves = legacy_legal_moves
+        try:
+            legacy, legacy_result = time_checkmate(chess_set, color, repeat)
+        finally:
+            Board.is_position_under_attack = fast_attack
+            Board.legal_moves = fast_legal_moves
+        fast, fast_result = time_checkmate(chess_set, color, repeat)
+        if legacy_result != fast_result:
+            raise AssertionError(f"{name}: legacy and legal generator results disagree")
+        total_legacy += legacy
+        total_fast += fast
+        print(f"{name:<30}{legacy * 1000:>12.3f}{fast * 1000:>12.3f}{legacy / fast:>9.1f}x  {fast_result}")
+    print(f"{'total':<30}{total_legacy * 1000:>12.3f}{total_fast * 1000:>12.3f}{total_legacy / total_fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
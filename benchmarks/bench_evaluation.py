@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_position_codec import random_positions
+from evaluation import encode_planes, evaluate_board, evaluate_planes, planes_from_packed
+from fen import POSITION_SIZE, encode_into
+
+
+def main(count=2000, repeat=5):
+    positions = random_positions(count)
+    boards = [chess_set.board for chess_set in positions]
+    packed = bytearray(POSITION_SIZE * count)
+    for index, chess_set in enumerate(positions):
+        encode_into(packed, index * POSITION_SIZE, chess_set)
+
+    scalar_scores = [evaluate_board(board, "White") for board in boards]
+    planes = encode_planes(boards)
+    if evaluate_planes(planes).tolist() != scalar_scores or \
+            evaluate_planes(planes_from_packed(packed)).tolist() != scalar_scores:
+        raise AssertionError("Batch and scalar evaluation disagree")
+
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            evaluate_board(board, "White")
+    timings["scalar evaluate_board"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        evaluate_planes(encode_planes(boards))
+    timings["batch, encoded from Boards"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        evaluate_planes(planes_from_packed(packed))
+    timings["batch, from packed records"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        evaluate_planes(planes)
+    timings["batch, planes ready"] = time.perf_counter() - start
+
+    print(f"{count} positions, {repeat} repeats")
+    for name, elapsed in timings.items():
+        print(f"{name:<30}{count * repeat / elapsed:>12.0f} positions/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_core import Board, ChessSet, Pawn, Position
+
+
+def allocated(build, count):
+    # Bytes still held per object after building count of them
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [build(index) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def per_ply(plies, seed):
+    # Transient bytes allocated while generating the legal moves of each ply of a random game
+    rng = random.Random(seed)
+    chess_set = ChessSet()
+    peaks = []
+    elapsed = 0.0
+    tracemalloc.start()
+    for _ in range(plies):
+        color = chess_set.current_player
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        moves = chess_set.board.legal_moves(color)
+        elapsed += time.perf_counter() - start
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        if not moves:
+            break
+        start_pos, end_pos, promotion = rng.choice(moves)
+        chess_set.board.execute_move(chess_set.board.get_piece_at(start_pos), start_pos, end_pos, promotion)
+        chess_set.switch_turn()
+    tracemalloc.stop()
+    return peaks, elapsed
+
+
+def main(plies=80, seed=5):
+    board = Board()
+    print(f"Position      {allocated(lambda index: Position(index % 8, index // 8 % 8), 10000):>8.1f} bytes each")
+    print(f"Pawn          {allocated(lambda index: Pawn('White', board), 10000):>8.1f} bytes each")
+    print(f"ChessSet      {allocated(lambda index: ChessSet(), 200):>8.0f} bytes each")
+    peaks, elapsed = per_ply(plies, seed)
+    print(f"legal_moves   {sum(peaks) / len(peaks):>8.0f} bytes peak per ply (max {max(peaks)}), "
+          f"{elapsed / len(peaks) * 1000:.3f} ms per ply (traced) over {len(peaks)} plies")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 80)
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chess_core import Board
+from fen import load_fen
+from perft import perft
+
+# Standard perft reference positions with their published node counts per depth
+REFERENCE_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(board_class, max_nodes):
+    results = []
+    for name, fen, expected in REFERENCE_POSITIONS:
+        # Go as deep as the node budget allows for each position
+        depth = max(d for d in range(1, len(expected) + 1) if d == 1 or expected[d - 1] <= max_nodes)
+        chess_set = load_fen(fen, board_class)
+        start = time.perf_counter()
+        nodes = perft(chess_set.board, chess_set.current_player, depth)
+        elapsed = time.perf_counter() - start
+        results.append({
+            "name": name,
+            "fen": fen,
+            "depth": depth,
+            "nodes": nodes,
+            "expected": expected[depth - 1],
+            "correct": nodes == expected[depth - 1],
+            "seconds": round(elapsed, 4),
+            "nodes_per_second": round(nodes / elapsed) if elapsed else None,
+        })
+        status = "ok" if nodes == expected[depth - 1] else f"WRONG (expected {expected[depth - 1]})"
+        print(f"{name:<12} depth {depth}  {nodes:>9} nodes  {elapsed:>8.3f}s  "
+              f"{results[-1]['nodes_per_second'] or 0:>8} nodes/s  {status}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft correctness and speed suite")
+    parser.add_argument("--max-nodes", type=int, default=100000, help="deepest depth per position under this size")
+    parser.add_argument("--bitboard", action="store_true", help="run on the bitboard backend")
+    parser.add_argument("--output", default="perft_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare nodes/s against")
+    args = parser.parse_args()
+
+    board_class = Board
+    if args.bitboard:
+        from bitboard import BitBoard
+        board_class = BitBoard
+
+    results = run_suite(board_class, args.max_nodes)
+    total_nodes = sum(result["nodes"] for result in results)
+    total_seconds = sum(result["seconds"] for result in results)
+    report = {
+        "revision": git_revision(),
+        "backend": board_class.__name__,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "all_correct": all(result["correct"] for result in results),
+        "total_nodes": total_nodes,
+        "total_seconds": round(total_seconds, 4),
+        "nodes_per_second": round(total_nodes / total_seconds) if total_seconds else None,
+        "positions": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Total: {total_nodes} nodes in {total_seconds:.3f}s ({report['nodes_per_second']} nodes/s) -> {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {result["name"]: result for result in json.load(f)["positions"]}
+        for result in results:
+            old = baseline.get(result["name"])
+            if old and old["depth"] == result["depth"] and old["nodes_per_second"]:
+                change = result["nodes_per_second"] / old["nodes_per_second"] - 1
+                print(f"{result['name']:<12} {change:+.1%} nodes/s vs baseline {old.get('revision', '')}")
+
+    if not report["all_correct"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_core import ChessSet
+from engine import Engine
+from fen import load_fen, to_fen
+from position_cache import PositionCache
+
+
+def opening_positions(count, seed=1, max_plies=16):
+    # FENs met in the first moves of random games, where real sessions keep coming back to
+    rng = random.Random(seed)
+    fens = []
+    while len(fens) < count:
+        chess_set = ChessSet()
+        for _ in range(rng.randrange(max_plies)):
+            start_pos, end_pos, promotion = rng.choice(chess_set.legal_moves(chess_set.current_player))
+            chess_set.play_move(start_pos, end_pos, promotion)
+        fens.append(to_fen(chess_set))
+    return fens
+
+
+def session(fens, depth, path, max_entries):
+    # Runs in a fresh process, like a new program start: every position gets its legal moves and
+    # a search. Returns (seconds, cache stats or None, entries in the file).
+    cache = PositionCache(path, max_entries) if path else None
+    engine = Engine(tt_size=1 << 16, cache=cache)
+    start = time.perf_counter()
+    for fen in fens:
+        chess_set = load_fen(fen)
+        chess_set.position_cache = cache
+        chess_set.legal_moves(chess_set.current_player)
+        engine.search(chess_set.board, chess_set.current_player, depth)
+    if cache is None:
+        return time.perf_counter() - start, None, 0
+    cache.flush()
+    elapsed = time.perf_counter() - start
+    stats, entries = cache.stats(), len(cache)
+    cache.close()
+    return elapsed, stats, entries
+
+
+def run_sessions(fens, depth, path, max_entries=1_000_000, processes=1):
+    # processes sessions at once on the same file, each over its own share of the positions
+    with ProcessPoolExecutor(processes) as pool:
+        shares = [fens[index::processes] for index in range(processes)]
+        return list(pool.map(session, shares, [depth] * processes, [path] * processes, [max_entries] * processes))
+
+
+def report(name, results):
+    elapsed = max(seconds for seconds, _, _ in results)
+    line = f"{name:<34}{elapsed:>8.2f}s"
+    stats = [stat for _, stat, _ in results if stat]
+    if stats:
+        hits = sum(stat["hits"] for stat in stats)
+        probes = hits + sum(stat["misses"] for stat in stats)
+        evictions = sum(stat["evictions"] for stat in stats)
+        line += f"  hit rate {hits / probes:6.1%}  evictions {evictions:>5}  entries {max(r[2] for r in results):>5}"
+    print(line)
+    return elapsed
+
+
+def main(count=300, depth=3):
+    fens = opening_positions(count)
+    print(f"{count} opening positions ({len(set(fens))} distinct), legal moves and a depth {depth} search each")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "positions.db")
+        baseline = report("no cache", run_sessions(fens, depth, None))
+        cold = report("cold start (empty file)", run_sessions(fens, depth, path))
+        warm = report("warm start (same file)", run_sessions(fens, depth, path))
+        report("warm start, 4 processes at once", run_sessions(fens, depth, path, processes=4))
+        shared = os.path.join(directory, "shared.db")
+        report("cold start, 4 processes at once", run_sessions(fens, depth, shared, processes=4))
+        print(f"warm start is {cold / warm:.0f}x faster than cold, cold start costs "
+              f"{(cold / baseline - 1) * 100:+.0f}% against no cache")
+
+        bounded = os.path.join(directory, "bounded.db")
+        report("cold start, bounded to 100 entries", run_sessions(fens, depth, bounded, max_entries=100))
+        report("warm start, bounded to 100 entries", run_sessions(fens, depth, bounded, max_entries=100))
+
+
+if __name__ == "__main__":
+    main(*(int(argument) for argument in sys.argv[1:]))
@@ -0,0 +1,70 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_core import ChessSet
+from fen import POSITION_SIZE, decode_position, encode_into, encode_position, load_fen, to_fen
+
+
+def random_positions(count, seed=1, max_plies=80):
+    # Positions met along random games, so the mix covers castling, en passant and sparse endings
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        chess_set = ChessSet()
+        for _ in range(rng.randrange(max_plies)):
+            moves = chess_set.legal_moves(chess_set.current_player)
+            if not moves:
+                break
+            start_pos, end_pos, promotion = rng.choice(moves)
+            chess_set.board.execute_move(chess_set.board.get_piece_at(start_pos), start_pos, end_pos, promotion)
+            chess_set.switch_turn()
+        positions.append(chess_set)
+    return positions
+
+
+def rate(count, elapsed):
+    return f"{count / elapsed:>10.0f}/s" if elapsed else "       n/a"
+
+
+def main(count=2000):
+    positions = random_positions(count)
+    fens = [to_fen(chess_set) for chess_set in positions]
+
+    for chess_set, fen in zip(positions, fens):
+        if to_fen(load_fen(fen)) != fen or to_fen(decode_position(encode_position(chess_set))) != fen:
+            raise AssertionError(f"Round trip changed the position: {fen}")
+
+    start = time.perf_counter()
+    for chess_set in positions:
+        to_fen(chess_set)
+    fen_encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for fen in fens:
+        load_fen(fen)
+    fen_decode = time.perf_counter() - start
+
+    buffer = bytearray(POSITION_SIZE * count)
+    start = time.perf_counter()
+    for index, chess_set in enumerate(positions):
+        encode_into(buffer, index * POSITION_SIZE, chess_set)
+    packed_encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in range(count):
+        decode_position(buffer, index * POSITION_SIZE)
+    packed_decode = time.perf_counter() - start
+
+    fen_bytes = sum(len(fen) for fen in fens)
+    print(f"{count} positions")
+    print(f"{'format':<8}{'encode':>14}{'decode':>14}{'bytes/pos':>12}")
+    print(f"{'fen':<8}{rate(count, fen_encode):>14}{rate(count, fen_decode):>14}{fen_bytes / count:>12.1f}")
+    print(f"{'packed':<8}{rate(count, packed_encode):>14}{rate(count, packed_decode):>14}{POSITION_SIZE:>12}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Client:
+    # One connection to the game server; requests are answered in order, one at a time
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response
+
+
+async def play(host, port, games, plies, seed, latencies):
+    # Keep several games open on one connection and make a random move in each in turn
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    client = Client(reader, writer)
+    states = [await client.request(op="new", legal=True) for _ in range(games)]
+    game_ids = [state["game"] for state in states]
+    for _ in range(plies):
+        for index, state in enumerate(states):
+            if state is None or not state["legal"]:
+                states[index] = None
+                continue
+            start = time.perf_counter()
+            states[index] = await client.request(op="move", game=state["game"], move=rng.choice(state["legal"]),
+                                                 ply=state["ply"], legal=True)
+            latencies.append(time.perf_counter() - start)
+            if states[index]["status"] not in ("check", "normal"):
+                states[index]["legal"] = []
+    for game_id in game_ids:
+        await client.request(op="close", game=game_id)
+    writer.close()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(host, port, clients, games, plies):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(play(host, port, games, plies, seed, latencies) for seed in range(clients)))
+    elapsed = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    stats = await Client(reader, writer).request(op="stats")
+    writer.close()
+    print(f"{clients * games} games on {clients} connections, {len(latencies)} moves in {elapsed:.2f}s")
+    print(f"{len(latencies) / elapsed:.0f} moves/s, latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms")
+    print(f"server: {stats}")
+
+
+def start_server():
+    # A server of our own on a free port, in its own process so it does not share the client's CPU
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py"), "--port", "0"],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    return process, int(line.rsplit(":", 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the game server with random games")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="server to test (default: start one)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--games", type=int, default=20, help="games open per connection")
+    parser.add_argument("--plies", type=int, default=40, help="moves per game")
+    args = parser.parse_args()
+
+    process = None
+    port = args.port
+    if port is None:
+        process, port = start_server()
+    try:
+        asyncio.run(run(args.host, port, args.clients, args.games, args.plies))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class UciProcess:
+    # One uci.py child process driven over its pipes, the way a tournament manager does
+    def __init__(self, process):
+        self.process = process
+
+    @classmethod
+    async def start(cls):
+        process = await asyncio.create_subprocess_exec(sys.executable, os.path.join(ROOT, "uci.py"),
+                                                       stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        engine = cls(process)
+        await engine.command("uci", "uciok")
+        return engine
+
+    async def send(self, line):
+        self.process.stdin.write(line.encode() + b"\n")
+        await self.process.stdin.drain()
+
+    async def read_until(self, prefix):
+        while True:
+            line = (await self.process.stdout.readline()).decode()
+            if not line:
+                raise RuntimeError("uci process exited")
+            if line.startswith(prefix):
+                return line.split()
+
+    async def command(self, line, reply):
+        # Seconds from sending line to the reply line, and the reply's words
+        start = time.perf_counter()
+        await self.send(line)
+        words = await self.read_until(reply)
+        return time.perf_counter() - start, words
+
+    async def quit(self):
+        await self.send("quit")
+        await self.process.wait()
+
+
+async def play(engine, plies, movetime, latencies):
+    # One self-play game: the whole move list is sent before every search, as GUIs do.
+    # The overhead of a move is how much longer than movetime it took to get the bestmove.
+    await engine.send("ucinewgame")
+    await engine.command("isready", "readyok")
+    moves = []
+    for _ in range(plies):
+        await engine.send("position startpos" + (" moves " + " ".join(moves) if moves else ""))
+        elapsed, words = await engine.command(f"go movetime {movetime}", "bestmove")
+        latencies["overhead"].append(elapsed - movetime / 1000)
+        if words[1] == "0000":
+            break
+        moves.append(words[1])
+    # isready and stop while a search is running must not wait for it
+    await engine.send("position startpos moves " + " ".join(moves))
+    await engine.send("go infinite")
+    await asyncio.sleep(0.2)
+    latencies["isready"].append((await engine.command("isready", "readyok"))[0])
+    latencies["stop"].append((await engine.command("stop", "bestmove"))[0])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(games, plies, movetime):
+    engines = await asyncio.gather(*(UciProcess.start() for _ in range(games)))
+    latencies = {"overhead": [], "isready": [], "stop": []}
+    start = time.perf_counter()
+    await asyncio.gather(*(play(engine, plies, movetime, latencies) for engine in engines))
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*(engine.quit() for engine in engines))
+    print(f"{games} engine processes at once, {len(latencies['overhead'])} moves at movetime {movetime} ms "
+          f"in {elapsed:.1f}s")
+    for name, values in latencies.items():
+        print(f"{name:<10} p50 {percentile(values, 0.5) * 1000:7.2f} ms  p99 {percentile(values, 0.99) * 1000:7.2f} ms  "
+              f"max {max(values) * 1000:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure UCI response times with many engine processes at once")
+    parser.add_argument("--games", type=int, default=8, help="engine processes playing at the same time")
+    parser.add_argument("--plies", type=int, default=40, help="moves per game")
+    parser.add_argument("--movetime", type=int, default=100, help="milliseconds per move")
+    args = parser.parse_args()
+    asyncio.run(run(args.games, args.plies, args.movetime))
+
+
+if __name__ == "__main__":
+    main()
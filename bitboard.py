@@ -0,0 +1,135 @@
+from chess_core import Board, Position, KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS
+
+# Square index is row * 8 + col, so bit 0 is a1 (row 0, col 0) and bit 63 is h8.
+PIECE_TYPES = ["pawn", "knight", "bishop", "rook", "queen", "king"]
+COLORS = ["White", "Black"]
+
+# Directions that move to a higher square index scan for their first blocker with the
+# lowest set bit, the others with the highest set bit.
+POSITIVE_DIRECTIONS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+NEGATIVE_DIRECTIONS = [(-1, 0), (0, -1), (-1, -1), (-1, 1)]
+
+
+def build_jump_masks(offsets):
+    masks = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            for dr, dc in offsets:
+                if 0 <= row + dr < 8 and 0 <= col + dc < 8:
+                    mask |= 1 << ((row + dr) * 8 + col + dc)
+            masks.append(mask)
+    return masks
+
+
+def build_ray_masks(direction):
+    dr, dc = direction
+    masks = []
+    for row in range(8):
+        for col in range(8):
+            mask = 0
+            r, c = row + dr, col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                mask |= 1 << (r * 8 + c)
+                r, c = r + dr, c + dc
+            masks.append(mask)
+    return masks
+
+
+KNIGHT_MASKS = build_jump_masks(KNIGHT_OFFSETS)
+KING_MASKS = build_jump_masks(KING_OFFSETS)
+RAY_MASKS = {direction: build_ray_masks(direction) for direction in POSITIVE_DIRECTIONS + NEGATIVE_DIRECTIONS}
+# Squares an enemy pawn has to stand on to attack a square owned by the given color
+PAWN_ATTACKER_MASKS = {
+    "White": build_jump_masks([(1, -1), (1, 1)]),
+    "Black": build_jump_masks([(-1, -1), (-1, 1)]),
+}
+
+# Interned positions so converting a mask back to squares does not allocate
+SQUARE_POSITIONS = [Position(square // 8, square % 8) for square in range(64)]
+
+
+def ray_attacks(square, direction, occupied):
+    ray = RAY_MASKS[direction][square]
+    blockers = ray & occupied
+    if not blockers:
+        return ray
+    if direction in POSITIVE_DIRECTIONS:
+        first = (blockers & -blockers).bit_length() - 1
+    else:
+        first = blockers.bit_length() - 1
+    # Everything past the first blocker is hidden behind it
+    return ray ^ RAY_MASKS[direction][first]
+
+
+def sliding_attacks(square, directions, occupied):
+    attacks = 0
+    for direction in directions:
+        attacks |= ray_attacks(square, direction, occupied)
+    return attacks
+
+
+def iter_squares(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitBoard(Board):
+    # Board backed by one 64-bit mask per colour and piece type. The list of lists in
+    # self.board is still kept up to date so pieces, ChessSet and ChessGUI that look
+    # squares up by Position keep working unchanged.
+    def __init__(self):
+        self.piece_masks = {(color, piece_type): 0 for color in COLORS for piece_type in PIECE_TYPES}
+        self.color_masks = {color: 0 for color in COLORS}
+        self.occupied = 0
+        super().__init__()
+
+    def set_square(self, row, col, piece):
+        bit = 1 << (row * 8 + col)
+        old_piece = self.board[row][col]
+        if old_piece:
+            self.piece_masks[(old_piece.color, old_piece.piece_type)] &= ~bit
+            self.color_masks[old_piece.color] &= ~bit
+            self.occupied &= ~bit
+        if piece:
+            self.piece_masks[(piece.color, piece.piece_type)] |= bit
+            self.color_masks[piece.color] |= bit
+            self.occupied |= bit
+        super().set_square(row, col, piece)
+
+    def is_square_empty(self, position):
+        return not (self.occupied >> (position.row * 8 + position.col)) & 1
+
+    def is_enemy_piece(self, position, color):
+        enemy = "Black" if color == "White" else "White"
+        return bool((self.color_masks[enemy] >> (position.row * 8 + position.col)) & 1)
+
+    def get_directional_moves(self, position, directions, color):
+        square = position.row * 8 + position.col
+        targets = sliding_attacks(square, directions, self.occupied) & ~self.color_masks[color]
+        return [SQUARE_POSITIONS[target] for target in iter_squares(targets)]
+
+    def attackers_to(self, square, color):
+        # Mask of pieces not belonging to color that attack the square
+        enemy = "Black" if color == "White" else "White"
+        masks = self.piece_masks
+        occupied = self.occupied
+        rooks = masks[(enemy, "rook")] | masks[(enemy, "queen")]
+        bishops = masks[(enemy, "bishop")] | masks[(enemy, "queen")]
+        return ((KNIGHT_MASKS[square] & masks[(enemy, "knight")])
+                | (KING_MASKS[square] & masks[(enemy, "king")])
+                | (PAWN_ATTACKER_MASKS[color][square] & masks[(enemy, "pawn")])
+                | (sliding_attacks(square, ROOK_DIRECTIONS, occupied) & rooks if rooks else 0)
+                | (sliding_attacks(square, BISHOP_DIRECTIONS, occupied) & bishops if bishops else 0))
+
+    def is_position_under_attack(self, position, color):
+        return self.attackers_to(position.row * 8 + position.col, color) != 0
+
+    def get_king(self, color):
+        kings = self.piece_masks[(color, "king")]
+        if not kings:
+            return None
+        square = (kings & -kings).bit_length() - 1
+        return self.board[square // 8][square % 8]
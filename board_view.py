@@ -0,0 +1,402 @@
+import base64
+import struct
+import time
+import tkinter as tk
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Piece silhouettes in a unit square (x right, y down), as ("+" | "-", shape) steps: "+" adds the
+# shape, "-" cuts it out. Shapes are ("poly", points), ("rect", x0, y0, x1, y1) or
+# ("ellipse", cx, cy, rx, ry). Drawing pieces ourselves instead of using Unicode glyphs makes
+# them look the same whatever fonts are installed.
+BASE = ("+", ("rect", 0.24, 0.76, 0.76, 0.88))
+PIECE_SHAPES = {
+    "pawn": [
+        ("+", ("ellipse", 0.5, 0.30, 0.12, 0.12)),
+        ("+", ("ellipse", 0.5, 0.44, 0.16, 0.05)),
+        ("+", ("poly", [(0.41, 0.44), (0.59, 0.44), (0.67, 0.76), (0.33, 0.76)])),
+        BASE,
+    ],
+    "knight": [
+        ("+", ("poly", [(0.30, 0.76), (0.72, 0.76), (0.72, 0.58), (0.67, 0.38), (0.58, 0.24), (0.50, 0.14),
+                        (0.46, 0.21), (0.36, 0.26), (0.22, 0.44), (0.25, 0.52), (0.33, 0.51), (0.45, 0.44),
+                        (0.34, 0.62)])),
+        ("-", ("ellipse", 0.47, 0.31, 0.03, 0.03)),
+        BASE,
+    ],
+    "bishop": [
+        ("+", ("ellipse", 0.5, 0.15, 0.05, 0.05)),
+        ("+", ("ellipse", 0.5, 0.41, 0.15, 0.21)),
+        ("-", ("poly", [(0.53, 0.28), (0.58, 0.32), (0.49, 0.44), (0.45, 0.41)])),
+        ("+", ("poly", [(0.41, 0.58), (0.59, 0.58), (0.65, 0.76), (0.35, 0.76)])),
+        BASE,
+    ],
+    "rook": [
+        ("+", ("rect", 0.27, 0.16, 0.73, 0.32)),
+        ("-", ("rect", 0.38, 0.16, 0.45, 0.24)),
+        ("-", ("rect", 0.55, 0.16, 0.62, 0.24)),
+        ("+", ("poly", [(0.34, 0.32), (0.66, 0.32), (0.68, 0.76), (0.32, 0.76)])),
+        BASE,
+    ],
+    "queen": [
+        ("+", ("poly", [(0.24, 0.30), (0.35, 0.64), (0.65, 0.64), (0.76, 0.30), (0.63, 0.47), (0.57, 0.22),
+                        (0.5, 0.45), (0.43, 0.22), (0.37, 0.47)])),
+        ("+", ("ellipse", 0.24, 0.28, 0.045, 0.045)),
+        ("+", ("ellipse", 0.43, 0.20, 0.045, 0.045)),
+        ("+", ("ellipse", 0.57, 0.20, 0.045, 0.045)),
+        ("+", ("ellipse", 0.76, 0.28, 0.045, 0.045)),
+        ("+", ("poly", [(0.35, 0.64), (0.65, 0.64), (0.69, 0.76), (0.31, 0.76)])),
+        BASE,
+    ],
+    "king": [
+        ("+", ("rect", 0.465, 0.06, 0.535, 0.28)),
+        ("+", ("rect", 0.40, 0.12, 0.60, 0.19)),
+        ("+", ("ellipse", 0.5, 0.38, 0.22, 0.10)),
+        ("+", ("poly", [(0.28, 0.38), (0.72, 0.38), (0.63, 0.76), (0.37, 0.76)])),
+        BASE,
+    ],
+}
+PIECE_COLORS = {"White": (248, 246, 240), "Black": (52, 52, 56)}
+OUTLINE_COLOR = (16, 16, 16)
+SUBSAMPLES = 4  # scanlines per pixel row; coverage along a scanline is computed exactly
+
+LIGHT_SQUARE = "#f0d9b5"
+DARK_SQUARE = "#b58863"
+HIGHLIGHT_SQUARE = "#a9d08e"
+
+
+def shape_spans(shape, y):
+    # Sorted, disjoint [x0, x1) intervals where the horizontal line at y crosses the shape
+    kind = shape[0]
+    if kind == "rect":
+        _, x0, y0, x1, y1 = shape
+        return [(x0, x1)] if y0 <= y < y1 else []
+    if kind == "ellipse":
+        _, cx, cy, rx, ry = shape
+        t = 1 - ((y - cy) / ry) ** 2
+        if t <= 0:
+            return []
+        half = rx * t ** 0.5
+        return [(cx - half, cx + half)]
+    points = shape[1]
+    crossings = []
+    for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+        if (ya <= y < yb) or (yb <= y < ya):
+            crossings.append(xa + (y - ya) * (xb - xa) / (yb - ya))
+    crossings.sort()
+    return list(zip(crossings[0::2], crossings[1::2]))
+
+
+def combine_spans(spans, other, add):
+    # Union (add) or difference of two sorted interval lists
+    edges = sorted([(x0, 0, 1) for x0, _ in spans] + [(x1, 0, -1) for _, x1 in spans] +
+                   [(x0, 1, 1) for x0, _ in other] + [(x1, 1, -1) for _, x1 in other])
+    depth = [0, 0]
+    result = []
+    start = None
+    for x, which, step in edges:
+        depth[which] += step
+        inside = (depth[0] > 0 or depth[1] > 0) if add else (depth[0] > 0 and depth[1] == 0)
+        if inside and start is None:
+            start = x
+        elif not inside and start is not None:
+            if x > start:
+                result.append((start, x))
+            start = None
+    return result
+
+
+def coverage_map(steps, size):
+    # size x size grid of how much of each pixel the silhouette covers, 0.0 to 1.0
+    grid = [[0.0] * size for _ in range(size)]
+    weight = 1 / SUBSAMPLES
+    for row in range(size):
+        line = grid[row]
+        for sample in range(SUBSAMPLES):
+            y = (row + (sample + 0.5) / SUBSAMPLES) / size
+            spans = []
+            for operation, shape in steps:
+                spans = combine_spans(spans, shape_spans(shape, y), operation == "+")
+            for x0, x1 in spans:
+                x0, x1 = max(0.0, x0 * size), min(float(size), x1 * size)
+                first, last = int(x0), min(int(x1), size - 1)
+                if first == last:
+                    line[first] += (x1 - x0) * weight
+                    continue
+                line[first] += (first + 1 - x0) * weight
+                for col in range(first + 1, last):
+                    line[col] += weight
+                line[last] += (x1 - last) * weight
+    return grid
+
+
+def dilate(grid, radius):
+    # Largest value within radius pixels (square neighbourhood), done as a pass along the rows
+    # and another along the columns of the transposed result
+    def dilate_rows(lines):
+        size = len(lines[0])
+        return [[max(line[max(0, col - radius):col + radius + 1]) if any(line) else 0.0 for col in range(size)]
+                for line in lines]
+
+    columns = dilate_rows([list(column) for column in zip(*dilate_rows(grid))])
+    return [list(row) for row in zip(*columns)]
+
+
+def png_bytes(pixels, size):
+    # Minimal RGBA PNG encoder; pixels is one bytes-like row of size * 4 values per image row
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    raw = b"".join(b"\x00" + bytes(row) for row in pixels)
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, 6)) + chunk(b"IEND", b"")
+
+
+def render_piece(piece_type, color, size):
+    # PNG of one piece, filled in its color with a dark outline over a transparent background
+    fill = coverage_map(PIECE_SHAPES[piece_type], size)
+    outline = dilate(fill, max(1, size // 28))
+    fill_color = PIECE_COLORS[color]
+    transparent = bytes(4)
+    solid = bytes(fill_color + (255,))
+    rows = []
+    for fill_row, outline_row in zip(fill, outline):
+        row = bytearray()
+        for inner, outer in zip(fill_row, outline_row):
+            if outer <= 0:
+                row += transparent
+            elif inner >= 0.999:
+                row += solid
+            else:
+                # Where only the dilated shape reaches, the outline shows
+                alpha = min(outer, 1.0)
+                mix = inner / alpha
+                row += bytes(round(o + (f - o) * mix) for o, f in zip(OUTLINE_COLOR, fill_color))
+                row.append(round(alpha * 255))
+        rows.append(row)
+    return png_bytes(rows, size)
+
+
+PIECE_KEYS = [(piece_type, color) for color in PIECE_COLORS for piece_type in PIECE_SHAPES]
+
+
+def render_set(size):
+    # PNGs of all 12 pieces at one size, and the seconds it took. Pure Python with no Tk calls,
+    # so it can run on any thread.
+    start = time.perf_counter()
+    pngs = {key: render_piece(*key, size) for key in PIECE_KEYS}
+    return pngs, time.perf_counter() - start
+
+
+class PieceImages:
+    # Tk images of every piece, one set per size the board has been shown at. Rendering a set
+    # takes 0.1-0.25 s of pure Python, so apart from the first set it happens on a worker
+    # thread: until a size is ready, get() returns the nearest size already made, and
+    # on_ready(size) is called on the Tk thread once it is. Only turning the PNGs into
+    # PhotoImages is left to the Tk thread.
+
+    def __init__(self, widget, on_ready):
+        self.widget = widget
+        self.on_ready = on_ready
+        self.images = {}  # (piece_type, color, size) -> PhotoImage
+        self.sizes = set()  # sizes whose 12 images are all made
+        self.pending = {}  # size -> Future of render_set(size)
+        self.executor = ThreadPoolExecutor(1)
+        self.polling = False
+        self.render_time = 0.0  # seconds spent rendering pixels, on either thread
+
+    def render_now(self, size):
+        # Blocking; only for the board's first size, before the window is shown
+        if size not in self.sizes:
+            self.add_set(size, *render_set(size))
+
+    def prepare(self, size):
+        # Start rendering a size in the background unless it is made or on its way
+        if size in self.sizes or size in self.pending:
+            return
+        self.pending[size] = self.executor.submit(render_set, size)
+        if not self.polling:
+            self.polling = True
+            self.widget.after(16, self.poll)
+
+    def poll(self):
+        for size, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[size]
+                self.add_set(size, *future.result())
+                self.on_ready(size)
+        self.polling = bool(self.pending)
+        if self.polling:
+            self.widget.after(16, self.poll)
+
+    def add_set(self, size, pngs, seconds):
+        self.render_time += seconds
+        for (piece_type, color), png in pngs.items():
+            self.images[(piece_type, color, size)] = tk.PhotoImage(
+                data=base64.b64encode(png).decode("ascii"), format="png")
+        self.sizes.add(size)
+
+    def get(self, piece_type, color, size):
+        if size not in self.sizes:
+            self.prepare(size)
+            size = min(self.sizes, key=lambda made: abs(made - size))
+        return self.images[(piece_type, color, size)]
+
+
+def piece_image_size(square_size):
+    # Images come in steps of 4 pixels so a window being resized only renders a few sizes
+    return max(8, int(square_size * 0.9) // 4 * 4)
+
+
+class CanvasBoard:
+    # The board as one tk.Canvas: 64 rectangles plus one image item per piece. Moves reconfigure
+    # only the squares that changed, resizing moves the existing items, and a dragged piece is
+    # just an item following the mouse. on_click(row, col) is called for clicks, on_drop(start,
+    # end) when a piece is dropped on another square (it returns whether the move was made) and
+    # can_drag(row, col) decides whether the piece on a square may be picked up.
+
+    def __init__(self, parent, on_click, on_drop, can_drag, square_size=64):
+        self.on_click = on_click
+        self.on_drop = on_drop
+        self.can_drag = can_drag
+        self.square_size = square_size
+        self.canvas = tk.Canvas(parent, width=8 * square_size, height=8 * square_size, highlightthickness=0)
+        self.images = PieceImages(self.canvas, self.images_ready)
+        self.squares = {}
+        self.pieces = {}  # (row, col) -> (item, piece_type, color)
+        self.highlighted = set()
+        self.drag = None
+        self.pending_images = None  # after() id of the image refresh that follows a resize
+        self.frame_times = deque(maxlen=1000)  # seconds per redraw, resize and drag step, latest last
+        for row in range(8):
+            for col in range(8):
+                self.squares[(row, col)] = self.canvas.create_rectangle(
+                    *self.square_bounds(row, col), width=0, fill=self.square_color(row, col))
+        # The first size is rendered now, so a Tk that cannot read PNG fails here rather than
+        # mid-game, and the sizes one step either side are rendered in the background
+        image_size = piece_image_size(square_size)
+        self.images.render_now(image_size)
+        for size in (image_size + 4, image_size - 4):
+            self.images.prepare(size)
+        self.canvas.bind("<Configure>", self.resize)
+        self.canvas.bind("<ButtonPress-1>", self.press)
+        self.canvas.bind("<B1-Motion>", self.motion)
+        self.canvas.bind("<ButtonRelease-1>", self.release)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+
+    def square_bounds(self, row, col):
+        size = self.square_size
+        return col * size, row * size, (col + 1) * size, (row + 1) * size
+
+    def square_center(self, row, col):
+        return (col + 0.5) * self.square_size, (row + 0.5) * self.square_size
+
+    def square_at(self, x, y):
+        row, col = int(y // self.square_size), int(x // self.square_size)
+        return (row, col) if 0 <= row < 8 and 0 <= col < 8 else None
+
+    def square_color(self, row, col):
+        if (row, col) in self.highlighted:
+            return HIGHLIGHT_SQUARE
+        return LIGHT_SQUARE if (row + col) % 2 else DARK_SQUARE
+
+    def set_piece(self, row, col, piece):
+        old = self.pieces.pop((row, col), None)
+        if old:
+            self.canvas.delete(old[0])
+        if piece:
+            image = self.images.get(piece.piece_type, piece.color, piece_image_size(self.square_size))
+            item = self.canvas.create_image(*self.square_center(row, col), image=image)
+            self.pieces[(row, col)] = (item, piece.piece_type, piece.color)
+
+    def highlight(self, squares):
+        changed = self.highlighted ^ squares
+        self.highlighted = set(squares)
+        for row, col in changed:
+            self.canvas.itemconfig(self.squares[(row, col)], fill=self.square_color(row, col))
+
+    def resize(self, event):
+        # Items are only moved while the window is being dragged to a new size; pieces get images
+        # of the new size once it has stayed put for a moment, so sizes passed through are never
+        # rendered. Until the new size is rendered they keep the nearest size there is.
+        square_size = max(8, min(event.width, event.height) // 8)
+        if square_size == self.square_size:
+            return
+        start = time.perf_counter()
+        self.square_size = square_size
+        for (row, col), item in self.squares.items():
+            self.canvas.coords(item, *self.square_bounds(row, col))
+        for (row, col), (item, _, _) in self.pieces.items():
+            self.canvas.coords(item, *self.square_center(row, col))
+        if self.pending_images is not None:
+            self.canvas.after_cancel(self.pending_images)
+        self.pending_images = self.canvas.after(150, self.refresh_images)
+        self.frame_times.append(time.perf_counter() - start)
+
+    def refresh_images(self):
+        self.pending_images = None
+        image_size = piece_image_size(self.square_size)
+        for item, piece_type, color in self.pieces.values():
+            self.canvas.itemconfig(item, image=self.images.get(piece_type, color, image_size))
+
+    def images_ready(self, size):
+        if size == piece_image_size(self.square_size):
+            self.refresh_images()
+
+    def press(self, event):
+        square = self.square_at(event.x, event.y)
+        if square is None:
+            return
+        self.on_click(*square)
+        if square in self.pieces and self.can_drag(*square):
+            item = self.pieces[square][0]
+            self.canvas.tag_raise(item)
+            self.drag = (square, item)
+
+    def motion(self, event):
+        if self.drag is None:
+            return
+        start = time.perf_counter()
+        self.canvas.coords(self.drag[1], event.x, event.y)
+        self.frame_times.append(time.perf_counter() - start)
+
+    def release(self, event):
+        if self.drag is None:
+            return
+        origin, item = self.drag
+        self.drag = None
+        target = self.square_at(event.x, event.y)
+        if target is not None and target != origin and self.on_drop(origin, target):
+            return
+        # Dropped off the board, on its own square or on an illegal square: put it back
+        if self.pieces.get(origin, (None,))[0] == item:
+            self.canvas.coords(item, *self.square_center(*origin))
+
+
+class ButtonBoard:
+    # Fallback: the original grid of 64 tk.Buttons showing Unicode pieces. Same interface as
+    # CanvasBoard, without dragging.
+
+    def __init__(self, parent, on_click):
+        self.frame = tk.Frame(parent)
+        self.buttons = {}
+        self.frame_times = deque(maxlen=1000)
+        for row in range(8):
+            for col in range(8):
+                button = tk.Button(self.frame, width=4, height=2, command=lambda r=row, c=col: on_click(r, c))
+                button.grid(row=row, column=col)
+                self.buttons[(row, col)] = button
+        self.frame.pack()
+        self.default_color = self.buttons[(0, 0)].cget("bg")
+        self.highlighted = set()
+
+    def set_piece(self, row, col, piece):
+        self.buttons[(row, col)].config(text=str(piece) if piece else "")
+
+    def highlight(self, squares):
+        for square in self.highlighted - squares:
+            self.buttons[square].config(bg=self.default_color)
+        for square in squares - self.highlighted:
+            self.buttons[square].config(bg=HIGHLIGHT_SQUARE)
+        self.highlighted = set(squares)
@@ -0,0 +1,223 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from chess_core import ChessSet, IllegalMoveError, Position, move_name
+from fen import START_FEN, load_fen
+from pgn import batches, parse_san, read_games
+
+# File layout: a 16-byte header, then fixed-size records sorted by position key and, within
+# one key, by falling weight. Keys are Board.zobrist_key values, which include the side to move.
+BOOK_MAGIC = b"CHESSBK1"
+HEADER_FORMAT = struct.Struct("<8sII")
+RECORD_FORMAT = struct.Struct("<QHH")  # zobrist key, packed move, weight
+KEY_FORMAT = struct.Struct("<Q")
+PROMOTION_CODES = {None: 0, "knight": 1, "bishop": 2, "rook": 3, "queen": 4}
+CODE_PROMOTIONS = {code: promotion for promotion, code in PROMOTION_CODES.items()}
+
+
+def encode_move(move):
+    # 6 bits from-square, 6 bits to-square, 3 bits promotion
+    start_pos, end_pos, promotion = move
+    start, end = start_pos.row * 8 + start_pos.col, end_pos.row * 8 + end_pos.col
+    return start | end << 6 | PROMOTION_CODES[promotion] << 12
+
+
+def decode_move(code):
+    start, end = code & 63, code >> 6 & 63
+    return Position(start >> 3, start & 7), Position(end >> 3, end & 7), CODE_PROMOTIONS[code >> 12 & 7]
+
+
+class OpeningBook:
+    # Read-only view of a book file. Opening it maps the file without reading the records,
+    # so startup costs the same for any book size; each probe is a binary search over the map.
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self.size = HEADER_FORMAT.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or len(self.data) != HEADER_FORMAT.size + self.size * RECORD_FORMAT.size:
+            self.close()
+            raise ValueError(f"{path} is not an opening book file")
+        self.probes = 0
+        self.hits = 0
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def key_at(self, index):
+        return KEY_FORMAT.unpack_from(self.data, HEADER_FORMAT.size + index * RECORD_FORMAT.size)[0]
+
+    def probe(self, key):
+        # All (move, weight) entries stored for key, heaviest first
+        self.probes += 1
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        offset = HEADER_FORMAT.size + low * RECORD_FORMAT.size
+        while low < self.size:
+            entry_key, code, weight = RECORD_FORMAT.unpack_from(self.data, offset)
+            if entry_key != key:
+                break
+            entries.append((decode_move(code), weight))
+            low += 1
+            offset += RECORD_FORMAT.size
+        if entries:
+            self.hits += 1
+        return entries
+
+    def book_moves(self, board, color):
+        # Book entries for the position that are legal there, so a key collision can never
+        # produce an illegal move
+        entries = self.probe(board.zobrist_key)
+        if not entries:
+            return []
+        legal = board.legal_moves(color)
+        return [(move, weight) for move, weight in entries if move in legal]
+
+    def choose_move(self, board, color, rng=random):
+        # Pick a book move with probability proportional to its weight, or None when out of book
+        entries = self.book_moves(board, color)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return rng.choices(moves, weights=weights)[0]
+
+
+def count_game(game, max_plies):
+    # Counter of (key, packed move) for the first max_plies plies of a game; stops at the
+    # first move it cannot read. None if the game's FEN header cannot be loaded.
+    counts = Counter()
+    try:
+        chess_set = load_fen(game.headers["FEN"]) if game.headers.get("FEN") else ChessSet()
+    except (ValueError, IndexError):
+        return None
+    for san in game.san_moves()[:max_plies]:
+        color = chess_set.current_player
+        try:
+            move = parse_san(chess_set, color, san)
+        except IllegalMoveError:
+            break
+        counts[(chess_set.board.zobrist_key, encode_move(move))] += 1
+        start_pos, end_pos, promotion = move
+        chess_set.board.execute_move(chess_set.board.get_piece_at(start_pos), start_pos, end_pos, promotion)
+        chess_set.switch_turn()
+    return counts
+
+
+def count_batch(games, max_plies):
+    # (Counter of the batch, number of games rejected)
+    counts = Counter()
+    rejected = 0
+    for game in games:
+        game_counts = count_game(game, max_plies)
+        if game_counts is None:
+            rejected += 1
+        else:
+            counts.update(game_counts)
+    return counts, rejected
+
+
+def write_book(counts, path, min_count=1):
+    # Sort and write the records; the file is written beside the target and then renamed over
+    # it, so a running reader never sees a half-written book
+    records = sorted(((key, -count, code) for (key, code), count in counts.items() if count >= min_count))
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER_FORMAT.pack(BOOK_MAGIC, 0, len(records)))
+        for key, negative_count, code in records:
+            f.write(RECORD_FORMAT.pack(key, code, min(-negative_count, 0xFFFF)))
+    os.replace(temporary_path, path)
+    return len(records)
+
+
+def build_book(games, path, max_plies=16, min_count=1, workers=None, batch_size=200):
+    # Count every (position, move) pair in the opening phase of the games and write the book.
+    # Batches go to a process pool with at most two per worker in flight, as in pgn.validate_games.
+    # Returns (records written, games rejected).
+    counts = Counter()
+    rejected = 0
+    if workers == 1:
+        for batch in batches(games, batch_size):
+            batch_counts, batch_rejected = count_batch(batch, max_plies)
+            counts.update(batch_counts)
+            rejected += batch_rejected
+        return write_book(counts, path, min_count), rejected
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for batch in batches(games, batch_size):
+            pending.add(pool.submit(count_batch, batch, max_plies))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_counts, batch_rejected = future.result()
+                    counts.update(batch_counts)
+                    rejected += batch_rejected
+        for future in pending:
+            batch_counts, batch_rejected = future.result()
+            counts.update(batch_counts)
+            rejected += batch_rejected
+    return write_book(counts, path, min_count), rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from a PGN file")
+    build.add_argument("pgn", help="PGN file, or - for stdin")
+    build.add_argument("book")
+    build.add_argument("--plies", type=int, default=16, help="opening plies taken from every game")
+    build.add_argument("--min-count", type=int, default=1, help="drop moves seen in fewer games")
+    build.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        stream = sys.stdin if args.pgn == "-" else open(args.pgn, encoding="utf-8", errors="replace")
+        with stream:
+            records, rejected = build_book(read_games(stream), args.book, args.plies, args.min_count, args.workers)
+        print(f"{records} records, {os.path.getsize(args.book)} bytes in {time.perf_counter() - start:.2f}s"
+              + (f", {rejected} games rejected for a bad FEN header" if rejected else ""))
+        return
+
+    start = time.perf_counter()
+    with OpeningBook(args.book) as book:
+        opened = time.perf_counter() - start
+        chess_set = load_fen(args.fen)
+        start = time.perf_counter()
+        entries = book.book_moves(chess_set.board, chess_set.current_player)
+        probed = time.perf_counter() - start
+        for move, weight in entries:
+            print(f"{move_name(*move)} {weight}")
+        print(f"{len(book)} records, opened in {opened * 1000:.3f}ms, probed in {probed * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
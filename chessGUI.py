@@ -1,486 +1,74 @@
+import argparse
+import threading
+import time
 import tkinter as tk 
 from tkinter import messagebox
 from tkinter import simpledialog
 
-class Position:
-    def __init__(self, row, col):
-        self.row = row
-        self.col = col
+from analysis import Analyser, game_positions
+from board_view import ButtonBoard, CanvasBoard
+from chess_core import (Board, ChessSet, IllegalMoveError, Pawn, Position, move_name, parse_square, square_name,
+                        PROMOTION_PIECES)
+from instrumentation import Profiler, summarize
+from search_executor import SearchExecutor
 
-    def __eq__(self, other):
-        if other is None:
-            return False
-        return self.row == other.row and self.col == other.col
-
-
-class Piece:
-    def __init__(self, color, board, position=None):
-        self.color = color
-        self.board = board
-        self.has_moved = False
-        self.position = position
-
-    def possible_moves(self):
-        pass
-
-    def move(self, end_pos):
-        possible_moves = self.possible_moves()
-        if end_pos in possible_moves:
-            if self.board.move_piece(self.position, end_pos):
-                self.has_moved = True
-                return True
-            else:
-                messagebox.showerror("Invalid move")
-                return False
-        else:
-            messagebox.showerror("Invalid move")
-            return False
-
-    def __str__(self):
-        pass
-
-
-class King(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "king"
-
-    def possible_moves(self):
-        moves = []
-        offsets = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, -1), (-1, 1), (1, 1), (-1, -1)]
-        for dr, dc in offsets:
-            new_pos = Position(self.position.row + dr, self.position.col + dc)
-            if self.board.is_inside_board(new_pos) and (
-                    self.board.is_square_empty(new_pos) or self.board.is_enemy_piece(new_pos, self.color)):
-                moves.append(new_pos)
-        # Castling
-        if not self.has_moved:
-            # Check kingside castling
-            if self.board.is_kingside_castle_possible(self.color):
-                moves.append(Position(self.position.row, self.position.col + 2))
-            # Check queenside castling
-            if self.board.is_queenside_castle_possible(self.color):
-                moves.append(Position(self.position.row, self.position.col - 2))
-        return moves
-
-    def __str__(self):
-        return "♔" if self.color == "White" else "♚"
-
-
-class Bishop(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "bishop"
-
-    def possible_moves(self):
-        directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
-        return self.board.get_directional_moves(self.position, directions, self.color)
-
-    def __str__(self):
-        return "♗" if self.color == "White" else "♝"
-
-
-class Pawn(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "pawn"
-        self.direction = 1 if self.color == "White" else -1
-        self.start_row = 1 if self.color == "White" else 6
-
-    def possible_moves(self):
-        moves = []
-        # Regular forward move
-        front_pos = Position(self.position.row + self.direction, self.position.col)
-        if self.board.is_inside_board(front_pos) and self.board.is_square_empty(front_pos):
-            moves.append(front_pos)
-            # Double move from starting position
-            if self.position.row == self.start_row:
-                double_front_pos = Position(self.position.row + 2 * self.direction, self.position.col)
-                if self.board.is_inside_board(double_front_pos) and self.board.is_square_empty(double_front_pos):
-                    moves.append(double_front_pos)
-        # Capturing moves
-        for dc in [-1, 1]:
-            diag_pos = Position(self.position.row + self.direction, self.position.col + dc)
-            if self.board.is_inside_board(diag_pos):
-                if self.board.is_enemy_piece(diag_pos, self.color) or diag_pos == self.board.en_passant_target:
-                    moves.append(diag_pos)
-
-        return moves
-
-    def __str__(self):
-        return "♙" if self.color == "White" else "♟️"
-
-
-class Rook(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "rook"
-
-    def possible_moves(self):
-        directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-        return self.board.get_directional_moves(self.position, directions, self.color)
-
-    def __str__(self):
-        return "♖" if self.color == "White" else "♜"
-
-
-class Knight(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "knight"
-
-    def possible_moves(self):
-        offsets = [(2, 1), (1, 2), (-2, 1), (1, -2), (-1, 2), (2, -1), (-2, -1), (-1, -2)]
-        moves = []
-        for dr, dc in offsets:
-            new_pos = Position(self.position.row + dr, self.position.col + dc)
-            if self.board.is_inside_board(new_pos) and (
-                    self.board.is_square_empty(new_pos) or self.board.is_enemy_piece(new_pos, self.color)):
-                moves.append(new_pos)
-        return moves
-
-    def __str__(self):
-        return "♘" if self.color == "White" else "♞"
-
-
-class Queen(Piece):
-    def __init__(self, color, board, position=None):
-        super().__init__(color, board, position)
-        self.piece_type = "queen"
-
-    def possible_moves(self):
-        directions = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
-        return self.board.get_directional_moves(self.position, directions, self.color)
-
-    def __str__(self):
-        return "♕" if self.color == "White" else "♛"
-
-
-class Board:
-    def __init__(self, gui=None):
-        self.board = [[None for _ in range(8)] for _ in range(8)]  # initialize the board
-        self.gui = gui
-        self.en_passant_target = None
-        
-    def place_piece(self, piece, position):
-        self.board[position.row][position.col] = piece
-        piece.position = position
-
-    def remove_piece(self, piece):
-        self.board[piece.position.row][piece.position.col] = None
-        piece.position = None
-
-    def move_piece(self, start_pos, end_pos):
-        moving_piece = self.board[start_pos.row][start_pos.col]
-        if not moving_piece:
-            messagebox.showerror("Invalid move", "No piece at the starting position.")
-            return False
-
-        if end_pos not in moving_piece.possible_moves():
-            messagebox.showerror("Invalid move", "The move is not allowed.")
-            return False
-
-        # Check if the move puts the king in check
-        if self.move_puts_self_in_check(moving_piece, end_pos):
-            messagebox.showerror("Invalid move", "This move would put or leave your king in check.")
-            return False
-
-        # If reaching here, the move is valid and can be processed
-        self.execute_move(moving_piece, start_pos, end_pos)
-
-        opponent_color = "White" if moving_piece.color == "Black" else "Black"
-        if self.is_check(opponent_color):
-            print("Check!")
-
-        return True
-
-    def execute_move(self, piece, start_pos, end_pos):
-        # Handle special pawn move for en passant capture
-        if isinstance(piece, Pawn) and end_pos == self.en_passant_target:
-            captured_pawn_row = start_pos.row
-            captured_pawn_col = end_pos.col
-            self.board[captured_pawn_row][captured_pawn_col] = None  # Remove the captured pawn
 
-        # Handle castling
-        if isinstance(piece, King) and abs(start_pos.col - end_pos.col) == 2:
-            self.handle_castling(piece, start_pos, end_pos)
-        else:
-            # Regular move or capture
-            self.board[start_pos.row][start_pos.col] = None
-            self.board[end_pos.row][end_pos.col] = piece
-            piece.position = end_pos
-            piece.has_moved = True
-
-        # Clear en passant target after the move is executed
-        if not isinstance(piece, Pawn) or abs(start_pos.row - end_pos.row) != 2:
-            self.en_passant_target = None
-
-        # Set en passant target if pawn moves two squares from its initial position
-        if isinstance(piece, Pawn) and abs(start_pos.row - end_pos.row) == 2:
-            middle_row = (start_pos.row + end_pos.row) // 2
-            self.en_passant_target = Position(middle_row, start_pos.col)
-    
-    def is_check(self, color):
-        king_position = self.get_king(color).position
-        return self.is_position_under_attack(king_position, color)
-
-    def move_puts_self_in_check(self, piece, end_pos):
-        original_position = piece.position
-        original_piece = self.board[end_pos.row][end_pos.col]
-
-        # Simulate move
-        self.board[original_position.row][original_position.col] = None
-        self.board[end_pos.row][end_pos.col] = piece
-        piece.position = end_pos
-
-        # Check if moving the piece puts the king in check
-        king = self.get_king(piece.color)
-        in_check = self.is_position_under_attack(king.position, piece.color)
-
-        # Revert move
-        self.board[original_position.row][original_position.col] = piece
-        self.board[end_pos.row][end_pos.col] = original_piece
-        piece.position = original_position
-
-        return in_check
-
-    def get_king(self, color):
-        for row in self.board:
-            for piece in row:
-                if isinstance(piece, King) and piece.color == color:
-                    return piece
-        return None
-
-    def is_position_under_attack(self, position, color):
-        for row in self.board:
-            for piece in row:
-                if piece and piece.color != color:
-                    if position in piece.possible_moves():
-                        return True
-        return False
-
-    def is_square_empty(self, position):
-        return self.board[position.row][position.col] is None
-
-    def is_enemy_piece(self, position, color):
-        piece = self.board[position.row][position.col]
-        return piece and piece.color != color
-
-    def is_inside_board(self, position):
-        return 0 <= position.row < 8 and 0 <= position.col < 8
-
-    def is_kingside_castle_possible(self, color):
-        king_row = 0 if color == "White" else 7
-        king_col = 4
-        rook_col = 7
-        return self.is_castling_possible(color, king_row, king_col, rook_col)
-
-    def is_queenside_castle_possible(self, color):
-        king_row = 0 if color == "White" else 7
-        king_col = 4
-        rook_col = 0
-        return self.is_castling_possible(color, king_row, king_col, rook_col)
-
-
-    def is_king_side_clear(self, row, king_col):
-        for col in range(king_col + 1, 7):
-            if not self.is_square_empty(Position(row, col)):
-                return False
-        return True
-
-    def is_queen_side_clear(self, row, king_col):
-        for col in range(1, king_col):
-            if not self.is_square_empty(Position(row, col)):
-                return False
-        return True
-    
-    def is_castling_possible(self, color, king_row, king_col, rook_col):
-        # Check if the king and rook have not moved
-        king = self.board[king_row][king_col]
-        rook = self.board[king_row][rook_col]
-        if not isinstance(king, King) or not isinstance(rook, Rook):
-            return False
-        if king.has_moved or rook.has_moved:
-            return False
-    
-        # Check if all squares between king and rook are empty
-        step = 1 if rook_col > king_col else -1
-        for col in range(king_col + step, rook_col, step):
-            if self.board[king_row][col] is not None:
-                return False
-    
-        # Check if the squares are not under attack
-        for col in range(king_col, rook_col + 1, step):
-            if self.is_position_under_attack(Position(king_row, col), color):
-                return False
-    
-        return True
-    
-    def get_directional_moves(self, position, directions, color):
-        moves = []
-        for dr, dc in directions:
-            for i in range(1, 8):
-                new_row = position.row + i * dr
-                new_col = position.col + i * dc
-                new_pos = Position(new_row, new_col)
-                if self.is_inside_board(new_pos):
-                    if self.is_square_empty(new_pos) or self.is_enemy_piece(new_pos, color):
-                        moves.append(new_pos)
-                        if not self.is_square_empty(new_pos) and self.is_enemy_piece(new_pos, color):
-                            break
-                    else:
-                        break
-                else:
-                    break
-        return moves
-    
-    def handle_castling(self, king, start_pos, end_pos):
-        # Determine if it's kingside or queenside castling
-        if end_pos.col == start_pos.col + 2:  # Kingside castling
-            rook_start_pos = Position(start_pos.row, 7)
-            rook_end_pos = Position(start_pos.row, end_pos.col - 1)
-        else:  # Queenside castling
-            rook_start_pos = Position(start_pos.row, 0)
-            rook_end_pos = Position(start_pos.row, end_pos.col + 1)
-    
-        # Move the king
-        self.board[start_pos.row][start_pos.col] = None
-        self.board[end_pos.row][end_pos.col] = king
-        king.position = end_pos
-        king.has_moved = True
-    
-        # Move the rook
-        rook = self.board[rook_start_pos.row][rook_start_pos.col]
-        self.board[rook_start_pos.row][rook_start_pos.col] = None
-        self.board[rook_end_pos.row][rook_end_pos.col] = rook
-        rook.position = rook_end_pos
-        rook.has_moved = True 
-    
-    
-    def get_piece_at(self, position):
-        return self.board[position.row][position.col]
-
-
-    def print_board(self):
-        print("  a b c d e f g h")
-        print(" +----------------")
-        for i, row in enumerate(self.board):
-            row_str = str(i) + "|"
-            for piece in row:
-                if piece:
-                    row_str += f"{piece} "
-                else:
-                    row_str += ". "
-            print(row_str)
-        print(" +----------------")
-        print("  a b c d e f g h")
-
-
-class ChessSet:
-    def __init__(self):
-        self.board = Board()
-        self.setup_board()
-        self.current_player = "White"
-
-    def setup_board(self):
-        piece_chesses = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
-        for i in range(8):
-            self.board.place_piece(Pawn("White", self.board), Position(1, i))
-            self.board.place_piece(Pawn("Black", self.board), Position(6, i))
-            self.board.place_piece(piece_chesses[i]("White", self.board), Position(0, i))
-            self.board.place_piece(piece_chesses[i]("Black", self.board), Position(7, i))
-
-    def print_board(self):
-        self.board.print_board()
-        
-
-    def is_checkmate(self, color):
-        # Check if the king is in check
-        if self.board.is_check(color):
-            # Check if there are any moves the player can make to get out of check
-            for row in self.board.board:
-                for piece in row:
-                    if piece and piece.color == color:
-                        possible_moves = piece.possible_moves()
-                        for move in possible_moves:
-                            if not self.board.move_puts_self_in_check(piece, move):
-                                return False
-            return True
-        return False
-    
-    def is_check(self, color):
-        king_position = self.get_king(color).position
-        return self.is_position_under_attack(king_position, color)
-    
-    def get_king(self, color):
-        for row in self.board.board:
-            for piece in row:
-                if isinstance(piece, King) and piece.color == color:
-                    return piece
-        return None
-    
-    def is_position_under_attack(self, position, color):
-        for row in self.board.board:
-            for piece in row:
-                if piece and piece.color != color:
-                    if position in piece.possible_moves():
-                        return True
-        return False
-    
-    def promote_pawn(self, position, color):
-        piece_types = ["bishop", "knight", "rook", "queen"]
-        promotion_choice = simpledialog.askstring("Pawn Promotion", f"Choose promotion for {color} pawn (bishop, knight, rook, queen):")
-        while promotion_choice.lower() not in piece_types:
-            messagebox.showerror("Invalid Promotion", "Invalid promotion choice. Choose from bishop, knight, rook, or queen.")
-            promotion_choice = simpledialog.askstring("Pawn Promotion", f"Choose promotion for {color} pawn (bishop, knight, rook, queen):")
-        piece_class = {
-            "bishop": Bishop,
-            "knight": Knight,
-            "rook": Rook,
-            "queen": Queen
-        }[promotion_choice.lower()]
-        self.board.remove_piece(self.board.get_piece_at(position))
-        self.board.place_piece(piece_class(color, self.board, position=position), position)
-        self.board.gui.update_board()
-        
-        # Switch turn to the opponent
-        self.board.gui.switch_turn()
-        self.board.gui.turn_label.config(text=f"{self.current_player}'s Turn")
-        
-    def switch_turn(self):
-        self.current_player = "Black" if self.current_player == "White" else "White"
-        self.board.gui.turn_label.config(text=f"{self.current_player}'s Turn")
-        
-        
-        
 class ChessGUI:
-    def __init__(self, root, chess_set):
+    def __init__(self, root, chess_set, engine=None, engine_color=None, engine_time=2.0, book=None, profiler=None,
+                 buttons=False):
         self.root = root
         self.root.title("Chess Game")
         self.chess_set = chess_set
-        self.create_board()
+        self.engine = engine
+        self.engine_color = engine_color
+        self.engine_time = engine_time
+        self.book = book
+        self.profiler = profiler
+        self.search_executor = SearchExecutor(engine) if engine else None
+        self.engine_thinking = False
+        self.analyser = None
+        self.analysis = None  # [PlyAnalysis] while stepping through an analysed game
+        self.analysis_result = None
+        self.analysis_summary = ""
+        self.redo_moves = []
+        self.redraw_count = 0
+        self.squares_redrawn = 0
+        self.redraw_time = 0.0
+        self.create_board(buttons)
 
-        self.current_player = "White"
         self.start_pos_entry = tk.Entry(root)
         self.end_pos_entry = tk.Entry(root)
         self.submit_button = tk.Button(root, text="Submit Move", command=self.submit_move)
+        self.take_back_button = tk.Button(root, text="Take Back", command=self.take_back)
         self.turn_label = tk.Label(root, text=f"{self.current_player}'s Turn")
         self.check_label = tk.Label(root, text="")
+        self.engine_label = tk.Label(root, text="")
+        self.book_label = tk.Label(root, text="")
+        self.profile_label = tk.Label(root, text="", justify=tk.LEFT)
+        self.move_now_button = tk.Button(root, text="Move Now", command=self.move_now)
+        self.cancel_search_button = tk.Button(root, text="Cancel Search", command=self.cancel_search)
+        self.analyse_button = tk.Button(root, text="Analyse Game", command=self.start_analysis)
+        self.previous_ply_button = tk.Button(root, text="< Previous Ply", command=self.previous_ply)
+        self.next_ply_button = tk.Button(root, text="Next Ply >", command=self.next_ply)
+        self.exit_analysis_button = tk.Button(root, text="Resume Game", command=self.exit_analysis)
+        self.analysis_label = tk.Label(root, text="", justify=tk.LEFT)
 
         self.setup_widgets()
         self.update_board()
-
-    def create_board(self):
-        self.board_frame = tk.Frame(root)
-        self.board_buttons = []
-        for i in range(8):
-            row_buttons = []
-            for j in range(8):
-                button = tk.Button(self.board_frame, width=4, height=2, command=lambda row=i, col=j: self.square_clicked(row, col))
-                button.grid(row=i, column=j)
-                row_buttons.append(button)
-            self.board_buttons.append(row_buttons)
-        self.board_frame.pack()
+        self.root.after(100, self.play_engine_move)
+
+    def create_board(self, buttons=False):
+        # One canvas with cached piece images, or the original grid of buttons if asked for or if
+        # this Tk cannot load PNG images
+        self.board_view = None
+        if not buttons:
+            try:
+                self.board_view = CanvasBoard(self.root, self.square_clicked, self.square_dropped, self.can_drag)
+            except tk.TclError:
+                self.board_view = None
+        if self.board_view is None:
+            self.board_view = ButtonBoard(self.root, self.square_clicked)
+        self.highlighted_squares = []
 
     def setup_widgets(self):
         start_pos_label = tk.Label(self.root, text="Start Position (e.g., 'a2'):")
@@ -490,115 +78,342 @@ class ChessGUI:
         end_pos_label.pack()
         self.end_pos_entry.pack()
         self.submit_button.pack()
+        self.take_back_button.pack()
+        self.analyse_button.pack()
         self.check_label.pack()
         self.turn_label.pack()
+        if self.book:
+            self.book_label.pack()
+        if self.profiler:
+            self.profile_label.pack()
+        if self.engine:
+            self.engine_label.pack()
+            self.move_now_button.pack()
+            self.cancel_search_button.pack()
 
     def square_clicked(self, row, col):
         position = Position(row, col)
         piece = self.chess_set.board.board[row][col]
         
         # Check if there's already a selected start position
-        if not self.start_pos_entry.get():
+        selected = self.start_pos_entry.get()
+        reselect = selected and piece and piece.color == self.current_player and \
+            position not in self.legal_destinations_from(selected)
+        if not selected or reselect:
             if piece and piece.color == self.current_player:
                 self.start_pos_entry.delete(0, tk.END)
-                self.start_pos_entry.insert(0, self.to_algebraic(position))
+                self.start_pos_entry.insert(0, square_name(position))
+                self.highlight_squares(self.chess_set.legal_destinations(self.current_player, position))
         else:
             # If there's a start position selected, select end position
             self.end_pos_entry.delete(0, tk.END)
-            self.end_pos_entry.insert(0, self.to_algebraic(position))
+            self.end_pos_entry.insert(0, square_name(position))
+
+    def can_drag(self, row, col):
+        piece = self.chess_set.board.board[row][col]
+        return piece is not None and piece.color == self.current_player and not self.engine_thinking and \
+            self.current_player != self.engine_color and not self.analysing
+
+    def square_dropped(self, start, end):
+        # A piece dragged from start to end (row, col); returns whether the move was played
+        start_pos, end_pos = Position(*start), Position(*end)
+        if not self.can_drag(*start) or not self.chess_set.is_legal_move(self.current_player, start_pos, end_pos):
+            return False
+        self.start_pos_entry.delete(0, tk.END)
+        self.start_pos_entry.insert(0, square_name(start_pos))
+        self.end_pos_entry.delete(0, tk.END)
+        self.end_pos_entry.insert(0, square_name(end_pos))
+        self.submit_move()
+        return True
+
+    def legal_destinations_from(self, algebraic_notation):
+        if len(algebraic_notation) != 2 or not algebraic_notation[1].isdigit():
+            return set()
+        position = parse_square(algebraic_notation)
+        if not self.chess_set.board.is_inside_board(position):
+            return set()
+        return self.chess_set.legal_destinations(self.current_player, position)
+
+    def highlight_squares(self, squares):
+        self.board_view.highlight({(position.row, position.col) for position in squares})
+        self.highlighted_squares = list(squares)
+
+    def clear_highlights(self):
+        self.board_view.highlight(set())
+        self.highlighted_squares = []
             
-    def promote_pawn(self, position, color):
-        piece_types = ["bishop", "knight", "rook", "queen"]
+    def ask_promotion(self, color):
+        piece_types = list(PROMOTION_PIECES)
         promotion_choice = simpledialog.askstring("Pawn Promotion", f"Choose promotion for {color} pawn (bishop, knight, rook, queen):")
-        while promotion_choice.lower() not in piece_types:
+        while promotion_choice is None or promotion_choice.lower() not in piece_types:
             messagebox.showerror("Invalid Promotion", "Invalid promotion choice. Choose from bishop, knight, rook, or queen.")
             promotion_choice = simpledialog.askstring("Pawn Promotion", f"Choose promotion for {color} pawn (bishop, knight, rook, queen):")
-        piece_class = {
-            "bishop": Bishop,
-            "knight": Knight,
-            "rook": Rook,
-            "queen": Queen
-        }[promotion_choice.lower()]
-        self.board.remove_piece(self.board.get_piece_at(position))
-        self.board.place_piece(piece_class(color, self.board, position=position), position)
-        self.board.gui.update_board()
-        
-        # Switch turn to the opponent
-        self.switch_turn()
-        self.board.gui.turn_label.config(text=f"{self.current_player}'s Turn")
-
-        
-    def switch_turn(self):
-        self.current_player = "Black" if self.current_player == "White" else "White"
-        self.chess_set.board.gui.turn_label.config(text=f"{self.current_player}'s Turn")
+        return promotion_choice.lower()
+
+    @property
+    def current_player(self):
+        # ChessSet owns the turn; the GUI never keeps a copy of its own
+        return self.chess_set.current_player
+
+    @property
+    def analysing(self):
+        # From start_analysis until exit_analysis, including while the result is still being
+        # computed: the game is frozen so the analysis keeps matching it ply for ply
+        return self.analysis is not None or self.analysis_result is not None
+
+    def show_turn(self, label):
+        # Refresh the turn display once ChessSet has moved on (or back); label names what happened
+        self.turn_label.config(text=f"{self.current_player}'s Turn")
+        if self.profiler:
+            self.update_profile_label(label)
     
             
     def submit_move(self):
+        if self.engine_thinking or self.analysing:
+            return
         start_pos = self.start_pos_entry.get()
         end_pos = self.end_pos_entry.get()
-        if self.is_valid_input(start_pos, end_pos):
-            start_pos = self.from_algebraic(start_pos)
-            end_pos = self.from_algebraic(end_pos)
-            if self.chess_set.board.move_piece(start_pos, end_pos):
-                piece_at_end_pos = self.chess_set.board.get_piece_at(end_pos)
-                if isinstance(piece_at_end_pos, Pawn):
-                    if (piece_at_end_pos.color == "White" and end_pos.row == 7) or \
-                       (piece_at_end_pos.color == "Black" and end_pos.row == 0):
-                        self.chess_set.promote_pawn(end_pos, piece_at_end_pos.color)
-                        return
-                    
-                self.chess_set.switch_turn()
-                self.update_board()
-                
-                if self.chess_set.is_check(self.current_player):
-                    if self.chess_set.is_checkmate(self.current_player):
-                        winning_player = "Black" if self.current_player == "White" else "White"
-                        messagebox.showinfo("Game Over", f"Checkmate! {winning_player} wins!")
-                        self.root.destroy()
-                    else:
-                        self.check_label.config(text="Check!")
-                else:
-                    self.check_label.config(text="")
-                    
-                # Check for pawn promotion
-                piece_at_end_pos = self.chess_set.board.get_piece_at(end_pos)
-                if isinstance(piece_at_end_pos, Pawn):
-                    # Check if the pawn reached the last rank
-                    if (piece_at_end_pos.color == "White" and end_pos.row == 7) or \
-                       (piece_at_end_pos.color == "Black" and end_pos.row == 0):
-                        self.chess_set.promote_pawn(end_pos, piece_at_end_pos.color)
-                        self.update_board()  # Update the board after promotion
-                        return  # Return to prevent further execution
-                    
-                self.current_player = "Black" if self.current_player == "White" else "White"
-                self.turn_label.config(text=f"{self.current_player}'s Turn")  # Update turn label
-                self.start_pos_entry.delete(0, tk.END)  # Clear start position entry
-                self.end_pos_entry.delete(0, tk.END)  # Clear end position entry
-                self.update_board()
-        else:
+        if not self.is_valid_input(start_pos, end_pos):
             messagebox.showerror("Invalid Input", "Invalid input format. Please enter positions in algebraic notation (e.g., 'a2').")
+            return
+        start_pos = parse_square(start_pos)
+        end_pos = parse_square(end_pos)
+        # The move list for this ply is already cached, so validating is a set lookup
+        board = self.chess_set.board
+        if not board.is_inside_board(start_pos) or not board.is_inside_board(end_pos) or \
+                not self.chess_set.is_legal_move(self.current_player, start_pos, end_pos):
+            messagebox.showerror("Invalid move", "The move is not allowed.")
+            return
+        piece = board.get_piece_at(start_pos)
+        promotion = None
+        if isinstance(piece, Pawn) and end_pos.row in (0, 7):
+            promotion = self.ask_promotion(piece.color)
+        self.chess_set.play_move(start_pos, end_pos, promotion)
+
+        self.clear_highlights()
+        self.start_pos_entry.delete(0, tk.END)  # Clear start position entry
+        self.end_pos_entry.delete(0, tk.END)  # Clear end position entry
+        self.show_turn(move_name(start_pos, end_pos, promotion))
+        self.update_board()
+        self.root.after(1, self.play_engine_move)
+
+    def take_back(self):
+        if self.analysing:
+            return
+        if self.engine_thinking:
+            self.cancel_search()
+        if not self.chess_set.undo_move():
+            return
+        # Against the engine, take back its reply as well so it is the human's turn again
+        if self.chess_set.current_player == self.engine_color:
+            self.chess_set.undo_move()
+        self.show_turn("take back")
+        self.clear_highlights()
+        self.start_pos_entry.delete(0, tk.END)
+        self.end_pos_entry.delete(0, tk.END)
+        self.update_board()
 
+    def play_engine_move(self):
+        # Start the engine thinking in the background; poll_search picks up the result
+        if self.engine is None or self.current_player != self.engine_color or self.engine_thinking or \
+                self.analysing:
+            return
+        self.search_executor.start(self.chess_set.board, self.engine_color, time_limit=self.engine_time)
+        self.engine_thinking = True
+        self.engine_label.config(text="Engine: thinking...")
+        self.root.after(16, self.poll_search)
+
+    def poll_search(self):
+        # Runs on the Tk thread about 60 times a second while the engine is thinking
+        if not self.engine_thinking:
+            return
+        for kind, result in self.search_executor.poll():
+            if kind == "info":
+                pv = " ".join(move_name(*move) for move in result.pv)
+                self.engine_label.config(text=f"Engine: depth {result.depth}, score {result.score}, "
+                                              f"{result.nodes_per_second} nodes/s, pv {pv}")
+            else:
+                self.engine_thinking = False
+                self.apply_engine_move(result)
+                return
+        self.root.after(16, self.poll_search)
+
+    def apply_engine_move(self, result):
+        if isinstance(result, Exception):
+            self.engine_label.config(text=f"Engine error: {result}")
+            return
+        if result.best_move is None:
+            return
+        start_pos, end_pos, promotion = result.best_move
+        try:
+            self.chess_set.play_move(start_pos, end_pos, promotion)
+        except IllegalMoveError as error:
+            messagebox.showerror("Engine error", str(error))
+            return
+        self.show_turn(move_name(*result.best_move))
+        if result.source != "search":
+            self.engine_label.config(text=f"Engine: played {move_name(*result.best_move)} from the {result.source}")
+        else:
+            self.engine_label.config(text=f"Engine: played {move_name(*result.best_move)} at depth {result.depth}, "
+                                          f"score {result.score}, {result.nodes_per_second} nodes/s")
+        self.update_board()
 
-
-    def update_board(self):
-        for i in range(8):
-            for j in range(8):
-                piece = self.chess_set.board.board[i][j]
-                if piece:
-                    self.board_buttons[i][j].config(text=str(piece))
-                else:
-                    self.board_buttons[i][j].config(text="")
-                    
-        if self.chess_set.is_check(self.current_player):
-            self.check_label.config(text="Check!")
+    def move_now(self):
+        if self.engine_thinking:
+            self.search_executor.move_now()
         else:
-            self.check_label.config(text="")
-        
-        if self.chess_set.is_checkmate(self.current_player):
+            self.play_engine_move()
+
+    def cancel_search(self):
+        if not self.engine_thinking:
+            return
+        self.search_executor.cancel()
+        self.engine_thinking = False
+        self.engine_label.config(text="Engine: search cancelled")
+
+    def update_board(self, full=False):
+        # Only squares touched since the last redraw are reconfigured, unless full is set
+        started = time.perf_counter()
+        board = self.chess_set.board
+        if full or self.redraw_count == 0:
+            squares = [(i, j) for i in range(8) for j in range(8)]
+        else:
+            squares = board.dirty_squares
+        for i, j in squares:
+            piece = board.board[i][j]
+            self.board_view.set_piece(i, j, piece)
+        self.squares_redrawn += len(squares)
+        board.dirty_squares = set()
+
+        status = self.chess_set.game_status(self.current_player)
+        self.check_label.config(text="Check!" if status in ("check", "checkmate") else "")
+        self.redraw_count += 1
+        elapsed = time.perf_counter() - started
+        self.redraw_time += elapsed
+        self.board_view.frame_times.append(elapsed)
+        if self.book:
+            self.update_book_label()
+        if self.analysing or status in ("check", "normal"):
+            return
+
+        if status == "checkmate":
             winning_player = "Black" if self.current_player == "White" else "White"
-            messagebox.showinfo("Game Over", f"Checkmate! {winning_player} Wins!")
+            message = f"Checkmate! {winning_player} Wins!"
+        elif status == "stalemate":
+            message = "Stalemate! The game is a draw."
+        else:
+            message = f"Draw by {status}."
+        # The game is kept so it can be stepped through with the engine's verdict on every move
+        if messagebox.askyesno("Game Over", f"{message}\n\nAnalyse the game?"):
+            self.start_analysis()
+        else:
             self.root.destroy()
 
+    def start_analysis(self):
+        # Positions are taken on the Tk thread; the searching happens on a worker thread that
+        # hands the game's PlyAnalysis list back through analysis_result
+        if self.analysing:
+            return
+        if self.engine_thinking:
+            self.cancel_search()
+        if self.analyser is None:
+            self.analyser = Analyser(position_cache=self.chess_set.position_cache)
+        positions, moves = game_positions(self.chess_set)
+        final_status = self.chess_set.game_status(self.current_player)
+        result = self.analysis_result = []
+        self.analysis_label.config(text=f"Analysing {len(positions)} positions...")
+        self.analysis_label.pack()
+        self.exit_analysis_button.pack()
+
+        def run():
+            # Appends to this analysis's own list, so a result that arrives after exit_analysis is dropped
+            result.append(self.analyser.analyse_positions(positions, moves, final_status))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(50, self.poll_analysis)
+
+    def poll_analysis(self):
+        if self.analysis_result is None:
+            return  # left with exit_analysis before the result came
+        if not self.analysis_result:
+            self.root.after(50, self.poll_analysis)
+            return
+        self.analysis = self.analysis_result[0]
+        self.analysis_result = None
+        self.redo_moves = []
+        self.previous_ply_button.pack()
+        self.next_ply_button.pack()
+        blunders = sum(1 for ply in self.analysis if ply.judgement == "blunder")
+        self.analysis_summary = f"{len(self.analysis) - 1} plies analysed, {blunders} blunders"
+        self.show_analysis()
+
+    def previous_ply(self):
+        # Stepping moves the real game back and forth, so the board grid redraws only what changed
+        if self.analysis is None or not self.chess_set.move_history:
+            return
+        self.redo_moves.append(self.chess_set.move_history[-1])
+        self.chess_set.undo_move()
+        self.show_analysis()
+
+    def next_ply(self):
+        if self.analysis is None or not self.redo_moves:
+            return
+        self.chess_set.play_move(*self.redo_moves.pop())
+        self.show_analysis()
+
+    def exit_analysis(self):
+        # Back to the game at its last ply; the analysis is kept by the Analyser, so analysing
+        # again later only searches the new positions
+        while self.redo_moves:
+            self.chess_set.play_move(*self.redo_moves.pop())
+        self.analysis = None
+        self.analysis_result = None
+        self.previous_ply_button.pack_forget()
+        self.next_ply_button.pack_forget()
+        self.exit_analysis_button.pack_forget()
+        self.analysis_label.pack_forget()
+        self.clear_highlights()
+        self.turn_label.config(text=f"{self.current_player}'s Turn")
+        self.update_board()
+        self.root.after(1, self.play_engine_move)
+
+    def show_analysis(self):
+        ply = self.analysis[len(self.chess_set.move_history)]
+        self.turn_label.config(text=f"{self.current_player}'s Turn")
+        self.update_board()
+        if ply.candidates:
+            best_start, best_end, _ = ply.candidates[0][0]
+            self.highlight_squares([best_start, best_end])
+        else:
+            self.clear_highlights()
+        self.analysis_label.config(text=f"{self.analysis_summary}\nPly {ply.ply}: {ply}")
+
+    def update_book_label(self):
+        # One binary search over the mapped book file per ply
+        entries = self.book.book_moves(self.chess_set.board, self.current_player)
+        moves = ", ".join(f"{move_name(*move)} ({weight})" for move, weight in entries[:5])
+        self.book_label.config(text=f"Book: {moves}" if moves else "Book: out of book")
+
+    def update_profile_label(self, label):
+        # Debug overlay: rules work done on the GUI thread since the previous move, including
+        # validating and playing the move just made
+        record = self.profiler.end_ply(label)
+        self.profile_label.config(text=f"{label}: {record['seconds'] * 1000:.2f} ms in rules code\n"
+                                       f"{summarize(record)}")
+
+    def redraw_stats(self):
+        # Frame times cover the latest redraws, resizes and drag steps of the board view
+        frames = sorted(self.board_view.frame_times)
+        return {
+            "renderer": type(self.board_view).__name__,
+            "redraws": self.redraw_count,
+            "squares_redrawn": self.squares_redrawn,
+            "seconds": self.redraw_time,
+            "ms_per_redraw": 1000 * self.redraw_time / self.redraw_count if self.redraw_count else 0.0,
+            "frame_ms_p50": 1000 * frames[len(frames) // 2] if frames else 0.0,
+            "frame_ms_p99": 1000 * frames[min(len(frames) - 1, int(0.99 * len(frames)))] if frames else 0.0,
+        }
+
     def is_valid_input(self, start_pos, end_pos):
         if len(start_pos) == len(end_pos) == 2 and start_pos[0].isalpha() and start_pos[1].isdigit() and \
                 end_pos[0].isalpha() and end_pos[1].isdigit():
@@ -606,21 +421,59 @@ class ChessGUI:
         else:
             return False
 
-    def from_algebraic(self, algebraic_notation):
-        col = ord(algebraic_notation[0]) - ord("a")
-        row = int(algebraic_notation[1])
-        return Position(row, col)
-
-    def to_algebraic(self, position):
-        col = chr(ord("a") + position.col)
-        row = str(position.row)
-        return col + row
-
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play chess in a Tk window")
+    parser.add_argument("--engine", choices=["White", "Black"], help="let the computer play this side")
+    parser.add_argument("--engine-time", type=float, default=2.0, help="seconds the computer thinks per move")
+    parser.add_argument("--bitboard", action="store_true", help="use the bitboard board backend")
+    parser.add_argument("--book", help="opening book file built with book.py")
+    parser.add_argument("--tablebase", help="directory of endgame tables built with tablebase.py")
+    parser.add_argument("--buttons", action="store_true", help="draw the board as a grid of buttons")
+    parser.add_argument("--profile", metavar="PREFIX",
+                        help="profile the rules code, show each move's cost and write PREFIX.json and PREFIX.folded")
+    parser.add_argument("--cache", help="position cache file to keep moves and engine results in between sessions")
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache:
+        from position_cache import PositionCache
+        cache = PositionCache(args.cache)
+
+    book = None
+    if args.book:
+        from book import OpeningBook
+        book = OpeningBook(args.book)
+
+    engine = None
+    if args.engine:
+        from engine import Engine
+        tablebase = None
+        if args.tablebase:
+            from tablebase import Tablebase
+            tablebase = Tablebase(args.tablebase)
+        engine = Engine(book=book, tablebase=tablebase, cache=cache)
+
+    board_class = Board
+    if args.bitboard:
+        from bitboard import BitBoard
+        board_class = BitBoard
+
+    profiler = None
+    if args.profile:
+        profiler = Profiler()
+        profiler.enable()
+
     root = tk.Tk()
-    chess_set = ChessSet()
-    chess_gui = ChessGUI(root, chess_set)
-    chess_gui.chess_set.board.gui = chess_gui
-    chess_set.board.gui = chess_gui
+    chess_set = ChessSet(board_class)
+    chess_set.position_cache = cache
+    chess_gui = ChessGUI(root, chess_set, engine, args.engine, args.engine_time, book, profiler, args.buttons)
     root.mainloop()
+    print("Redraw stats:", chess_gui.redraw_stats())
+    if cache:
+        print("Position cache:", cache.stats())
+        cache.close()
+    if profiler:
+        profiler.disable()
+        profiler.export_json(args.profile + ".json")
+        profiler.export_folded(args.profile + ".folded")
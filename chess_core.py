@@ -0,0 +1,959 @@
+import random
+
+class IllegalMoveError(ValueError):
+    pass
+
+
+class Position:
+    # Immutable square. Position(row, col) on the board returns one of the 64 shared instances
+    # in SQUARES, so squares are compared by identity first, hash by index and can go in sets.
+    # Off-board coordinates still get a (throwaway) object so bounds checks keep working.
+    __slots__ = ("row", "col", "index")
+
+    def __new__(cls, row, col):
+        if 0 <= row < 8 and 0 <= col < 8:
+            return SQUARES[row * 8 + col]
+        return cls.create(row, col)
+
+    @classmethod
+    def create(cls, row, col):
+        position = object.__new__(cls)
+        object.__setattr__(position, "row", row)
+        object.__setattr__(position, "col", col)
+        object.__setattr__(position, "index", row * 8 + col)
+        return position
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if other is None:
+            return False
+        return self.row == other.row and self.col == other.col
+
+    def __hash__(self):
+        return self.index
+
+    def __reduce__(self):
+        return Position, (self.row, self.col)
+
+    def __repr__(self):
+        return f"Position({self.row}, {self.col})"
+
+
+SQUARES = [Position.create(index // 8, index % 8) for index in range(64)]
+
+
+def square_name(position):
+    # Standard coordinates: row 0 is rank 1 and col 0 is the a-file
+    return chr(ord("a") + position.col) + str(position.row + 1)
+
+
+def parse_square(name):
+    return Position(int(name[1]) - 1, ord(name[0]) - ord("a"))
+
+
+def move_name(start_pos, end_pos, promotion=None):
+    # Long algebraic form such as "e2e4" or "e7e8q"
+    suffix = {"queen": "q", "rook": "r", "bishop": "b", "knight": "n"}[promotion] if promotion else ""
+    return square_name(start_pos) + square_name(end_pos) + suffix
+
+
+def parse_move(name):
+    # Inverse of move_name; raises IllegalMoveError for anything that is not a move on the board
+    promotions = {"q": "queen", "r": "rook", "b": "bishop", "n": "knight"}
+    if len(name) not in (4, 5) or (len(name) == 5 and name[4] not in promotions) or \
+            any(name[i] not in "abcdefgh" or name[i + 1] not in "12345678" for i in (0, 2)):
+        raise IllegalMoveError(f"Not a move: {name!r}.")
+    return parse_square(name[0:2]), parse_square(name[2:4]), promotions.get(name[4:])
+
+
+KNIGHT_OFFSETS = [(2, 1), (1, 2), (-2, 1), (1, -2), (-1, 2), (2, -1), (-2, -1), (-1, -2)]
+KING_OFFSETS = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, -1), (-1, 1), (1, 1), (-1, -1)]
+ROOK_DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def build_jump_table(offsets):
+    # For every square (row * 8 + col), the on-board squares one jump away
+    table = []
+    for row in range(8):
+        for col in range(8):
+            table.append([(row + dr, col + dc) for dr, dc in offsets
+                          if 0 <= row + dr < 8 and 0 <= col + dc < 8])
+    return table
+
+
+def build_ray_table(directions):
+    # For every square, one list of squares per direction ordered outward from it
+    table = []
+    for row in range(8):
+        for col in range(8):
+            rays = []
+            for dr, dc in directions:
+                ray = []
+                r, c = row + dr, col + dc
+                while 0 <= r < 8 and 0 <= c < 8:
+                    ray.append((r, c))
+                    r, c = r + dr, c + dc
+                if ray:
+                    rays.append(ray)
+            table.append(rays)
+    return table
+
+
+KNIGHT_ATTACKS = build_jump_table(KNIGHT_OFFSETS)
+KING_ATTACKS = build_jump_table(KING_OFFSETS)
+ROOK_RAYS = build_ray_table(ROOK_DIRECTIONS)
+BISHOP_RAYS = build_ray_table(BISHOP_DIRECTIONS)
+# Squares an enemy pawn has to stand on to attack a square owned by the given color
+PAWN_ATTACKERS = {
+    "White": build_jump_table([(1, -1), (1, 1)]),
+    "Black": build_jump_table([(-1, -1), (-1, 1)]),
+}
+
+
+# The same tables holding the shared Position objects instead of (row, col) pairs
+KNIGHT_SQUARES = [[SQUARES[row * 8 + col] for row, col in targets] for targets in KNIGHT_ATTACKS]
+KING_SQUARES = [[SQUARES[row * 8 + col] for row, col in targets] for targets in KING_ATTACKS]
+
+
+def build_direction_rays():
+    # {(dr, dc): for every square, the squares in that direction ordered outward}
+    rays = {}
+    for dr, dc in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+        table = []
+        for square in SQUARES:
+            ray = []
+            row, col = square.row + dr, square.col + dc
+            while 0 <= row < 8 and 0 <= col < 8:
+                ray.append(SQUARES[row * 8 + col])
+                row, col = row + dr, col + dc
+            table.append(ray)
+        rays[(dr, dc)] = table
+    return rays
+
+
+DIRECTION_RAYS = build_direction_rays()
+# The enemy pieces that attack along each direction
+RAY_SLIDERS = [(direction, ("rook", "queen")) for direction in ROOK_DIRECTIONS] + \
+    [(direction, ("bishop", "queen")) for direction in BISHOP_DIRECTIONS]
+
+
+class Piece:
+    # __slots__ keeps pieces free of a per-instance dict; piece_type is a class attribute
+    __slots__ = ("color", "board", "has_moved", "position")
+    piece_type = None
+
+    def __init__(self, color, board, position=None):
+        self.color = color
+        self.board = board
+        self.has_moved = False
+        self.position = position
+
+    def possible_moves(self):
+        pass
+
+    def move(self, end_pos):
+        try:
+            self.board.move_piece(self.position, end_pos)
+        except IllegalMoveError:
+            return False
+        return True
+
+    def __str__(self):
+        pass
+
+
+class King(Piece):
+    __slots__ = ()
+    piece_type = "king"
+
+    def possible_moves(self):
+        board = self.board.board
+        moves = [target for target in KING_SQUARES[self.position.index]
+                 if board[target.row][target.col] is None or board[target.row][target.col].color != self.color]
+        # Castling
+        if not self.has_moved:
+            # Check kingside castling
+            if self.board.is_kingside_castle_possible(self.color):
+                moves.append(Position(self.position.row, self.position.col + 2))
+            # Check queenside castling
+            if self.board.is_queenside_castle_possible(self.color):
+                moves.append(Position(self.position.row, self.position.col - 2))
+        return moves
+
+    def __str__(self):
+        return "♔" if self.color == "White" else "♚"
+
+
+class Bishop(Piece):
+    __slots__ = ()
+    piece_type = "bishop"
+
+    def possible_moves(self):
+        return self.board.get_directional_moves(self.position, BISHOP_DIRECTIONS, self.color)
+
+    def __str__(self):
+        return "♗" if self.color == "White" else "♝"
+
+
+class Pawn(Piece):
+    __slots__ = ("direction", "start_row")
+    piece_type = "pawn"
+
+    def __init__(self, color, board, position=None):
+        super().__init__(color, board, position)
+        self.direction = 1 if self.color == "White" else -1
+        self.start_row = 1 if self.color == "White" else 6
+
+    def possible_moves(self):
+        moves = []
+        # Regular forward move
+        front_pos = Position(self.position.row + self.direction, self.position.col)
+        if self.board.is_inside_board(front_pos) and self.board.is_square_empty(front_pos):
+            moves.append(front_pos)
+            # Double move from starting position
+            if self.position.row == self.start_row:
+                double_front_pos = Position(self.position.row + 2 * self.direction, self.position.col)
+                if self.board.is_inside_board(double_front_pos) and self.board.is_square_empty(double_front_pos):
+                    moves.append(double_front_pos)
+        # Capturing moves
+        for dc in [-1, 1]:
+            diag_pos = Position(self.position.row + self.direction, self.position.col + dc)
+            if self.board.is_inside_board(diag_pos):
+                if self.board.is_enemy_piece(diag_pos, self.color) or diag_pos == self.board.en_passant_target:
+                    moves.append(diag_pos)
+
+        return moves
+
+    def __str__(self):
+        return "♙" if self.color == "White" else "♟"
+
+
+class Rook(Piece):
+    __slots__ = ()
+    piece_type = "rook"
+
+    def possible_moves(self):
+        return self.board.get_directional_moves(self.position, ROOK_DIRECTIONS, self.color)
+
+    def __str__(self):
+        return "♖" if self.color == "White" else "♜"
+
+
+class Knight(Piece):
+    __slots__ = ()
+    piece_type = "knight"
+
+    def possible_moves(self):
+        board = self.board.board
+        return [target for target in KNIGHT_SQUARES[self.position.index]
+                if board[target.row][target.col] is None or board[target.row][target.col].color != self.color]
+
+    def __str__(self):
+        return "♘" if self.color == "White" else "♞"
+
+
+class Queen(Piece):
+    __slots__ = ()
+    piece_type = "queen"
+
+    def possible_moves(self):
+        return self.board.get_directional_moves(self.position, ROOK_DIRECTIONS + BISHOP_DIRECTIONS, self.color)
+
+    def __str__(self):
+        return "♕" if self.color == "White" else "♛"
+
+
+def build_zobrist_tables(seed=20240917):
+    # Fixed seed so position keys are stable between runs and can be stored on disk
+    rng = random.Random(seed)
+    pieces = {}
+    for color in ("White", "Black"):
+        for piece_type in ("pawn", "knight", "bishop", "rook", "queen", "king"):
+            pieces[(color, piece_type)] = [rng.getrandbits(64) for _ in range(64)]
+    castling = [rng.getrandbits(64) for _ in range(4)]
+    en_passant = [rng.getrandbits(64) for _ in range(8)]
+    black_to_move = rng.getrandbits(64)
+    return pieces, castling, en_passant, black_to_move
+
+
+ZOBRIST_PIECES, ZOBRIST_CASTLING, ZOBRIST_EN_PASSANT, ZOBRIST_BLACK_TO_MOVE = build_zobrist_tables()
+# Castling right bits, in the same order as ZOBRIST_CASTLING
+WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE = 1, 2, 4, 8
+CASTLING_SQUARES = {(0, 0), (0, 4), (0, 7), (7, 0), (7, 4), (7, 7)}
+
+
+PROMOTION_PIECES = {
+    "bishop": Bishop,
+    "knight": Knight,
+    "rook": Rook,
+    "queen": Queen
+}
+
+
+class Board:
+    # Set to True to cross-check the incremental zobrist key against a full recompute on every move
+    debug_zobrist = False
+
+    def __init__(self):
+        self.board = [[None for _ in range(8)] for _ in range(8)]  # initialize the board
+        self.en_passant_target = None
+        self.move_stack = []  # undo records pushed by make_move
+        self.zobrist_key = 0  # kept up to date by set_square and make_move
+        self.dirty_squares = set()  # (row, col) changed by real moves since the GUI last redrew
+        
+    def set_square(self, row, col, piece):
+        # Every change to the board goes through here so subclasses can keep extra state in sync
+        square = row * 8 + col
+        old_piece = self.board[row][col]
+        if old_piece:
+            self.zobrist_key ^= ZOBRIST_PIECES[(old_piece.color, old_piece.piece_type)][square]
+        if piece:
+            self.zobrist_key ^= ZOBRIST_PIECES[(piece.color, piece.piece_type)][square]
+        self.board[row][col] = piece
+
+    def place_piece(self, piece, position):
+        self.set_square(position.row, position.col, piece)
+        piece.position = position
+        self.dirty_squares.add((position.row, position.col))
+
+    def remove_piece(self, piece):
+        self.set_square(piece.position.row, piece.position.col, None)
+        self.dirty_squares.add((piece.position.row, piece.position.col))
+        piece.position = None
+
+    def move_piece(self, start_pos, end_pos, promotion=None):
+        # Play a move after checking it; raises IllegalMoveError with the reason if it is not allowed
+        moving_piece = self.board[start_pos.row][start_pos.col]
+        if not moving_piece:
+            raise IllegalMoveError("No piece at the starting position.")
+
+        if end_pos not in moving_piece.possible_moves():
+            raise IllegalMoveError("The move is not allowed.")
+
+        # Check if the move puts the king in check
+        if end_pos not in self.legal_targets(moving_piece):
+            raise IllegalMoveError("This move would put or leave your king in check.")
+
+        if promotion is not None and promotion not in PROMOTION_PIECES:
+            raise IllegalMoveError(f"Invalid promotion choice: {promotion}.")
+
+        # If reaching here, the move is valid and can be processed
+        self.execute_move(moving_piece, start_pos, end_pos, promotion)
+        return True
+
+    def execute_move(self, piece, start_pos, end_pos, promotion=None):
+        # A move that is really played, as opposed to one simulated by make_move for a legality test
+        self.make_move(start_pos, end_pos, promotion)
+        self.dirty_squares.update(self.last_move_squares())
+
+    def last_move_squares(self):
+        # Squares touched by the move on top of the undo stack, castling rook and en passant included
+        piece, start_pos, end_pos = self.move_stack[-1][:3]
+        captured_pos, rook = self.move_stack[-1][7:9]
+        squares = {(start_pos.row, start_pos.col), (end_pos.row, end_pos.col), (captured_pos.row, captured_pos.col)}
+        if rook:
+            squares.add((start_pos.row, 7 if end_pos.col > start_pos.col else 0))
+            squares.add((rook.position.row, rook.position.col))
+        return squares
+
+    def make_move(self, start_pos, end_pos, promotion=None):
+        # Play a move without any legality checks and push what is needed to take it back
+        piece = self.board[start_pos.row][start_pos.col]
+        captured = self.board[end_pos.row][end_pos.col]
+        captured_pos = end_pos
+        rook = None
+        rook_has_moved = False
+        undo = (piece, start_pos, end_pos, piece.has_moved, self.en_passant_target, self.zobrist_key)
+        # Castling rights can only change when a king or rook home square is touched
+        touches_castling = (start_pos.row, start_pos.col) in CASTLING_SQUARES or \
+            (end_pos.row, end_pos.col) in CASTLING_SQUARES
+        castling_before = self.castling_rights() if touches_castling else 0
+        en_passant_key_before = self.en_passant_key() if self.en_passant_target else 0
+
+        # Handle special pawn move for en passant capture
+        if isinstance(piece, Pawn) and end_pos == self.en_passant_target and captured is None:
+            captured_pos = Position(start_pos.row, end_pos.col)
+            captured = self.board[captured_pos.row][captured_pos.col]
+            self.set_square(captured_pos.row, captured_pos.col, None)  # Remove the captured pawn
+
+        # Handle castling
+        if isinstance(piece, King) and abs(start_pos.col - end_pos.col) == 2:
+            rook = self.board[start_pos.row][7 if end_pos.col > start_pos.col else 0]
+            rook_has_moved = rook.has_moved
+            self.handle_castling(piece, start_pos, end_pos)
+        else:
+            # Regular move or capture
+            self.set_square(start_pos.row, start_pos.col, None)
+            self.set_square(end_pos.row, end_pos.col, piece)
+            piece.position = end_pos
+            piece.has_moved = True
+        if captured:
+            captured.position = None
+
+        # Clear en passant target after the move is executed
+        if not isinstance(piece, Pawn) or abs(start_pos.row - end_pos.row) != 2:
+            self.en_passant_target = None
+
+        # Set en passant target if pawn moves two squares from its initial position
+        if isinstance(piece, Pawn) and abs(start_pos.row - end_pos.row) == 2:
+            middle_row = (start_pos.row + end_pos.row) // 2
+            self.en_passant_target = Position(middle_row, start_pos.col)
+
+        if promotion and isinstance(piece, Pawn) and end_pos.row in (0, 7):
+            self.set_square(end_pos.row, end_pos.col, PROMOTION_PIECES[promotion](piece.color, self, position=end_pos))
+
+        # Pieces were hashed in set_square, the rest of the key changes here
+        if touches_castling:
+            castling_changed = castling_before ^ self.castling_rights()
+            for bit in range(4):
+                if castling_changed & (1 << bit):
+                    self.zobrist_key ^= ZOBRIST_CASTLING[bit]
+        if self.en_passant_target:
+            en_passant_key_before ^= self.en_passant_key()
+        self.zobrist_key ^= en_passant_key_before ^ ZOBRIST_BLACK_TO_MOVE
+
+        self.move_stack.append(undo + (captured, captured_pos, rook, rook_has_moved))
+        if self.debug_zobrist:
+            self.check_zobrist_key("White" if piece.color == "Black" else "Black")
+
+    def unmake_move(self):
+        # Take back the last make_move and return the piece that had moved, or None
+        if not self.move_stack:
+            return None
+        piece, start_pos, end_pos, has_moved, en_passant_target, zobrist_key, captured, captured_pos, rook, \
+            rook_has_moved = self.move_stack.pop()
+
+        # Clearing the end square also drops a piece the pawn was promoted to
+        self.set_square(end_pos.row, end_pos.col, None)
+        self.set_square(start_pos.row, start_pos.col, piece)
+        piece.position = start_pos
+        piece.has_moved = has_moved
+
+        if rook:
+            rook_start_col = 7 if end_pos.col > start_pos.col else 0
+            self.set_square(rook.position.row, rook.position.col, None)
+            self.set_square(start_pos.row, rook_start_col, rook)
+            rook.position = Position(start_pos.row, rook_start_col)
+            rook.has_moved = rook_has_moved
+
+        if captured:
+            self.set_square(captured_pos.row, captured_pos.col, captured)
+            captured.position = captured_pos
+
+        self.en_passant_target = en_passant_target
+        self.zobrist_key = zobrist_key
+        if self.debug_zobrist:
+            self.check_zobrist_key(piece.color)
+        return piece
+
+    def copy(self):
+        # Independent board with the same pieces, flags and key but no undo history
+        clone = type(self)()
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    new_piece = type(piece)(piece.color, clone)
+                    new_piece.has_moved = piece.has_moved
+                    clone.place_piece(new_piece, Position(row, col))
+        clone.en_passant_target = self.en_passant_target
+        clone.zobrist_key = self.zobrist_key
+        return clone
+
+    def castling_rights(self):
+        # Castling rights as WHITE_KINGSIDE | ... bits, derived from the has_moved flags
+        rights = 0
+        for color, row, kingside, queenside in (("White", 0, WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                                ("Black", 7, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+            king = self.board[row][4]
+            if not isinstance(king, King) or king.color != color or king.has_moved:
+                continue
+            for bit, rook_col in ((kingside, 7), (queenside, 0)):
+                rook = self.board[row][rook_col]
+                if isinstance(rook, Rook) and rook.color == color and not rook.has_moved:
+                    rights |= bit
+        return rights
+
+    def en_passant_key(self):
+        # Only hash the en passant square when a pawn can actually capture there
+        target = self.en_passant_target
+        if target is None:
+            return 0
+        pawn_row, color = (3, "Black") if target.row == 2 else (4, "White")
+        for col in (target.col - 1, target.col + 1):
+            if 0 <= col < 8:
+                piece = self.board[pawn_row][col]
+                if isinstance(piece, Pawn) and piece.color == color:
+                    return ZOBRIST_EN_PASSANT[target.col]
+        return 0
+
+    def compute_zobrist_key(self, color):
+        # Full recompute for color to move, used to set the key up and to check the incremental one
+        key = 0
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    key ^= ZOBRIST_PIECES[(piece.color, piece.piece_type)][row * 8 + col]
+        rights = self.castling_rights()
+        for bit in range(4):
+            if rights & (1 << bit):
+                key ^= ZOBRIST_CASTLING[bit]
+        key ^= self.en_passant_key()
+        if color == "Black":
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key
+
+    def check_zobrist_key(self, color):
+        expected = self.compute_zobrist_key(color)
+        if self.zobrist_key != expected:
+            raise RuntimeError(f"Incremental zobrist key {self.zobrist_key:016x} does not match {expected:016x}")
+
+    def legal_moves(self, color):
+        # Every legal (start_pos, end_pos, promotion) for color; promotions are listed once per piece type
+        state = self.check_state(color)
+        moves = []
+        for row in self.board:
+            for piece in row:
+                if piece and piece.color == color:
+                    start_pos = piece.position
+                    for end_pos in self.legal_targets(piece, state):
+                        if isinstance(piece, Pawn) and end_pos.row in (0, 7):
+                            moves.extend((start_pos, end_pos, promotion) for promotion in PROMOTION_PIECES)
+                        else:
+                            moves.append((start_pos, end_pos, None))
+        return moves
+
+    def check_state(self, color):
+        # What the king of color is exposed to, worked out once per position:
+        # (king, checkers, evasions, pins, unsafe) where checkers are the enemy pieces giving check,
+        # evasions the squares a non-king move must end on to answer a single check (the checker and
+        # the squares between it and the king), pins maps the position of each piece pinned to the
+        # king to the squares of its pin line, pinner included, and unsafe holds the squares behind
+        # the king on the line of a checking slider, which the king still blocks while it stands there
+        king = self.get_king(color)
+        checkers = []
+        evasions = set()
+        pins = {}
+        unsafe = set()
+        if king is None:
+            return king, checkers, evasions, pins, unsafe
+        board = self.board
+        square = king.position.index
+        for row, col in KNIGHT_ATTACKS[square]:
+            piece = board[row][col]
+            if piece and piece.color != color and piece.piece_type == "knight":
+                checkers.append(piece)
+                evasions.add(piece.position)
+        for row, col in PAWN_ATTACKERS[color][square]:
+            piece = board[row][col]
+            if piece and piece.color != color and piece.piece_type == "pawn":
+                checkers.append(piece)
+                evasions.add(piece.position)
+        for direction, sliders in RAY_SLIDERS:
+            ray = DIRECTION_RAYS[direction][square]
+            shield = None
+            for index, target in enumerate(ray):
+                piece = board[target.row][target.col]
+                if piece is None:
+                    continue
+                if piece.color == color:
+                    if shield is not None:
+                        break
+                    shield = piece
+                    continue
+                if piece.piece_type in sliders:
+                    if shield is None:
+                        checkers.append(piece)
+                        evasions.update(ray[:index + 1])
+                        behind = (king.position.row - direction[0], king.position.col - direction[1])
+                        if 0 <= behind[0] < 8 and 0 <= behind[1] < 8:
+                            unsafe.add(SQUARES[behind[0] * 8 + behind[1]])
+                    else:
+                        pins[shield.position] = set(ray[:index + 1])
+                break
+        return king, checkers, evasions, pins, unsafe
+
+    def legal_targets(self, piece, state=None):
+        # The squares piece may legally move to, filtered through check_state instead of trying
+        # every move on the board
+        king, checkers, evasions, pins, unsafe = state or self.check_state(piece.color)
+        start_pos = piece.position
+        if piece is king:
+            # Castling moves come back from possible_moves only when no square the king passes is attacked
+            return [end_pos for end_pos in piece.possible_moves()
+                    if abs(end_pos.col - start_pos.col) == 2
+                    or (end_pos not in unsafe and not self.is_position_under_attack(end_pos, piece.color))]
+        if len(checkers) > 1:
+            return []  # double check: only the king can move
+        pin = pins.get(start_pos)
+        targets = []
+        for end_pos in piece.possible_moves():
+            if end_pos == self.en_passant_target and piece.piece_type == "pawn" and end_pos.col != start_pos.col:
+                # En passant empties two squares at once, which can open the king's rank or a
+                # diagonal that no pin describes, so it is the one move still tried on the board
+                if not self.move_puts_self_in_check(piece, end_pos):
+                    targets.append(end_pos)
+                continue
+            if pin is not None and end_pos not in pin:
+                continue
+            if checkers and end_pos not in evasions:
+                continue
+            targets.append(end_pos)
+        return targets
+
+    def is_check(self, color):
+        king_position = self.get_king(color).position
+        return self.is_position_under_attack(king_position, color)
+
+    def move_puts_self_in_check(self, piece, end_pos):
+        self.make_move(piece.position, end_pos)
+        in_check = self.is_check(piece.color)
+        self.unmake_move()
+        return in_check
+
+    def get_king(self, color):
+        for row in self.board:
+            for piece in row:
+                if isinstance(piece, King) and piece.color == color:
+                    return piece
+        return None
+
+    def is_position_under_attack(self, position, color):
+        # Look outward from the target square instead of generating every enemy move
+        board = self.board
+        square = position.row * 8 + position.col
+        for row, col in KNIGHT_ATTACKS[square]:
+            piece = board[row][col]
+            if piece and piece.color != color and piece.piece_type == "knight":
+                return True
+        for row, col in PAWN_ATTACKERS[color][square]:
+            piece = board[row][col]
+            if piece and piece.color != color and piece.piece_type == "pawn":
+                return True
+        for row, col in KING_ATTACKS[square]:
+            piece = board[row][col]
+            if piece and piece.color != color and piece.piece_type == "king":
+                return True
+        for ray in ROOK_RAYS[square]:
+            for row, col in ray:
+                piece = board[row][col]
+                if piece:
+                    if piece.color != color and piece.piece_type in ("rook", "queen"):
+                        return True
+                    break
+        for ray in BISHOP_RAYS[square]:
+            for row, col in ray:
+                piece = board[row][col]
+                if piece:
+                    if piece.color != color and piece.piece_type in ("bishop", "queen"):
+                        return True
+                    break
+        return False
+
+    def is_square_empty(self, position):
+        return self.board[position.row][position.col] is None
+
+    def is_enemy_piece(self, position, color):
+        piece = self.board[position.row][position.col]
+        return piece and piece.color != color
+
+    def is_inside_board(self, position):
+        return 0 <= position.row < 8 and 0 <= position.col < 8
+
+    def is_kingside_castle_possible(self, color):
+        king_row = 0 if color == "White" else 7
+        king_col = 4
+        rook_col = 7
+        return self.is_castling_possible(color, king_row, king_col, rook_col)
+
+    def is_queenside_castle_possible(self, color):
+        king_row = 0 if color == "White" else 7
+        king_col = 4
+        rook_col = 0
+        return self.is_castling_possible(color, king_row, king_col, rook_col)
+
+
+    def is_king_side_clear(self, row, king_col):
+        for col in range(king_col + 1, 7):
+            if not self.is_square_empty(Position(row, col)):
+                return False
+        return True
+
+    def is_queen_side_clear(self, row, king_col):
+        for col in range(1, king_col):
+            if not self.is_square_empty(Position(row, col)):
+                return False
+        return True
+    
+    def is_castling_possible(self, color, king_row, king_col, rook_col):
+        # Check if the king and rook have not moved
+        king = self.board[king_row][king_col]
+        rook = self.board[king_row][rook_col]
+        if not isinstance(king, King) or not isinstance(rook, Rook):
+            return False
+        if king.color != color or rook.color != color:
+            return False
+        if king.has_moved or rook.has_moved:
+            return False
+    
+        # Check if all squares between king and rook are empty
+        step = 1 if rook_col > king_col else -1
+        for col in range(king_col + step, rook_col, step):
+            if self.board[king_row][col] is not None:
+                return False
+    
+        # Check that the squares the king starts on, crosses and lands on are not under attack
+        for col in range(king_col, king_col + 3 * step, step):
+            if self.is_position_under_attack(Position(king_row, col), color):
+                return False
+    
+        return True
+    
+    def get_directional_moves(self, position, directions, color):
+        # Walk the precomputed rays, stopping at the first piece and keeping it if it is an enemy
+        board = self.board
+        moves = []
+        for direction in directions:
+            for target in DIRECTION_RAYS[direction][position.index]:
+                piece = board[target.row][target.col]
+                if piece is None:
+                    moves.append(target)
+                    continue
+                if piece.color != color:
+                    moves.append(target)
+                break
+        return moves
+
+    def handle_castling(self, king, start_pos, end_pos):
+        # Determine if it's kingside or queenside castling
+        if end_pos.col == start_pos.col + 2:  # Kingside castling
+            rook_start_pos = Position(start_pos.row, 7)
+            rook_end_pos = Position(start_pos.row, end_pos.col - 1)
+        else:  # Queenside castling
+            rook_start_pos = Position(start_pos.row, 0)
+            rook_end_pos = Position(start_pos.row, end_pos.col + 1)
+    
+        # Move the king
+        self.set_square(start_pos.row, start_pos.col, None)
+        self.set_square(end_pos.row, end_pos.col, king)
+        king.position = end_pos
+        king.has_moved = True
+    
+        # Move the rook
+        rook = self.board[rook_start_pos.row][rook_start_pos.col]
+        self.set_square(rook_start_pos.row, rook_start_pos.col, None)
+        self.set_square(rook_end_pos.row, rook_end_pos.col, rook)
+        rook.position = rook_end_pos
+        rook.has_moved = True 
+    
+    
+    def get_piece_at(self, position):
+        return self.board[position.row][position.col]
+
+
+    def print_board(self):
+        print("  a b c d e f g h")
+        print(" +----------------")
+        for i, row in enumerate(self.board):
+            row_str = str(i) + "|"
+            for piece in row:
+                if piece:
+                    row_str += f"{piece} "
+                else:
+                    row_str += ". "
+            print(row_str)
+        print(" +----------------")
+        print("  a b c d e f g h")
+
+
+class ChessSet:
+    def __init__(self, board_class=Board, setup=True):
+        self.board = board_class()
+        if setup:
+            self.setup_board()
+        self.current_player = "White"
+        self.halfmove_clock = 0  # plies since the last capture or pawn move
+        self.fullmove_number = 1
+        self.board.zobrist_key = self.board.compute_zobrist_key(self.current_player)
+        self.reset_history()
+        self.status_cache = (None, None)
+        self.legal_moves_cache = (None, [], {})
+        self.position_cache = None  # optional position_cache.PositionCache shared between sessions
+
+    def reset_history(self):
+        # Start the game record at the current position. key_history holds the position key after
+        # every ply and repetitions counts each key, so repetition checks never walk the history.
+        # move_history holds the (start_pos, end_pos, promotion) of every ply played since.
+        self.clock_stack = []
+        self.move_history = []
+        self.key_history = [self.board.zobrist_key]
+        self.repetitions = {self.board.zobrist_key: 1}
+
+    def setup_board(self):
+        piece_chesses = [Rook, Knight, Bishop, Queen, King, Bishop, Knight, Rook]
+        for i in range(8):
+            self.board.place_piece(Pawn("White", self.board), Position(1, i))
+            self.board.place_piece(Pawn("Black", self.board), Position(6, i))
+            self.board.place_piece(piece_chesses[i]("White", self.board), Position(0, i))
+            self.board.place_piece(piece_chesses[i]("Black", self.board), Position(7, i))
+
+    def print_board(self):
+        self.board.print_board()
+        
+
+    def legal_moves(self, color):
+        # Legal moves for color in the current position, generated once and reused until a move is made
+        key = (self.board.zobrist_key, color)
+        if self.legal_moves_cache[0] != key:
+            moves = None
+            if self.position_cache is not None:
+                moves = self.position_cache.legal_moves(self.board.zobrist_key, color)
+            if moves is None:
+                moves = self.board.legal_moves(color)
+                if self.position_cache is not None:
+                    self.position_cache.store_legal_moves(self.board.zobrist_key, color, moves)
+            destinations = {}
+            for start_pos, end_pos, promotion in moves:
+                destinations.setdefault(start_pos, set()).add(end_pos)
+            self.legal_moves_cache = (key, moves, destinations)
+        return self.legal_moves_cache[1]
+
+    def legal_destinations(self, color, position):
+        # Set of squares the piece on position may move to
+        self.legal_moves(color)
+        return self.legal_moves_cache[2].get(position, set())
+
+    def is_legal_move(self, color, start_pos, end_pos):
+        return end_pos in self.legal_destinations(color, start_pos)
+
+    def play_move(self, start_pos, end_pos, promotion=None):
+        # Play a move for the side to move and pass the turn; raises IllegalMoveError if it is not legal.
+        # A pawn reaching the last rank becomes a queen unless promotion says otherwise.
+        if not self.is_legal_move(self.current_player, start_pos, end_pos):
+            raise IllegalMoveError("The move is not allowed.")
+        piece = self.board.get_piece_at(start_pos)
+        if isinstance(piece, Pawn) and end_pos.row in (0, 7):
+            promotion = promotion or "queen"
+            if promotion not in PROMOTION_PIECES:
+                raise IllegalMoveError(f"Invalid promotion choice: {promotion}.")
+        elif promotion is not None:
+            raise IllegalMoveError("Only a pawn reaching the last rank can promote.")
+        self.board.execute_move(piece, start_pos, end_pos, promotion)
+        self.switch_turn()
+
+    def is_checkmate(self, color):
+        return self.board.is_check(color) and not self.legal_moves(color)
+
+    def is_stalemate(self, color):
+        return not self.legal_moves(color) and not self.board.is_check(color)
+    
+    def is_check(self, color):
+        return self.board.is_check(color)
+
+    def is_threefold_repetition(self):
+        return self.repetitions.get(self.board.zobrist_key, 0) >= 3
+
+    def is_fifty_move_rule(self):
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self):
+        # Bare kings, a single minor piece, or only bishops that all stand on one square color
+        minors = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.board.board[row][col]
+                if piece is None or piece.piece_type == "king":
+                    continue
+                if piece.piece_type not in ("bishop", "knight"):
+                    return False
+                minors.append((piece.piece_type, (row + col) % 2))
+        if len(minors) <= 1:
+            return True
+        return all(piece_type == "bishop" for piece_type, _ in minors) and len({shade for _, shade in minors}) == 1
+
+    def draw_reason(self):
+        # The draw rule that ends the game in the current position, if any (stalemate aside)
+        if self.is_threefold_repetition():
+            return "threefold repetition"
+        if self.is_fifty_move_rule():
+            return "fifty-move rule"
+        if self.is_insufficient_material():
+            return "insufficient material"
+        return None
+
+    def game_status(self, color):
+        # "checkmate", "stalemate", "threefold repetition", "fifty-move rule", "insufficient material",
+        # "check" or "normal" for color to move, worked out once per position. Mate takes precedence
+        # over the draw rules.
+        key = (self.board.zobrist_key, color, self.halfmove_clock, self.repetitions.get(self.board.zobrist_key, 0))
+        if self.status_cache[0] != key:
+            in_check = self.board.is_check(color)
+            if not self.legal_moves(color):
+                status = "checkmate" if in_check else "stalemate"
+            else:
+                status = self.draw_reason() or ("check" if in_check else "normal")
+            self.status_cache = (key, status)
+        return self.status_cache[1]
+
+    def is_game_over(self, color):
+        return self.game_status(color) not in ("check", "normal")
+    
+    def get_king(self, color):
+        return self.board.get_king(color)
+    
+    def is_position_under_attack(self, position, color):
+        return self.board.is_position_under_attack(position, color)
+    
+    def promote_pawn(self, position, color, promotion="queen"):
+        # Replace the pawn that just reached the last rank and pass the turn on
+        if promotion not in PROMOTION_PIECES:
+            raise IllegalMoveError(f"Invalid promotion choice: {promotion}. Choose from bishop, knight, rook, or queen.")
+        piece_class = PROMOTION_PIECES[promotion]
+        self.board.remove_piece(self.board.get_piece_at(position))
+        self.board.place_piece(piece_class(color, self.board, position=position), position)
+        
+        # Switch turn to the opponent
+        self.switch_turn()
+        
+    def switch_turn(self):
+        # Called once the move on top of the board's move stack has been played; advances the clocks
+        self.clock_stack.append((self.halfmove_clock, self.fullmove_number))
+        move = None
+        if self.board.move_stack:
+            record = self.board.move_stack[-1]
+            piece, start_pos, end_pos = record[:3]
+            irreversible = isinstance(piece, Pawn) or record[6] is not None
+            self.halfmove_clock = 0 if irreversible else self.halfmove_clock + 1
+            # The undo record has no promotion; whatever now stands on the end square tells
+            promoted = self.board.board[end_pos.row][end_pos.col]
+            promotion = promoted.piece_type if isinstance(piece, Pawn) and promoted is not piece else None
+            move = (start_pos, end_pos, promotion)
+        self.move_history.append(move)
+        if self.current_player == "Black":
+            self.fullmove_number += 1
+        self.current_player = "Black" if self.current_player == "White" else "White"
+        key = self.board.zobrist_key
+        self.key_history.append(key)
+        self.repetitions[key] = self.repetitions.get(key, 0) + 1
+
+    def undo_move(self):
+        # Take back the last move and hand the turn back to whoever played it
+        if self.board.move_stack:
+            self.board.dirty_squares.update(self.board.last_move_squares())
+        piece = self.board.unmake_move()
+        if piece is None:
+            return False
+        self.current_player = piece.color
+        if self.clock_stack:
+            self.halfmove_clock, self.fullmove_number = self.clock_stack.pop()
+            self.move_history.pop()
+        if len(self.key_history) > 1:
+            key = self.key_history.pop()
+            self.repetitions[key] -= 1
+        return True
@@ -0,0 +1,498 @@
+import argparse
+import time
+
+from chess_core import move_name
+
+PIECE_VALUES = {"pawn": 100, "knight": 320, "bishop": 330, "rook": 500, "queen": 900, "king": 0}
+
+# Piece-square bonuses written from White's side with rank 8 on the first line
+PIECE_SQUARE_TABLES = {
+    "pawn": [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    "knight": [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    "bishop": [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    "rook": [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    "queen": [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    "king": [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+INFINITY = 10 ** 9
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+MAX_PLY = 128
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+def evaluate(board, color):
+    # Material plus piece-square bonuses, from color's point of view
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece:
+                if piece.color == "White":
+                    score += PIECE_VALUES[piece.piece_type] + PIECE_SQUARE_TABLES[piece.piece_type][(7 - row) * 8 + col]
+                else:
+                    score -= PIECE_VALUES[piece.piece_type] + PIECE_SQUARE_TABLES[piece.piece_type][row * 8 + col]
+    return score if color == "White" else -score
+
+
+def move_key(move):
+    # Hashable form of a (start_pos, end_pos, promotion) move
+    start_pos, end_pos, promotion = move
+    return start_pos.row, start_pos.col, end_pos.row, end_pos.col, promotion
+
+
+def captured_piece(board, move):
+    start_pos, end_pos, _ = move
+    target = board.board[end_pos.row][end_pos.col]
+    if target:
+        return target
+    if board.board[start_pos.row][start_pos.col].piece_type == "pawn" and end_pos == board.en_passant_target:
+        return board.board[start_pos.row][end_pos.col]
+    return None
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    # Fixed number of slots indexed by key; a slot is overwritten by an entry from a newer
+    # search or by one searched at least as deep, so the table never grows past its size.
+
+    def __init__(self, size=1 << 18):
+        self.size = size
+        self.entries = [None] * size
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key % self.size
+        old = self.entries[index]
+        if old is None or old[0] == key or old[5] != self.age or depth >= old[1]:
+            self.entries[index] = (key, depth, score, flag, move, self.age)
+
+    def new_search(self):
+        self.age += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+
+class SearchResult:
+    def __init__(self, best_move, score, depth, nodes, elapsed, pv, source="search"):
+        self.best_move = best_move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+        self.pv = pv
+        self.source = source  # "search", "book", "tablebase" or "cache"
+
+    @property
+    def nodes_per_second(self):
+        return int(self.nodes / self.elapsed) if self.elapsed else 0
+
+    def __str__(self):
+        if self.source != "search":
+            return f"{self.source} move {move_name(*self.best_move)} score {self.score}"
+        pv = " ".join(move_name(*move) for move in self.pv)
+        return (f"depth {self.depth} score {self.score} nodes {self.nodes} "
+                f"time {self.elapsed:.2f}s nps {self.nodes_per_second} pv {pv}")
+
+
+class Engine:
+    # Iterative-deepening alpha-beta over Board.legal_moves, so it plays by exactly the
+    # same rules as the GUI. Positions found in the opening book or the endgame tablebase are
+    # answered without searching, and with a position cache (position_cache.PositionCache) so are
+    # positions already searched as deep in this or an earlier session.
+
+    def __init__(self, tt_size=1 << 18, book=None, tablebase=None, cache=None):
+        self.tt = TranspositionTable(tt_size)
+        self.book = book
+        self.tablebase = tablebase
+        self.cache = cache
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stop_event = None
+        self.killers = []
+        self.history = {}
+
+    def search(self, board, color, max_depth=64, time_limit=None, info=None, stop_event=None, node_limit=None):
+        # Search until max_depth is finished, time_limit seconds have passed, about node_limit
+        # nodes have been searched or stop_event is set; info, if given, is called with a
+        # SearchResult after every completed depth
+        start = time.perf_counter()
+        result = self.probe_tables(board, color)
+        if result is not None:
+            result.elapsed = time.perf_counter() - start
+            if info:
+                info(result)
+            return result
+        self.nodes = 0
+        self.deadline = start + time_limit if time_limit else None
+        self.node_limit = node_limit
+        self.stop_event = stop_event
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.tt.new_search()
+        root_stack_size = len(board.move_stack)
+        cached = self.cache.search_result(board.zobrist_key) if self.cache is not None else None
+        if cached is not None:
+            depth, score, pv = cached
+            if depth >= max_depth or abs(score) >= MATE_THRESHOLD:
+                result = SearchResult(pv[0], score, depth, 0, time.perf_counter() - start, pv, source="cache")
+                if info:
+                    info(result)
+                return result
+            # Not deep enough to answer, but the stored best move is searched first at every depth
+            self.tt.store(board.zobrist_key, depth, score, EXACT, move_key(pv[0]))
+
+        result = None
+        for depth in range(1, max_depth + 1):
+            try:
+                score, best_move = self.search_root(board, color, depth, result is not None)
+            except SearchTimeout:
+                while len(board.move_stack) > root_stack_size:
+                    board.unmake_move()
+                break
+            if best_move is None:
+                break
+            result = SearchResult(best_move, score, depth, self.nodes, time.perf_counter() - start,
+                                  self.principal_variation(board, color, depth))
+            if info:
+                info(result)
+            if abs(score) >= MATE_THRESHOLD:
+                break
+        if result is None:
+            # No legal moves at the root, or nothing finished in time
+            moves = board.legal_moves(color)
+            best_move = moves[0] if moves else None
+            result = SearchResult(best_move, 0, 0, self.nodes, time.perf_counter() - start,
+                                  [best_move] if best_move else [])
+        elif self.cache is not None and (cached is None or result.depth > cached[0]):
+            self.cache.store_search_result(board.zobrist_key, result.depth, result.score, result.pv or [result.best_move])
+        return result
+
+    def search_multipv(self, board, color, count, depth):
+        # The count best root moves as [(move, score)], best first, each searched to depth.
+        # Moves are tried against the count-th best score so far with an open upper bound:
+        # anything that cannot beat it fails low cheaply, the rest get exact scores.
+        self.nodes = 0
+        self.deadline = None
+        self.node_limit = None
+        self.stop_event = None
+        self.can_stop = False
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+        self.tt.new_search()
+        opponent = "Black" if color == "White" else "White"
+        entry = self.tt.probe(board.zobrist_key)
+        moves = self.order_moves(board, board.legal_moves(color), entry[4] if entry else None, 0)
+        ranked = []
+        for current_depth in range(1, depth + 1):
+            scored = []
+            for move in moves:
+                threshold = scored[count - 1][1] if len(scored) >= count else -INFINITY
+                board.make_move(*move)
+                score = -self.alpha_beta(board, opponent, current_depth - 1, -INFINITY, -threshold, 1)
+                board.unmake_move()
+                if score > threshold:
+                    scored.append((move, score))
+                    scored.sort(key=lambda item: -item[1])
+            ranked = scored[:count]
+            # Best candidates first next iteration, then the rest in their original order
+            best = [move for move, _ in ranked]
+            moves = best + [move for move in moves if move not in best]
+        if ranked:
+            self.tt.store(board.zobrist_key, depth, ranked[0][1], EXACT, move_key(ranked[0][0]))
+        return ranked
+
+    def probe_tables(self, board, color):
+        if self.book is not None:
+            book_move = self.book.choose_move(board, color)
+            if book_move is not None:
+                return SearchResult(book_move, 0, 0, 0, 0.0, [book_move], source="book")
+        if self.tablebase is not None:
+            probe = self.tablebase.best_move(board, color)
+            if probe is not None:
+                move, (outcome, plies) = probe
+                score = outcome * (MATE_SCORE - plies) if outcome else 0
+                return SearchResult(move, score, 0, 0, 0.0, [move], source="tablebase")
+        return None
+
+    def check_time(self, can_stop):
+        if not can_stop:
+            return
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchTimeout()
+        if self.deadline and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+
+    def search_root(self, board, color, depth, can_stop):
+        # Depth 1 always runs to completion so there is a move to play
+        self.can_stop = can_stop
+        opponent = "Black" if color == "White" else "White"
+        alpha, beta = -INFINITY, INFINITY
+        entry = self.tt.probe(board.zobrist_key)
+        moves = self.order_moves(board, board.legal_moves(color), entry[4] if entry else None, 0)
+        best_move = None
+        for move in moves:
+            board.make_move(*move)
+            score = -self.alpha_beta(board, opponent, depth - 1, -beta, -alpha, 1)
+            board.unmake_move()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        if best_move is not None:
+            self.tt.store(board.zobrist_key, depth, alpha, EXACT, move_key(best_move))
+        return alpha, best_move
+
+    def alpha_beta(self, board, color, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            self.check_time(self.can_stop)
+        if depth <= 0 or ply >= MAX_PLY:
+            return self.quiescence(board, color, alpha, beta, ply)
+
+        key = board.zobrist_key
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry:
+            tt_move = entry[4]
+            if entry[1] >= depth:
+                score = score_from_tt(entry[2], ply)
+                if entry[3] == EXACT:
+                    return score
+                if entry[3] == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        moves = board.legal_moves(color)
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check(color) else 0
+
+        opponent = "Black" if color == "White" else "White"
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in self.order_moves(board, moves, tt_move, ply):
+            quiet = captured_piece(board, move) is None and move[2] is None
+            board.make_move(*move)
+            score = -self.alpha_beta(board, opponent, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if quiet:
+                    self.record_cutoff(move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, score_to_tt(best_score, ply), flag, move_key(best_move))
+        return best_score
+
+    def quiescence(self, board, color, alpha, beta, ply):
+        # Only resolve captures and queen promotions so the static evaluation is not taken mid-exchange
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            self.check_time(self.can_stop)
+        stand_pat = evaluate(board, color)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        opponent = "Black" if color == "White" else "White"
+        noisy = [move for move in board.legal_moves(color)
+                 if move[2] == "queen" or captured_piece(board, move) is not None]
+        for move in self.order_moves(board, noisy, None, ply):
+            board.make_move(*move)
+            score = -self.quiescence(board, opponent, -beta, -alpha, ply + 1)
+            board.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def order_moves(self, board, moves, tt_move, ply):
+        # Hash move, then captures by most valuable victim / least valuable attacker,
+        # promotions, killer moves and finally the history heuristic
+        killers = self.killers[ply] if ply < MAX_PLY else (None, None)
+
+        def score(move):
+            key = move_key(move)
+            if key == tt_move:
+                return 10000000
+            victim = captured_piece(board, move)
+            if victim is not None:
+                attacker = board.board[move[0].row][move[0].col]
+                return 1000000 + 10 * PIECE_VALUES.get(victim.piece_type, 0) - PIECE_VALUES[attacker.piece_type]
+            if move[2]:
+                return 900000 + PIECE_VALUES[move[2]]
+            if key == killers[0] or key == killers[1]:
+                return 800000
+            return self.history.get(key, 0)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def record_cutoff(self, move, depth, ply):
+        key = move_key(move)
+        if ply < MAX_PLY and self.killers[ply][0] != key:
+            self.killers[ply][1] = self.killers[ply][0]
+            self.killers[ply][0] = key
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+    def principal_variation(self, board, color, depth):
+        # Follow hash moves from the root; stops at a missing entry or a repeated position
+        pv = []
+        seen = set()
+        for _ in range(depth):
+            entry = self.tt.probe(board.zobrist_key)
+            if not entry or entry[4] is None or board.zobrist_key in seen:
+                break
+            seen.add(board.zobrist_key)
+            move = next((move for move in board.legal_moves(color) if move_key(move) == entry[4]), None)
+            if move is None:
+                break
+            pv.append(move)
+            board.make_move(*move)
+            color = "Black" if color == "White" else "White"
+        for _ in pv:
+            board.unmake_move()
+        return pv
+
+
+def score_to_tt(score, ply):
+    # Mate scores are stored relative to the node so they stay correct at any depth
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+def main():
+    from fen import START_FEN, load_fen
+
+    parser = argparse.ArgumentParser(description="Search a position and print the best move")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--depth", type=int, default=64)
+    parser.add_argument("--time", type=float, default=5.0, help="seconds to search")
+    parser.add_argument("--tt-size", type=int, default=1 << 18, help="transposition table slots")
+    parser.add_argument("--book", help="opening book file to consult before searching")
+    parser.add_argument("--tablebase", help="directory of endgame tables built with tablebase.py")
+    parser.add_argument("--cache", help="position cache file to reuse earlier searches from")
+    args = parser.parse_args()
+
+    chess_set = load_fen(args.fen)
+    book = None
+    if args.book:
+        from book import OpeningBook
+        book = OpeningBook(args.book)
+    tablebase = None
+    if args.tablebase:
+        from tablebase import Tablebase
+        tablebase = Tablebase(args.tablebase)
+    cache = None
+    if args.cache:
+        from position_cache import PositionCache
+        cache = PositionCache(args.cache)
+    engine = Engine(args.tt_size, book, tablebase, cache)
+    result = engine.search(chess_set.board, chess_set.current_player, args.depth, args.time, info=print)
+    print(f"bestmove {move_name(*result.best_move) if result.best_move else '(none)'}")
+    print(f"tt hit rate {engine.tt.hits / engine.tt.probes if engine.tt.probes else 0:.1%}")
+    if cache:
+        print(f"position cache hit rate {cache.hit_rate:.1%}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import numpy as np
+
+from chess_core import BISHOP_DIRECTIONS, KNIGHT_ATTACKS, ROOK_DIRECTIONS
+from engine import PIECE_SQUARE_TABLES, PIECE_VALUES
+from fen import POSITION_SIZE
+
+# Positions are stacks of 12 planes of 64 squares (row * 8 + col, row 0 = rank 1): planes 0-5
+# are the White pawn, knight, bishop, rook, queen and king, planes 6-11 the Black ones.
+PLANE_TYPES = ["pawn", "knight", "bishop", "rook", "queen", "king"]
+PLANES = {(color, piece_type): index + 6 * side
+          for side, color in enumerate(["White", "Black"]) for index, piece_type in enumerate(PLANE_TYPES)}
+
+MOBILITY_WEIGHTS = {"knight": 4, "bishop": 5, "rook": 2, "queen": 1}
+SHIELD_BONUS = 10  # per own pawn on the three squares in front of the king
+KING_ZONE_PENALTIES = {"knight": 8, "bishop": 8, "rook": 10, "queen": 20}  # per enemy piece within two squares
+
+
+def build_piece_weights():
+    # Material plus piece-square bonus for every (plane, square), from White's point of view
+    weights = np.zeros((12, 64), dtype=np.int64)
+    for (color, piece_type), plane in PLANES.items():
+        table = PIECE_SQUARE_TABLES[piece_type]
+        for square in range(64):
+            row, col = divmod(square, 8)
+            if color == "White":
+                weights[plane, square] = PIECE_VALUES[piece_type] + table[(7 - row) * 8 + col]
+            else:
+                weights[plane, square] = -(PIECE_VALUES[piece_type] + table[row * 8 + col])
+    return weights
+
+
+def build_ray_steps(directions):
+    # steps[d, k - 1, square] is the square k steps away in direction d, or 64 when off the board
+    steps = np.full((len(directions), 7, 64), 64, dtype=np.intp)
+    for d, (dr, dc) in enumerate(directions):
+        for square in range(64):
+            row, col = divmod(square, 8)
+            for k in range(1, 8):
+                r, c = row + dr * k, col + dc * k
+                if not (0 <= r < 8 and 0 <= c < 8):
+                    break
+                steps[d, k - 1, square] = r * 8 + c
+    return steps
+
+
+def build_square_matrix(included):
+    matrix = np.zeros((64, 64), dtype=np.int64)
+    for source in range(64):
+        for target in range(64):
+            if included(divmod(source, 8), divmod(target, 8)):
+                matrix[source, target] = 1
+    return matrix
+
+
+PIECE_WEIGHTS = build_piece_weights()
+PIECE_WEIGHT_ROWS = PIECE_WEIGHTS.tolist()  # plain ints for the scalar path
+ROOK_STEPS = build_ray_steps(ROOK_DIRECTIONS)
+BISHOP_STEPS = build_ray_steps(BISHOP_DIRECTIONS)
+KNIGHT_MATRIX = build_square_matrix(lambda source, target: target in KNIGHT_ATTACKS[source[0] * 8 + source[1]])
+KING_ZONE = build_square_matrix(lambda source, target: abs(source[0] - target[0]) <= 2 and
+                                abs(source[1] - target[1]) <= 2)
+SHIELDS = {
+    color: build_square_matrix(lambda source, target, ahead=ahead: target[0] == source[0] + ahead and
+                               abs(target[1] - source[1]) <= 1)
+    for color, ahead in (("White", 1), ("Black", -1))
+}
+# Transposed float32 copies for the batch path: row = target square, column = source square
+KNIGHT_MATRIX_F = KNIGHT_MATRIX.T.astype(np.float32)
+KING_ZONE_F = KING_ZONE.T.astype(np.float32)
+SHIELDS_F = {color: matrix.T.astype(np.float32) for color, matrix in SHIELDS.items()}
+
+
+def encode_planes(boards):
+    # (N, 12, 64) uint8 planes for a sequence of Board objects
+    planes = np.zeros((len(boards), 12, 64), dtype=np.uint8)
+    for index, board in enumerate(boards):
+        for row in range(8):
+            for col, piece in enumerate(board.board[row]):
+                if piece:
+                    planes[index, PLANES[(piece.color, piece.piece_type)], row * 8 + col] = 1
+    return planes
+
+
+def planes_from_packed(buffer, count=None):
+    # Planes for consecutive fen.POSITION_SIZE records (fen.encode_into), decoded without a
+    # Python loop per position
+    records = np.frombuffer(buffer, dtype=np.uint8)
+    count = len(records) // POSITION_SIZE if count is None else count
+    records = records[:count * POSITION_SIZE].reshape(count, POSITION_SIZE)[:, :32]
+    codes = np.empty((count, 64), dtype=np.uint8)
+    codes[:, 0::2] = records & 15
+    codes[:, 1::2] = records >> 4
+    # Piece codes are 1-6 for White and 9-14 for Black, in plane order
+    plane_of = np.full(16, 12, dtype=np.intp)
+    plane_of[1:7] = np.arange(6)
+    plane_of[9:15] = np.arange(6, 12)
+    planes = np.zeros((count, 13, 64), dtype=np.uint8)
+    rows = np.arange(count)[:, None]
+    planes[rows, plane_of[codes], np.arange(64)[None, :]] = 1
+    return planes[:, :12]
+
+
+def ray_mobility(steps, not_own, empty):
+    # For every square (rows) of every position (columns), how many squares a slider standing
+    # there reaches up to and including the first blocker, not counting a blocker of its own color.
+    # Inputs have a 65th row: an off-board sentinel that is neither empty nor capturable.
+    mobility = np.zeros((64, not_own.shape[1]), dtype=np.int16)
+    for direction in steps:
+        open_rays = np.ones((64, not_own.shape[1]), dtype=bool)
+        for targets in direction:
+            mobility += open_rays & not_own[targets]
+            open_rays &= empty[targets]
+    return mobility
+
+
+def evaluate_planes(planes):
+    # Scores from White's point of view for a (N, 12, 64) plane stack, as an int64 array.
+    # Work is done square-major, (12, 64, N), so every gather along a ray reads whole rows.
+    count = len(planes)
+    squares = np.ascontiguousarray(planes.transpose(1, 2, 0)).astype(np.float32)
+    # Every term is a small integer, so float32 matrix products (BLAS) are exact here
+    scores = PIECE_WEIGHTS.reshape(1, 768).astype(np.float32) @ squares.reshape(768, count)
+    scores = scores[0]
+
+    occupied = squares.sum(axis=0) > 0
+    sentinel = np.zeros((1, count), dtype=bool)
+    empty = np.concatenate([~occupied, sentinel])
+    for side, color in enumerate(["White", "Black"]):
+        base = 6 * side
+        enemy = 6 - base
+        own = squares[base:base + 6].sum(axis=0) > 0
+        not_own = np.concatenate([~own, sentinel])
+        rook_mobility = ray_mobility(ROOK_STEPS, not_own, empty)
+        bishop_mobility = ray_mobility(BISHOP_STEPS, not_own, empty)
+        knight_mobility = KNIGHT_MATRIX_F @ not_own[:64].astype(np.float32)
+        mobility = (MOBILITY_WEIGHTS["knight"] * (squares[base + 1] * knight_mobility)
+                    + MOBILITY_WEIGHTS["bishop"] * (squares[base + 2] * bishop_mobility)
+                    + MOBILITY_WEIGHTS["rook"] * (squares[base + 3] * rook_mobility)
+                    + MOBILITY_WEIGHTS["queen"] * (squares[base + 4] * (rook_mobility + bishop_mobility)))
+
+        king = squares[base + 5]
+        shield = SHIELDS_F[color] @ king * squares[base] * SHIELD_BONUS
+        attackers = sum(KING_ZONE_PENALTIES[piece_type] * squares[enemy + PLANE_TYPES.index(piece_type)]
+                        for piece_type in KING_ZONE_PENALTIES)
+        pressure = KING_ZONE_F @ king * attackers
+        sign = 1 if side == 0 else -1
+        scores += sign * (mobility + shield - pressure).sum(axis=0)
+    return np.rint(scores).astype(np.int64)
+
+
+def evaluate_board(board, color):
+    # The same evaluation for one Board in plain Python, from color's point of view
+    score = 0
+    kings = {}
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece is None:
+                continue
+            sign = 1 if piece.color == "White" else -1
+            score += PIECE_WEIGHT_ROWS[PLANES[(piece.color, piece.piece_type)]][row * 8 + col]
+            if piece.piece_type == "king":
+                kings[piece.color] = (row, col)
+            elif piece.piece_type in MOBILITY_WEIGHTS:
+                score += sign * MOBILITY_WEIGHTS[piece.piece_type] * piece_mobility(board, piece.piece_type,
+                                                                                     piece.color, row, col)
+
+    for color_name, (king_row, king_col) in kings.items():
+        sign = 1 if color_name == "White" else -1
+        ahead = king_row + sign
+        for col in (king_col - 1, king_col, king_col + 1):
+            if 0 <= ahead < 8 and 0 <= col < 8:
+                piece = board.board[ahead][col]
+                if piece and piece.piece_type == "pawn" and piece.color == color_name:
+                    score += sign * SHIELD_BONUS
+        for row in range(max(0, king_row - 2), min(8, king_row + 3)):
+            for col in range(max(0, king_col - 2), min(8, king_col + 3)):
+                piece = board.board[row][col]
+                if piece and piece.color != color_name and piece.piece_type in KING_ZONE_PENALTIES:
+                    score -= sign * KING_ZONE_PENALTIES[piece.piece_type]
+    return score if color == "White" else -score
+
+
+def piece_mobility(board, piece_type, color, row, col):
+    # Squares attacked by the piece that are not occupied by its own side
+    if piece_type == "knight":
+        return sum(1 for r, c in KNIGHT_ATTACKS[row * 8 + col]
+                   if board.board[r][c] is None or board.board[r][c].color != color)
+    directions = {"bishop": BISHOP_DIRECTIONS, "rook": ROOK_DIRECTIONS,
+                  "queen": ROOK_DIRECTIONS + BISHOP_DIRECTIONS}[piece_type]
+    count = 0
+    for dr, dc in directions:
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            piece = board.board[r][c]
+            if piece is None:
+                count += 1
+            else:
+                if piece.color != color:
+                    count += 1
+                break
+            r, c = r + dr, c + dc
+    return count
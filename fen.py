@@ -0,0 +1,173 @@
+import struct
+
+from chess_core import (Board, ChessSet, Position, Pawn, Knight, Bishop, Rook, Queen, King, parse_square, square_name,
+                        WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE)
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+PIECE_CLASSES = {"pawn": Pawn, "knight": Knight, "bishop": Bishop, "rook": Rook, "queen": Queen, "king": King}
+FEN_PIECES = {"p": "pawn", "n": "knight", "b": "bishop", "r": "rook", "q": "queen", "k": "king"}
+FEN_LETTERS = {piece_type: letter for letter, piece_type in FEN_PIECES.items()}
+CASTLING_LETTERS = [(WHITE_KINGSIDE, "K"), (WHITE_QUEENSIDE, "Q"), (BLACK_KINGSIDE, "k"), (BLACK_QUEENSIDE, "q")]
+
+# Packed form: 64 four-bit piece codes, then flags (bit 0 black to move, bits 1-4 castling
+# rights), en passant file + 1 (0 for none), halfmove clock and fullmove number.
+POSITION_FORMAT = struct.Struct("<32sBBBH")
+POSITION_SIZE = POSITION_FORMAT.size
+PIECE_CODES = {piece_type: code for code, piece_type in
+               enumerate(["pawn", "knight", "bishop", "rook", "queen", "king"], start=1)}
+COLOR_CODES = {"White": 0, "Black": 8}
+CODE_PIECES = {code + COLOR_CODES[color]: (color, piece_type)
+               for piece_type, code in PIECE_CODES.items() for color in COLOR_CODES}
+
+
+def apply_castling_rights(board, rights):
+    # Castling is derived from has_moved, so every piece counts as moved unless a right keeps it fresh
+    for row in board.board:
+        for piece in row:
+            if piece:
+                piece.has_moved = True
+    for color, row, kingside, queenside in (("White", 0, WHITE_KINGSIDE, WHITE_QUEENSIDE),
+                                            ("Black", 7, BLACK_KINGSIDE, BLACK_QUEENSIDE)):
+        king = board.board[row][4]
+        for bit, rook_col in ((kingside, 7), (queenside, 0)):
+            rook = board.board[row][rook_col]
+            if rights & bit and isinstance(king, King) and isinstance(rook, Rook) \
+                    and king.color == color and rook.color == color:
+                king.has_moved = False
+                rook.has_moved = False
+
+
+def finish_setup(chess_set, color, rights, en_passant_target, halfmove_clock, fullmove_number):
+    board = chess_set.board
+    apply_castling_rights(board, rights)
+    board.en_passant_target = en_passant_target
+    chess_set.current_player = color
+    chess_set.halfmove_clock = halfmove_clock
+    chess_set.fullmove_number = fullmove_number
+    board.zobrist_key = board.compute_zobrist_key(color)
+    chess_set.reset_history()
+    board.dirty_squares = {(row, col) for row in range(8) for col in range(8)}
+    return chess_set
+
+
+def load_fen(fen, board_class=Board):
+    # Build a ChessSet from a FEN string; the clocks default to "0 1" when missing
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError(f"FEN needs at least four fields: {fen!r}")
+    placement, side, castling, en_passant = fields[:4]
+    if side not in ("w", "b"):
+        raise ValueError(f"FEN side to move must be w or b: {side!r}")
+    halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+    # The packed form keeps the fullmove number in an unsigned 16-bit field
+    if halfmove_clock < 0 or not 0 <= fullmove_number <= 0xFFFF:
+        raise ValueError(f"FEN clocks out of range: {halfmove_clock} {fullmove_number}")
+
+    chess_set = ChessSet(board_class, setup=False)
+    board = chess_set.board
+    ranks = placement.split("/")
+    if len(ranks) != 8:
+        raise ValueError(f"FEN placement needs eight ranks: {placement!r}")
+    for rank_index, rank in enumerate(ranks):
+        row = 7 - rank_index
+        col = 0
+        previous = ""
+        for char in rank:
+            if char.isdigit():
+                # One digit per run of empty squares, so "44" is as malformed as "9"
+                if previous.isdigit() or not "1" <= char <= "8":
+                    raise ValueError(f"Bad FEN rank: {rank!r}")
+                col += int(char)
+                previous = char
+                continue
+            previous = char
+            if char.lower() not in FEN_PIECES or col > 7:
+                raise ValueError(f"Bad FEN rank: {rank!r}")
+            color = "White" if char.isupper() else "Black"
+            board.place_piece(PIECE_CLASSES[FEN_PIECES[char.lower()]](color, board), Position(row, col))
+            col += 1
+        if col != 8:
+            raise ValueError(f"FEN rank does not cover eight files: {rank!r}")
+
+    for color in ("White", "Black"):
+        kings = sum(1 for row in board.board for piece in row
+                    if piece and piece.color == color and piece.piece_type == "king")
+        if kings != 1:
+            raise ValueError(f"FEN needs exactly one {color} king: {placement!r}")
+
+    rights = 0
+    for bit, letter in CASTLING_LETTERS:
+        if letter in castling:
+            rights |= bit
+    if en_passant == "-":
+        en_passant_target = None
+    elif len(en_passant) == 2 and en_passant[0] in "abcdefgh" and en_passant[1] in "36":
+        en_passant_target = parse_square(en_passant)
+    else:
+        raise ValueError(f"Bad FEN en passant square: {en_passant!r}")
+    return finish_setup(chess_set, "White" if side == "w" else "Black", rights, en_passant_target,
+                        halfmove_clock, fullmove_number)
+
+
+def to_fen(chess_set):
+    board = chess_set.board
+    ranks = []
+    for row in range(7, -1, -1):
+        rank = ""
+        empty = 0
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            letter = FEN_LETTERS[piece.piece_type]
+            rank += letter.upper() if piece.color == "White" else letter
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+
+    rights = board.castling_rights()
+    castling = "".join(letter for bit, letter in CASTLING_LETTERS if rights & bit) or "-"
+    en_passant = square_name(board.en_passant_target) if board.en_passant_target else "-"
+    side = "w" if chess_set.current_player == "White" else "b"
+    return f"{'/'.join(ranks)} {side} {castling} {en_passant} {chess_set.halfmove_clock} {chess_set.fullmove_number}"
+
+
+def encode_position(chess_set):
+    # Fixed POSITION_SIZE-byte form of a position
+    buffer = bytearray(POSITION_SIZE)
+    encode_into(buffer, 0, chess_set)
+    return bytes(buffer)
+
+
+def encode_into(buffer, offset, chess_set):
+    # Write the packed position straight into a bytearray or writable mmap at offset
+    codes = [PIECE_CODES[piece.piece_type] | COLOR_CODES[piece.color] if piece else 0
+             for row in chess_set.board.board for piece in row]
+    packed = bytes(codes[square] | codes[square + 1] << 4 for square in range(0, 64, 2))
+    flags = (1 if chess_set.current_player == "Black" else 0) | (chess_set.board.castling_rights() << 1)
+    target = chess_set.board.en_passant_target
+    POSITION_FORMAT.pack_into(buffer, offset, packed, flags, target.col + 1 if target else 0,
+                              min(chess_set.halfmove_clock, 255), chess_set.fullmove_number)
+
+
+def decode_position(data, offset=0, board_class=Board):
+    # Rebuild a ChessSet from the packed form at offset in any bytes-like object (including mmap)
+    packed, flags, en_passant_file, halfmove_clock, fullmove_number = POSITION_FORMAT.unpack_from(data, offset)
+    chess_set = ChessSet(board_class, setup=False)
+    board = chess_set.board
+    for index, byte in enumerate(packed):
+        for square, code in ((index * 2, byte & 15), (index * 2 + 1, byte >> 4)):
+            if code:
+                color, piece_type = CODE_PIECES[code]
+                board.place_piece(PIECE_CLASSES[piece_type](color, board), Position(square >> 3, square & 7))
+    color = "Black" if flags & 1 else "White"
+    en_passant_target = None
+    if en_passant_file:
+        en_passant_target = Position(5 if color == "White" else 2, en_passant_file - 1)
+    return finish_setup(chess_set, color, flags >> 1, en_passant_target, halfmove_clock, fullmove_number)
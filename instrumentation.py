@@ -0,0 +1,212 @@
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+
+from chess_core import Board, ChessSet, move_name
+
+# Rules functions that get wrapped, per class. Subclasses of Board (BitBoard) are wrapped too
+# wherever they define their own version.
+RULES_FUNCTIONS = {
+    Board: ["move_piece", "execute_move", "make_move", "unmake_move", "legal_moves", "check_state", "legal_targets",
+            "is_check", "move_puts_self_in_check", "is_position_under_attack", "get_directional_moves",
+            "handle_castling"],
+    ChessSet: ["legal_moves", "is_checkmate", "is_stalemate", "game_status", "draw_reason"],
+}
+
+
+class Profiler:
+    # Opt-in instrumentation of the rules core. Nothing is wrapped until enable() is called and
+    # disable() puts the original methods back, so a disabled profiler costs nothing at all.
+    # Each thread keeps its own call stack and per-ply counters, so an engine searching on a
+    # worker thread does not leak into the GUI thread's numbers.
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        self.enabled = False
+        self.originals = []
+        self.local = threading.local()
+        self.thread_states = []
+        self.plies = []
+
+    def state(self):
+        local = self.local
+        if not hasattr(local, "stack"):
+            local.stack = []  # [name, seconds spent in wrapped callees]
+            local.current = {}
+            local.folded = {}
+            local.ply_seconds = 0.0  # time in outermost wrapped calls, so nesting is not counted twice
+            self.thread_states.append(local.__dict__)
+        return local
+
+    def enable(self):
+        if self.enabled:
+            return
+        classes = dict(RULES_FUNCTIONS)
+        for subclass in Board.__subclasses__():
+            classes[subclass] = RULES_FUNCTIONS[Board]
+        for cls, names in classes.items():
+            for name in names:
+                if name in cls.__dict__:
+                    original = cls.__dict__[name]
+                    self.originals.append((cls, name, original))
+                    setattr(cls, name, self.wrap(f"{cls.__name__}.{name}", original))
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        for cls, name, original in reversed(self.originals):
+            setattr(cls, name, original)
+        self.originals = []
+        if self.track_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+
+    def wrap(self, name, function):
+        profiler = self
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            state = profiler.state()
+            frame = [name, 0.0]
+            state.stack.append(frame)
+            track = profiler.track_allocations
+            memory = tracemalloc.get_traced_memory()[0] if track else 0
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                allocated = tracemalloc.get_traced_memory()[0] - memory if track else 0
+                stats = state.current.get(name)
+                if stats is None:
+                    stats = state.current[name] = [0, 0.0, 0]
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] += allocated
+                path = ";".join(entry[0] for entry in state.stack)
+                state.folded[path] = state.folded.get(path, 0.0) + elapsed - frame[1]
+                state.stack.pop()
+                if state.stack:
+                    state.stack[-1][1] += elapsed
+                else:
+                    state.ply_seconds += elapsed
+
+        wrapper.__name__ = function.__name__
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def begin_ply(self):
+        # Forget whatever the calling thread recorded since the last ply
+        state = self.state()
+        state.current = {}
+        state.ply_seconds = 0.0
+
+    def end_ply(self, label=None):
+        # Close the calling thread's ply and return its stats:
+        # {"ply", "label", "seconds", "functions": {name: {"calls", "seconds", "bytes"}}}
+        state = self.state()
+        functions = {name: {"calls": calls, "seconds": seconds, "bytes": allocated}
+                     for name, (calls, seconds, allocated) in state.current.items()}
+        record = {"ply": len(self.plies) + 1, "label": label, "seconds": state.ply_seconds, "functions": functions}
+        state.current = {}
+        state.ply_seconds = 0.0
+        self.plies.append(record)
+        return record
+
+    def totals(self):
+        totals = {}
+        for ply in self.plies:
+            for name, stats in ply["functions"].items():
+                total = totals.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0})
+                for field in total:
+                    total[field] += stats[field]
+        return totals
+
+    def folded(self):
+        # Collapsed stacks ("outer;inner microseconds" per line) as read by flamegraph.pl and speedscope
+        merged = {}
+        for state in list(self.thread_states):
+            for path, seconds in state["folded"].items():
+                merged[path] = merged.get(path, 0.0) + seconds
+        return "".join(f"{path} {round(seconds * 1e6)}\n" for path, seconds in sorted(merged.items())
+                       if seconds >= 5e-7)
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"track_allocations": self.track_allocations, "plies": self.plies, "totals": self.totals()},
+                      f, indent=2)
+
+    def export_folded(self, path):
+        with open(path, "w") as f:
+            f.write(self.folded())
+
+
+def summarize(record, limit=4):
+    # One-line cost summary of a ply record, heaviest functions first
+    functions = sorted(record["functions"].items(), key=lambda item: -item[1]["seconds"])[:limit]
+    parts = []
+    for name, stats in functions:
+        part = f"{name} {stats['calls']}x {stats['seconds'] * 1000:.2f}ms"
+        if stats["bytes"]:
+            part += f" {stats['bytes'] / 1024:+.1f}KB"
+        parts.append(part)
+    return ", ".join(parts)
+
+
+def play_random_game(plies, seed, profiler=None):
+    # Play random legal moves through ChessSet the way the GUI does, one profiled ply per move
+    rng = random.Random(seed)
+    chess_set = ChessSet()
+    for _ in range(plies):
+        if profiler:
+            profiler.begin_ply()
+        color = chess_set.current_player
+        if chess_set.game_status(color) not in ("check", "normal"):
+            break
+        start_pos, end_pos, promotion = rng.choice(chess_set.legal_moves(color))
+        chess_set.board.move_piece(start_pos, end_pos, promotion)
+        chess_set.switch_turn()
+        if profiler:
+            profiler.end_ply(f"{color} {move_name(start_pos, end_pos, promotion)}")
+    return chess_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the rules core over a random game")
+    parser.add_argument("--plies", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--allocations", action="store_true", help="also record net bytes allocated (slower)")
+    parser.add_argument("--json", help="write per-ply stats to this file")
+    parser.add_argument("--folded", help="write collapsed stacks for a flame graph to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    play_random_game(args.plies, args.seed)
+    plain = time.perf_counter() - start
+
+    profiler = Profiler(args.allocations)
+    profiler.enable()
+    start = time.perf_counter()
+    play_random_game(args.plies, args.seed, profiler)
+    profiled = time.perf_counter() - start
+    profiler.disable()
+
+    start = time.perf_counter()
+    play_random_game(args.plies, args.seed)
+    disabled = time.perf_counter() - start
+
+    for name, stats in sorted(profiler.totals().items(), key=lambda item: -item[1]["seconds"]):
+        print(f"{name:<36}{stats['calls']:>10}{stats['seconds'] * 1000:>12.2f}ms{stats['bytes'] / 1024:>12.1f}KB")
+    print(f"game without profiler {plain:.3f}s, enabled {profiled:.3f}s, after disable {disabled:.3f}s")
+    if args.json:
+        profiler.export_json(args.json)
+    if args.folded:
+        profiler.export_folded(args.folded)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from chess_core import move_name, parse_move
+from engine import Engine
+from fen import START_FEN, load_fen
+
+worker_cache = None  # position cache opened by this worker process, see open_cache
+
+# A player is given as a spec string so it can be sent to a worker process:
+#   random                 uniformly random legal moves
+#   scripted:e2e4,g1f3     the listed moves while they are legal, then the first legal move by name
+#   engine[:depth]         engine.Engine, limited by the clock and optionally a maximum depth
+
+
+class RandomPlayer:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+
+    def choose_move(self, chess_set, time_limit):
+        return self.rng.choice(chess_set.legal_moves(chess_set.current_player))
+
+
+class ScriptedPlayer:
+    def __init__(self, moves):
+        self.moves = [parse_move(name) for name in moves.split(",") if name]
+
+    def choose_move(self, chess_set, time_limit):
+        legal = chess_set.legal_moves(chess_set.current_player)
+        for move in self.moves:
+            if move in legal:
+                self.moves.remove(move)
+                return move
+        return min(legal, key=lambda move: move_name(*move))
+
+
+class EnginePlayer:
+    def __init__(self, max_depth, cache=None):
+        self.engine = Engine(tt_size=1 << 16, cache=cache)
+        self.max_depth = max_depth
+
+    def choose_move(self, chess_set, time_limit):
+        result = self.engine.search(chess_set.board, chess_set.current_player, self.max_depth, time_limit)
+        return result.best_move
+
+
+def make_player(spec, seed, cache=None):
+    name, _, argument = spec.partition(":")
+    if name == "random":
+        return RandomPlayer(seed)
+    if name == "scripted":
+        return ScriptedPlayer(argument)
+    if name == "engine":
+        return EnginePlayer(int(argument) if argument else 64, cache)
+    raise ValueError(f"Unknown player: {spec!r}.")
+
+
+def parse_time_control(text):
+    # "base+increment" in seconds, such as "10+0.1"
+    base, _, increment = text.partition("+")
+    return float(base), float(increment or 0)
+
+
+def move_budget(remaining, increment):
+    # Share of the clock to spend on one move: a 25th of what is left plus most of the increment
+    return max(0.01, min(remaining / 25 + increment * 0.8, remaining * 0.5))
+
+
+def open_cache(path):
+    # One position cache connection per worker process, reused for all its games
+    global worker_cache
+    if worker_cache is None or worker_cache.path != path:
+        from position_cache import PositionCache
+        worker_cache = PositionCache(path)
+    return worker_cache
+
+
+def play_game(index, fen, white, black, time_control, max_plies, seed, cache_path=None):
+    # Worker entry point. Returns (index, result, reason, plies, {"White": [move seconds], "Black": [...]})
+    # with result "1-0", "0-1" or "1/2-1/2" from White's point of view.
+    cache = open_cache(cache_path) if cache_path else None
+    try:
+        return run_game(index, fen, white, black, time_control, max_plies, seed, cache)
+    finally:
+        if cache is not None:
+            cache.flush()  # let the other workers see this game's positions
+
+
+def run_game(index, fen, white, black, time_control, max_plies, seed, cache):
+    chess_set = load_fen(fen)
+    chess_set.position_cache = cache
+    players = {"White": make_player(white, seed, cache), "Black": make_player(black, seed + 1, cache)}
+    base, increment = time_control
+    clocks = {"White": base, "Black": base}
+    latencies = {"White": [], "Black": []}
+    plies = 0
+    while True:
+        color = chess_set.current_player
+        status = chess_set.game_status(color)
+        if status == "checkmate":
+            return index, ("0-1" if color == "White" else "1-0"), status, plies, latencies
+        if status not in ("check", "normal"):
+            return index, "1/2-1/2", status, plies, latencies
+        if plies >= max_plies:
+            return index, "1/2-1/2", "move limit", plies, latencies
+
+        start = time.perf_counter()
+        move = players[color].choose_move(chess_set, move_budget(clocks[color], increment))
+        elapsed = time.perf_counter() - start
+        latencies[color].append(elapsed)
+        clocks[color] -= elapsed
+        if clocks[color] < 0:
+            return index, ("0-1" if color == "White" else "1-0"), "time forfeit", plies, latencies
+        clocks[color] += increment
+        chess_set.play_move(*move)
+        plies += 1
+
+
+def elo_from_score(score):
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def elo_difference(wins, draws, losses):
+    # Elo difference with a 95% confidence interval, from the spread of the per-game scores
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -math.inf, math.inf
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo_from_score(score), elo_from_score(score - margin), elo_from_score(score + margin)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class MatchReport:
+    # Results from the first player's (A's) point of view
+    def __init__(self, player_a, player_b):
+        self.players = (player_a, player_b)
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.reasons = {}
+        self.plies = 0
+        self.latencies = {player_a: [], player_b: []}
+        self.elapsed = 0.0
+
+    def add(self, a_is_white, result, reason, plies, latencies):
+        player_a, player_b = self.players
+        if result == "1/2-1/2":
+            self.draws += 1
+        elif (result == "1-0") == a_is_white:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.plies += plies
+        self.latencies[player_a if a_is_white else player_b].extend(latencies["White"])
+        self.latencies[player_b if a_is_white else player_a].extend(latencies["Black"])
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def summary(self):
+        player_a, player_b = self.players
+        elo, low, high = elo_difference(self.wins, self.draws, self.losses)
+        elapsed = self.elapsed or 1e-9
+        lines = [
+            f"{player_a} vs {player_b}: +{self.wins} ={self.draws} -{self.losses} "
+            f"({(self.wins + self.draws / 2) / self.games if self.games else 0.5:.1%})",
+            f"Elo difference {elo:+.0f} (95% interval {low:+.0f} to {high:+.0f})",
+            "endings: " + ", ".join(f"{reason} {count}" for reason, count in sorted(self.reasons.items())),
+            f"{self.games} games, {self.plies} plies in {self.elapsed:.1f}s "
+            f"({self.games / elapsed * 3600:.0f} games/hour)",
+        ]
+        for player, latencies in self.latencies.items():
+            if latencies:
+                lines.append(f"{player} move latency p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+                             f"p90 {percentile(latencies, 0.9) * 1000:.1f} ms, "
+                             f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+def schedule(games, openings, player_a, player_b, time_control, max_plies, seed, cache_path):
+    # Each opening is played twice in a row with colors swapped, so neither side gets the better openings
+    for index in range(games):
+        fen = openings[index // 2 % len(openings)]
+        a_is_white = index % 2 == 0
+        white, black = (player_a, player_b) if a_is_white else (player_b, player_a)
+        yield a_is_white, (index, fen, white, black, time_control, max_plies, seed + 2 * index, cache_path)
+
+
+def run_match(player_a, player_b, games, openings=(START_FEN,), time_control=(10.0, 0.1), max_plies=400,
+              workers=None, seed=1, cache_path=None):
+    # Play the games across a process pool with at most two per worker in flight. With cache_path
+    # every worker reads and adds to the same position cache file.
+    report = MatchReport(player_a, player_b)
+    colors = {}
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for a_is_white, task in schedule(games, openings, player_a, player_b, time_control, max_plies, seed,
+                                         cache_path):
+            report.add(a_is_white, *play_game(*task)[1:])
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                index, *result = future.result()
+                report.add(colors.pop(index), *result)
+
+        for a_is_white, task in schedule(games, openings, player_a, player_b, time_control, max_plies, seed,
+                                         cache_path):
+            colors[task[0]] = a_is_white
+            pending.add(pool.submit(play_game, *task))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(pending)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def read_openings(path):
+    # One FEN per line; blank lines and lines starting with # are skipped
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a match between two players across all cores")
+    parser.add_argument("player_a", help="random, scripted:MOVES or engine[:DEPTH]")
+    parser.add_argument("player_b")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--openings", help="file with one start FEN per line (default: the initial position)")
+    parser.add_argument("--tc", default="10+0.1", help="time control per game, base+increment in seconds")
+    parser.add_argument("--max-plies", type=int, default=400, help="adjudicate a draw after this many plies")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache", help="position cache file shared by all workers and kept between matches")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    openings = read_openings(args.openings) if args.openings else [START_FEN]
+    for spec in (args.player_a, args.player_b):
+        make_player(spec, 0)  # fail early on a bad spec
+    report = run_match(args.player_a, args.player_b, args.games, openings, parse_time_control(args.tc),
+                       args.max_plies, args.workers, args.seed, args.cache)
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+
+from chess_core import Board, move_name
+from fen import START_FEN, load_fen
+
+
+def perft(board, color, depth):
+    # Number of leaf nodes of the legal move tree of the given depth
+    if depth == 0:
+        return 1
+    moves = board.legal_moves(color)
+    if depth == 1:
+        return len(moves)
+    opponent = "Black" if color == "White" else "White"
+    nodes = 0
+    for start_pos, end_pos, promotion in moves:
+        board.make_move(start_pos, end_pos, promotion)
+        nodes += perft(board, opponent, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, color, depth):
+    # Leaf count below each root move, keyed by its long algebraic name
+    opponent = "Black" if color == "White" else "White"
+    counts = {}
+    for start_pos, end_pos, promotion in board.legal_moves(color):
+        board.make_move(start_pos, end_pos, promotion)
+        counts[move_name(start_pos, end_pos, promotion)] = perft(board, opponent, depth - 1)
+        board.unmake_move()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count legal move paths from a position")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--divide", action="store_true", help="print the node count under every root move")
+    parser.add_argument("--bitboard", action="store_true", help="run on the bitboard backend")
+    args = parser.parse_args()
+
+    board_class = Board
+    if args.bitboard:
+        from bitboard import BitBoard
+        board_class = BitBoard
+    chess_set = load_fen(args.fen, board_class)
+
+    start = time.perf_counter()
+    if args.divide:
+        counts = divide(chess_set.board, chess_set.current_player, args.depth)
+        for name in sorted(counts):
+            print(f"{name}: {counts[name]}")
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(chess_set.board, chess_set.current_player, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes}")
+    print(f"Time: {elapsed:.3f}s ({nodes / elapsed if elapsed else 0:.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
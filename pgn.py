@@ -0,0 +1,254 @@
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from chess_core import ChessSet, IllegalMoveError, square_name
+from fen import load_fen
+
+SAN_PIECES = {"N": "knight", "B": "bishop", "R": "rook", "Q": "queen", "K": "king"}
+PIECE_LETTERS = {piece_type: letter for letter, piece_type in SAN_PIECES.items()}
+PROMOTION_LETTERS = {"Q": "queen", "R": "rook", "B": "bishop", "N": "knight"}
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+HEADER_PATTERN = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+TOKEN_PATTERN = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.+|[^\s(){};]+")
+SAN_PATTERN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([QRBN]))?$")
+
+
+class PgnGame:
+    # One game as read from the file; the movetext is only tokenised when moves are asked for
+    def __init__(self, index, headers, movetext):
+        self.index = index
+        self.headers = headers
+        self.movetext = movetext
+
+    def san_moves(self):
+        moves = []
+        depth = 0
+        for token in TOKEN_PATTERN.findall(self.movetext):
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif depth or token[0] in "{;$" or token[0].isdigit() and token.rstrip(".").isdigit():
+                continue
+            elif token in RESULTS:
+                break
+            else:
+                moves.append(token)
+        return moves
+
+
+def read_games(stream):
+    # Yield PgnGame objects one at a time, so only the current game is ever held in memory
+    index = 0
+    headers = {}
+    movetext = []
+    for line in stream:
+        line = line.strip()
+        if line.startswith("[") and not movetext:
+            match = HEADER_PATTERN.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+            continue
+        if line.startswith("[") and movetext:
+            index += 1
+            yield PgnGame(index, headers, " ".join(movetext))
+            headers, movetext = {}, []
+            match = HEADER_PATTERN.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+            continue
+        if line:
+            movetext.append(line)
+    if movetext or headers:
+        index += 1
+        yield PgnGame(index, headers, " ".join(movetext))
+
+
+def parse_san(chess_set, color, san):
+    # Find the legal (start_pos, end_pos, promotion) that a SAN token such as "Nbd7" or "exd8=Q+" stands for
+    token = san.rstrip("+#!?")
+    moves = chess_set.legal_moves(color)
+    if token in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        col = 6 if token in ("O-O", "0-0") else 2
+        for move in moves:
+            start_pos, end_pos, _ = move
+            piece = chess_set.board.get_piece_at(start_pos)
+            if piece.piece_type == "king" and start_pos.col == 4 and end_pos.col == col:
+                return move
+        raise IllegalMoveError(f"Castling is not allowed: {san}")
+
+    match = SAN_PATTERN.match(token)
+    if not match:
+        raise IllegalMoveError(f"Unreadable move: {san}")
+    piece_letter, from_file, from_rank, _, destination, promotion_letter = match.groups()
+    piece_type = SAN_PIECES[piece_letter] if piece_letter else "pawn"
+    promotion = PROMOTION_LETTERS[promotion_letter] if promotion_letter else None
+    candidates = []
+    for move in moves:
+        start_pos, end_pos, move_promotion = move
+        if square_name(end_pos) != destination or move_promotion != promotion:
+            continue
+        if chess_set.board.get_piece_at(start_pos).piece_type != piece_type:
+            continue
+        start = square_name(start_pos)
+        if from_file and start[0] != from_file or from_rank and start[1] != from_rank:
+            continue
+        candidates.append(move)
+    if len(candidates) != 1:
+        reason = "Illegal move" if not candidates else "Ambiguous move"
+        raise IllegalMoveError(f"{reason}: {san}")
+    return candidates[0]
+
+
+def move_to_san(chess_set, color, move):
+    # SAN for a legal move of color, including disambiguation and the check or mate suffix
+    start_pos, end_pos, promotion = move
+    board = chess_set.board
+    piece = board.get_piece_at(start_pos)
+    if piece.piece_type == "king" and abs(start_pos.col - end_pos.col) == 2:
+        san = "O-O" if end_pos.col == 6 else "O-O-O"
+    else:
+        capture = board.get_piece_at(end_pos) is not None or \
+            (piece.piece_type == "pawn" and start_pos.col != end_pos.col)
+        if piece.piece_type == "pawn":
+            san = (square_name(start_pos)[0] + "x" if capture else "") + square_name(end_pos)
+            if promotion:
+                san += "=" + PIECE_LETTERS[promotion]
+        else:
+            rivals = [other for other, other_end, _ in chess_set.legal_moves(color)
+                      if other_end == end_pos and other != start_pos
+                      and board.get_piece_at(other).piece_type == piece.piece_type]
+            disambiguation = ""
+            if rivals:
+                if all(other.col != start_pos.col for other in rivals):
+                    disambiguation = square_name(start_pos)[0]
+                elif all(other.row != start_pos.row for other in rivals):
+                    disambiguation = square_name(start_pos)[1]
+                else:
+                    disambiguation = square_name(start_pos)
+            san = PIECE_LETTERS[piece.piece_type] + disambiguation + ("x" if capture else "") + square_name(end_pos)
+
+    opponent = "Black" if color == "White" else "White"
+    board.make_move(start_pos, end_pos, promotion)
+    if board.is_check(opponent):
+        san += "#" if not board.legal_moves(opponent) else "+"
+    board.unmake_move()
+    return san
+
+
+def replay_game(game):
+    # Play a game through the rules core; returns (plies played, error message or None)
+    if game.headers.get("FEN"):
+        try:
+            chess_set = load_fen(game.headers["FEN"])
+        except (ValueError, IndexError) as error:
+            return 0, f"FEN header: {error}"
+    else:
+        chess_set = ChessSet()
+    plies = 0
+    for san in game.san_moves():
+        color = chess_set.current_player
+        try:
+            start_pos, end_pos, promotion = parse_san(chess_set, color, san)
+        except IllegalMoveError as error:
+            return plies, f"ply {plies + 1} ({color}): {error}"
+        chess_set.board.execute_move(chess_set.board.get_piece_at(start_pos), start_pos, end_pos, promotion)
+        chess_set.switch_turn()
+        plies += 1
+    return plies, None
+
+
+def validate_batch(games):
+    # Worker entry point: replay a batch of games and report (index, plies, error) for each
+    return [(game.index,) + replay_game(game) for game in games]
+
+
+def batches(games, size):
+    batch = []
+    for game in games:
+        batch.append(game)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ValidationReport:
+    def __init__(self, max_failures=100):
+        self.games = 0
+        self.plies = 0
+        self.failed = 0
+        self.failures = []  # only the first max_failures are kept so memory stays bounded
+        self.max_failures = max_failures
+        self.elapsed = 0.0
+
+    def add(self, index, plies, error):
+        self.games += 1
+        self.plies += plies
+        if error:
+            self.failed += 1
+            if len(self.failures) < self.max_failures:
+                self.failures.append((index, error))
+
+    def summary(self):
+        elapsed = self.elapsed or 1e-9
+        return (f"{self.games} games, {self.plies} plies, {self.failed} failed in {self.elapsed:.2f}s "
+                f"({self.games / elapsed:.1f} games/s, {self.plies / elapsed:.0f} plies/s)")
+
+
+def validate_games(games, workers=None, batch_size=50, max_failures=100):
+    # Replay games across a process pool. At most two batches per worker are in flight,
+    # so memory does not depend on how many games the input holds.
+    report = ValidationReport(max_failures)
+    start = time.perf_counter()
+    if workers == 1:
+        for batch in batches(games, batch_size):
+            for result in validate_batch(batch):
+                report.add(*result)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        limit = 2 * workers
+        pending = set()
+        for batch in batches(games, batch_size):
+            pending.add(pool.submit(validate_batch, batch))
+            if len(pending) >= limit:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for result in future.result():
+                        report.add(*result)
+        for future in pending:
+            for result in future.result():
+                report.add(*result)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay and validate every game in a PGN file")
+    parser.add_argument("pgn", help="PGN file, or - for stdin")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=50, help="games sent to a worker at a time")
+    args = parser.parse_args()
+
+    stream = sys.stdin if args.pgn == "-" else open(args.pgn, encoding="utf-8", errors="replace")
+    with stream:
+        report = validate_games(read_games(stream), args.workers, args.batch_size)
+    for index, error in report.failures:
+        print(f"game {index}: {error}")
+    if report.failed > len(report.failures):
+        print(f"... and {report.failed - len(report.failures)} more failures")
+    print(report.summary())
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
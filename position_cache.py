@@ -0,0 +1,211 @@
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+from book import decode_move, encode_move
+
+# One row per (position key, kind). Kinds and their JSON values:
+#   moves White / moves Black     packed legal moves for that color (book.encode_move)
+#   search                        [depth, score, packed principal variation] from Engine.search
+#   multipv COUNT DEPTH           [[packed move, score], ...] from Engine.search_multipv
+# used is the last time the row was read or written, in nanoseconds, and drives LRU eviction.
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        key INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        used INTEGER NOT NULL,
+        PRIMARY KEY (key, kind)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)",
+]
+# Stamped into the file as PRAGMA user_version. Cached move lists are trusted as legal, so this
+# has to change whenever the stored values, the move encoding, the zobrist keys or the move
+# generator change; a file with any other version is emptied when it is opened.
+CACHE_FORMAT = 1
+
+
+def signed_key(key):
+    # Zobrist keys are unsigned 64-bit, sqlite integers are signed
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class PositionCache:
+    # Results keyed by position, kept in a sqlite file so they outlive the process. The file is
+    # in WAL mode, so any number of processes can read it while one of them writes. Writes and
+    # LRU touches are buffered and committed together every flush_every changes (and on close),
+    # and each commit trims the file back under max_entries by dropping the least recently used rows.
+
+    def __init__(self, path, max_entries=1_000_000, flush_every=256):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        # One connection per cache object; engine and analysis threads share it under the lock
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        self.format_reset = self.check_format()
+        self.pending = {}  # (key, kind) -> value not yet written
+        self.touched = set()  # (key, kind) read since the last flush
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def check_format(self):
+        # Set the schema up, emptying the file first if it was written in another format (version 0
+        # is a new file, or one from before versioning). Returns True if old entries were dropped.
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            reset = version != CACHE_FORMAT
+            if reset:
+                connection.execute("DROP TABLE IF EXISTS entries")
+                connection.execute(f"PRAGMA user_version = {CACHE_FORMAT}")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return reset and version != 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, key, kind):
+        # Decoded value stored for the position, or None
+        entry = (signed_key(key), kind)
+        with self.lock:
+            value = self.pending.get(entry)
+            if value is None:
+                row = self.connection.execute("SELECT value FROM entries WHERE key = ? AND kind = ?", entry).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                value = json.loads(row[0])
+                self.touched.add(entry)
+            self.hits += 1
+        if len(self.touched) >= self.flush_every:
+            self.flush()
+        return value
+
+    def put(self, key, kind, value):
+        with self.lock:
+            self.pending[(signed_key(key), kind)] = value
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending and not self.touched:
+                return
+            # Consecutive stamps keep the order of the batch, so eviction never splits ties
+            now = time.time_ns()
+            connection = self.connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany("UPDATE entries SET used = ? WHERE key = ? AND kind = ?",
+                                       [(now + index, key, kind)
+                                        for index, (key, kind) in enumerate(self.touched - self.pending.keys())])
+                now += len(self.touched)
+                connection.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                                       [(key, kind, json.dumps(value, separators=(",", ":")), now + index)
+                                        for index, ((key, kind), value) in enumerate(self.pending.items())])
+                self.trim()
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            self.pending = {}
+            self.touched = set()
+
+    def trim(self):
+        # Called inside the flush transaction. Trims to 90% of the bound so the next few flushes
+        # do not have to evict again.
+        count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries * 9 // 10
+        cutoff = self.connection.execute("SELECT used FROM entries ORDER BY used LIMIT 1 OFFSET ?",
+                                         (excess - 1,)).fetchone()[0]
+        self.evictions += self.connection.execute("DELETE FROM entries WHERE used <= ?", (cutoff,)).rowcount
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            self.touched = set()
+            self.connection.execute("DELETE FROM entries")
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] + len(self.pending)
+
+    @property
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "evictions": self.evictions}
+
+    # Typed wrappers for what the rules core and the engine store
+
+    def legal_moves(self, key, color):
+        codes = self.get(key, f"moves {color}")
+        return None if codes is None else [decode_move(code) for code in codes]
+
+    def store_legal_moves(self, key, color, moves):
+        self.put(key, f"moves {color}", [encode_move(move) for move in moves])
+
+    def search_result(self, key):
+        # (depth, score, principal variation) of the deepest search stored for the position, or None
+        value = self.get(key, "search")
+        if value is None:
+            return None
+        depth, score, pv = value
+        return depth, score, [decode_move(code) for code in pv]
+
+    def store_search_result(self, key, depth, score, pv):
+        self.put(key, "search", [depth, score, [encode_move(move) for move in pv]])
+
+    def multipv(self, key, count, depth):
+        value = self.get(key, f"multipv {count} {depth}")
+        return None if value is None else [(decode_move(code), score) for code, score in value]
+
+    def store_multipv(self, key, count, depth, candidates):
+        self.put(key, f"multipv {count} {depth}", [[encode_move(move), score] for move, score in candidates])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or empty a position cache file")
+    parser.add_argument("path")
+    parser.add_argument("--clear", action="store_true", help="delete every entry")
+    args = parser.parse_args()
+
+    with PositionCache(args.path) as cache:
+        if cache.format_reset:
+            print(f"emptied: the file was written in another cache format (now {CACHE_FORMAT})")
+        if args.clear:
+            cache.clear()
+        kinds = cache.connection.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind ORDER BY kind").fetchall()
+        print(f"{len(cache)} entries")
+        for kind, count in kinds:
+            print(f"  {kind}: {count}")
+
+
+if __name__ == "__main__":
+    main()
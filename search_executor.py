@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+
+
+class SearchExecutor:
+    # Runs Engine.search on a worker thread against a copy of the board. The worker never
+    # touches the caller's board or any Tk widget: progress and results go through a queue
+    # that the owner drains from its own thread with poll(). Searches on one executor never
+    # overlap, since they share the engine's per-search state and tables.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.events = queue.Queue()
+        self.thread = None
+        self.stop_event = None
+        self.search_id = 0
+        self.cancelled_id = None
+
+    def start(self, board, color, max_depth=64, time_limit=None, node_limit=None):
+        # Any search still running is cancelled and waited for; its late events are dropped by poll()
+        if self.is_searching():
+            self.cancel()
+            self.thread.join()
+        self.search_id += 1
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       args=(self.search_id, board.copy(), color, max_depth, time_limit,
+                                             node_limit, self.stop_event))
+        self.thread.start()
+        return self.search_id
+
+    def run(self, search_id, board, color, max_depth, time_limit, node_limit, stop_event):
+        def info(result):
+            self.events.put(("info", search_id, result))
+
+        # "done" is always posted so nobody waits on a search that died; it then carries the exception
+        result = None
+        try:
+            result = self.engine.search(board, color, max_depth, time_limit, info=info, stop_event=stop_event,
+                                        node_limit=node_limit)
+        except Exception as error:
+            result = error
+            raise
+        finally:
+            self.events.put(("done", search_id, result))
+
+    def move_now(self):
+        # Stop searching and deliver the best move found so far as the result
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def cancel(self):
+        # Stop searching and throw the result away
+        self.cancelled_id = self.search_id
+        if self.stop_event is not None:
+            self.stop_event.set()
+
+    def is_searching(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def poll(self):
+        # Drain pending ("info" | "done", SearchResult) events of the current search. A failed
+        # search ends with ("done", exception).
+        updates = []
+        while True:
+            try:
+                kind, search_id, result = self.events.get_nowait()
+            except queue.Empty:
+                return updates
+            if search_id == self.search_id and search_id != self.cancelled_id:
+                updates.append((kind, result))
+
+    def next_event(self, timeout=None):
+        # Block for the next ("info" | "done", SearchResult) event of the current search, for
+        # owners without an event loop to poll from; None if timeout seconds pass first
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                kind, search_id, result = self.events.get(
+                    timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if search_id == self.search_id and search_id != self.cancelled_id:
+                return kind, result
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
@@ -0,0 +1,228 @@
+import argparse
+import asyncio
+import json
+import secrets
+import time
+
+from chess_core import ChessSet, IllegalMoveError, move_name, parse_move
+from fen import load_fen, to_fen
+
+# Line protocol: every request is one JSON object on one line and gets exactly one JSON line back,
+# in order. Requests may carry an "id", which is echoed in the reply.
+#
+#   {"op": "new", "fen": "..."}                       start a game (fen optional) -> game state
+#   {"op": "move", "game": g, "move": "e2e4", "ply": n} play for the side to move; "ply", if given,
+#                                                       must match the game's ply count
+#   {"op": "state", "game": g}                        game state including the legal moves
+#   {"op": "wait", "game": g, "ply": n, "timeout": s}  block until the game is past ply n
+#   {"op": "undo", "game": g}                         take back the last move
+#   {"op": "close", "game": g}                        end the game and free it
+#   {"op": "stats"}                                   server counters
+#
+# Game state replies look like {"ok": true, "game": g, "fen": ..., "turn": "White", "status": "normal",
+# "ply": 0, "last_move": null}; add "legal": true to a new/move/undo request to also get the legal
+# moves of the side to move. Failures are {"ok": false, "error": "..."}.
+
+MAX_WAIT = 60.0
+
+
+class GameSession:
+    # One game held by the server. The condition's lock serializes every request on this game, so
+    # two clients playing the same game cannot interleave, and wakes clients waiting for a move.
+
+    def __init__(self, game_id, chess_set):
+        self.game_id = game_id
+        self.chess_set = chess_set
+        self.condition = asyncio.Condition()
+        self.last_active = time.monotonic()
+        self.closed = False
+
+    @property
+    def ply(self):
+        return len(self.chess_set.key_history) - 1
+
+    def describe(self, legal=False):
+        chess_set = self.chess_set
+        state = {
+            "ok": True,
+            "game": self.game_id,
+            "fen": to_fen(chess_set),
+            "turn": chess_set.current_player,
+            "status": chess_set.game_status(chess_set.current_player),
+            "ply": self.ply,
+            "last_move": move_name(*chess_set.move_history[-1]) if chess_set.move_history else None,
+        }
+        if legal:
+            state["legal"] = [move_name(*move) for move in chess_set.legal_moves(chess_set.current_player)]
+        return state
+
+
+class GameServer:
+    # Many independent games in one process. Games untouched for idle_timeout seconds are evicted.
+
+    def __init__(self, idle_timeout=600.0, max_games=100000):
+        self.idle_timeout = idle_timeout
+        self.max_games = max_games
+        self.sessions = {}
+        self.counters = {"connections": 0, "requests": 0, "games_created": 0, "moves": 0, "evicted": 0}
+        self.operations = {
+            "new": self.op_new,
+            "move": self.op_move,
+            "state": self.op_state,
+            "wait": self.op_wait,
+            "undo": self.op_undo,
+            "close": self.op_close,
+            "stats": self.op_stats,
+        }
+
+    async def start(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        self.evictor = asyncio.create_task(self.evict_idle_games())
+        return server
+
+    async def handle_client(self, reader, writer):
+        self.counters["connections"] += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle_line(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line):
+        self.counters["requests"] += 1
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            operation = self.operations.get(request.get("op"))
+            if operation is None:
+                raise ValueError(f"Unknown op: {request.get('op')!r}.")
+            response = await operation(request)
+        except (ValueError, KeyError, IndexError, TypeError) as error:
+            # IllegalMoveError is a ValueError; a bad FEN can raise any of these
+            response = {"ok": False, "error": str(error)}
+        if "id" in request:
+            response["id"] = request["id"]
+        return response
+
+    def session(self, request):
+        session = self.sessions.get(request.get("game"))
+        if session is None:
+            raise ValueError(f"Unknown game: {request.get('game')!r}.")
+        session.last_active = time.monotonic()
+        return session
+
+    async def op_new(self, request):
+        if len(self.sessions) >= self.max_games:
+            raise ValueError("The server is full.")
+        chess_set = load_fen(request["fen"]) if request.get("fen") else ChessSet()
+        game_id = secrets.token_hex(8)
+        session = self.sessions[game_id] = GameSession(game_id, chess_set)
+        self.counters["games_created"] += 1
+        return session.describe(request.get("legal", False))
+
+    async def op_move(self, request):
+        session = self.session(request)
+        async with session.condition:
+            if session.closed:
+                raise ValueError("The game is over.")
+            if "ply" in request and request["ply"] != session.ply:
+                raise ValueError(f"Stale move: the game is at ply {session.ply}, not {request['ply']}.")
+            chess_set = session.chess_set
+            if chess_set.is_game_over(chess_set.current_player):
+                raise IllegalMoveError(f"The game has ended: {chess_set.game_status(chess_set.current_player)}.")
+            chess_set.play_move(*parse_move(request["move"]))
+            self.counters["moves"] += 1
+            session.condition.notify_all()
+            return session.describe(request.get("legal", False))
+
+    async def op_state(self, request):
+        session = self.session(request)
+        async with session.condition:
+            return session.describe(legal=True)
+
+    async def op_wait(self, request):
+        # Long poll for the opponent's move; replies with "timeout": true if nothing happened
+        session = self.session(request)
+        ply = request["ply"]
+        timeout = min(float(request.get("timeout", MAX_WAIT)), MAX_WAIT)
+        async with session.condition:
+            try:
+                await asyncio.wait_for(session.condition.wait_for(lambda: session.ply != ply or session.closed),
+                                       timeout)
+                timed_out = False
+            except asyncio.TimeoutError:
+                timed_out = True
+            session.last_active = time.monotonic()
+            if session.closed:
+                raise ValueError("The game was closed.")
+            state = session.describe(request.get("legal", False))
+        state["timeout"] = timed_out
+        return state
+
+    async def op_undo(self, request):
+        session = self.session(request)
+        async with session.condition:
+            if not session.chess_set.undo_move():
+                raise ValueError("There is no move to take back.")
+            session.condition.notify_all()
+            return session.describe(request.get("legal", False))
+
+    async def op_close(self, request):
+        session = self.session(request)
+        await self.close_session(session)
+        return {"ok": True, "game": session.game_id}
+
+    async def op_stats(self, request):
+        return {"ok": True, "games": len(self.sessions), **self.counters}
+
+    async def close_session(self, session):
+        self.sessions.pop(session.game_id, None)
+        async with session.condition:
+            session.closed = True
+            session.condition.notify_all()
+
+    async def evict_idle_games(self):
+        # Games in the middle of a request hold their lock and are left for the next sweep
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in list(self.sessions.values()):
+                if session.last_active < cutoff and not session.condition.locked():
+                    await self.close_session(session)
+                    self.counters["evicted"] += 1
+
+
+async def serve(host, port, idle_timeout, max_games):
+    game_server = GameServer(idle_timeout, max_games)
+    server = await game_server.start(host, port)
+    addresses = ", ".join(f"{address[0]}:{address[1]}" for address in
+                          (sock.getsockname() for sock in server.sockets))
+    print(f"serving on {addresses}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve many concurrent games over a line-based JSON protocol")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 picks a free port")
+    parser.add_argument("--idle-timeout", type=float, default=600.0, help="seconds before an untouched game is dropped")
+    parser.add_argument("--max-games", type=int, default=100000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.idle_timeout, args.max_games))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+import argparse
+import glob
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from chess_core import BISHOP_RAYS, KING_ATTACKS, KNIGHT_ATTACKS, ROOK_RAYS, move_name
+
+# Pawnless endings only. A table holds one byte per (side to move, square of every piece), scored
+# for the side to move: 0 draw, 1..127 win with mate in that many plies, 128 + n loss with mate
+# in n plies (128 is checkmated), 255 for positions that cannot occur.
+TABLE_MAGIC = b"CHESSTB1"
+HEADER_FORMAT = struct.Struct("<8s8sB7x")
+DRAW = 0
+LOSS = 128
+ILLEGAL = 255
+CAPTURE_DRAWS = 255  # in the capture summary: some capture leads to a drawn ending
+
+PIECE_LETTERS = {"K": "king", "Q": "queen", "R": "rook", "B": "bishop", "N": "knight"}
+LETTER_ORDER = "KQRBN"
+COLORS = ["White", "Black"]
+
+JUMPS = {
+    "king": [[row * 8 + col for row, col in squares] for squares in KING_ATTACKS],
+    "knight": [[row * 8 + col for row, col in squares] for squares in KNIGHT_ATTACKS],
+}
+JUMP_SETS = {piece_type: [set(squares) for squares in table] for piece_type, table in JUMPS.items()}
+
+
+def square_rays(table):
+    return [[[row * 8 + col for row, col in ray] for ray in rays] for rays in table]
+
+
+RAYS = {
+    "rook": square_rays(ROOK_RAYS),
+    "bishop": square_rays(BISHOP_RAYS),
+}
+RAYS["queen"] = [rook + bishop for rook, bishop in zip(RAYS["rook"], RAYS["bishop"])]
+
+
+def build_between(rays):
+    # For every square, {target on one of its rays: squares strictly between the two}
+    table = []
+    for square_rays_from in rays:
+        between = {}
+        for ray in square_rays_from:
+            for distance, target in enumerate(ray):
+                between[target] = ray[:distance]
+        table.append(between)
+    return table
+
+
+BETWEEN = {
+    "rook": build_between(RAYS["rook"]),
+    "bishop": build_between(RAYS["bishop"]),
+}
+SLIDES = {"rook": ["rook"], "bishop": ["bishop"], "queen": ["rook", "bishop"]}
+
+
+def parse_signature(signature):
+    # "KQvKR" -> [(0, "king"), (0, "queen"), (1, "king"), (1, "rook")], colors 0 White and 1 Black
+    white, black = signature.upper().split("V")
+    pieces = []
+    for color, side in enumerate((white, black)):
+        if not side.startswith("K") or "K" in side[1:] or any(letter not in PIECE_LETTERS for letter in side):
+            raise ValueError(f"Not a pawnless ending: {signature}")
+        pieces.extend((color, PIECE_LETTERS[letter]) for letter in sorted(side, key=LETTER_ORDER.index))
+    return pieces
+
+
+def side_strength(side):
+    # More pieces first, then stronger pieces, so KQ outranks KR and KRR outranks KQ
+    return len(side), [len(LETTER_ORDER) - LETTER_ORDER.index(letter) for letter in side]
+
+
+def canonical_signature(white, black):
+    # Table name for the material strings (e.g. "KR", "KQ") and whether colors must be swapped;
+    # the stronger side is always White in a table
+    white = "".join(sorted(white, key=LETTER_ORDER.index))
+    black = "".join(sorted(black, key=LETTER_ORDER.index))
+    if side_strength(white) >= side_strength(black):
+        return f"{white}v{black}", False
+    return f"{black}v{white}", True
+
+
+def table_path(directory, signature):
+    return os.path.join(directory, f"{signature}.tb")
+
+
+def is_attacked(target, attackers, occupied):
+    # attackers is a list of (piece_type, square)
+    for piece_type, square in attackers:
+        if piece_type in JUMP_SETS:
+            if target in JUMP_SETS[piece_type][square]:
+                return True
+            continue
+        for kind in SLIDES[piece_type]:
+            between = BETWEEN[kind][square].get(target)
+            if between is not None and not any(blocker in occupied for blocker in between):
+                return True
+    return False
+
+
+def legal_moves(pieces, squares, stm):
+    # (piece index, target square, captured piece index or None) for every legal move of stm
+    owners = dict((square, index) for index, square in enumerate(squares))
+    occupied = set(squares)
+    king = next(index for index, (color, piece_type) in enumerate(pieces) if color == stm and piece_type == "king")
+    enemies = [index for index, (color, _) in enumerate(pieces) if color != stm]
+    attackers = [(pieces[index][1], squares[index]) for index in enemies]
+    in_check = is_attacked(squares[king], attackers, occupied)
+    # Out of check, only king moves and moves of a piece pinned to the king can expose it
+    pinned = set()
+    for piece_type, square in attackers:
+        for kind in SLIDES.get(piece_type, ()):
+            between = BETWEEN[kind][square].get(squares[king])
+            if between:
+                blockers = [owners[blocker] for blocker in between if blocker in occupied]
+                if len(blockers) == 1 and pieces[blockers[0]][0] == stm:
+                    pinned.add(blockers[0])
+    moves = []
+    for index, (color, piece_type) in enumerate(pieces):
+        if color != stm:
+            continue
+        start = squares[index]
+        targets = []
+        if piece_type in JUMPS:
+            for target in JUMPS[piece_type][start]:
+                other = owners.get(target)
+                if other is None:
+                    targets.append((target, None))
+                elif pieces[other][0] != stm and pieces[other][1] != "king":
+                    targets.append((target, other))
+        else:
+            for ray in RAYS[piece_type][start]:
+                for target in ray:
+                    other = owners.get(target)
+                    if other is None:
+                        targets.append((target, None))
+                        continue
+                    if pieces[other][0] != stm and pieces[other][1] != "king":
+                        targets.append((target, other))
+                    break
+        if not in_check and index != king and index not in pinned:
+            moves.extend((index, target, captured) for target, captured in targets)
+            continue
+        # Make the move on the occupancy set in place, test the king, then put it back
+        occupied.discard(start)
+        for target, captured in targets:
+            king_square = target if index == king else squares[king]
+            if captured is None:
+                occupied.add(target)
+                if not is_attacked(king_square, attackers, occupied):
+                    moves.append((index, target, None))
+                occupied.discard(target)
+            else:
+                remaining = [(pieces[other][1], squares[other]) for other in enemies if other != captured]
+                if not is_attacked(king_square, remaining, occupied):
+                    moves.append((index, target, captured))
+        occupied.add(start)
+    return moves
+
+
+class TableFile:
+    # One memory-mapped table; probing is a single index computation and a byte read
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, signature, count = HEADER_FORMAT.unpack_from(self.data, 0)
+        if magic != TABLE_MAGIC or len(self.data) != HEADER_FORMAT.size + 2 * 64 ** count:
+            raise ValueError(f"{path} is not a tablebase file")
+        self.signature = signature.rstrip(b"\0").decode()
+        self.pieces = parse_signature(self.signature)
+
+    def value(self, index):
+        return self.data[HEADER_FORMAT.size + index]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+class Tablebase:
+    # Every *.tb table in a directory, opened on first use
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.tables = {}
+        self.available = {os.path.basename(path)[:-3] for path in glob.glob(os.path.join(directory, "*.tb"))}
+
+    def table(self, signature):
+        if signature not in self.tables:
+            self.tables[signature] = TableFile(table_path(self.directory, signature)) \
+                if signature in self.available else None
+        return self.tables[signature]
+
+    def probe_placement(self, placement, stm):
+        # placement is a list of (color, piece_type, square) with colors 0/1; returns the table
+        # byte for stm, or None when there is no table for the material
+        sides = ["", ""]
+        for color, piece_type, _ in placement:
+            sides[color] += "N" if piece_type == "knight" else piece_type[0].upper()
+        if len(placement) == 2:
+            return DRAW
+        signature, swapped = canonical_signature(*sides)
+        table = self.table(signature)
+        if table is None:
+            return None
+        if swapped:
+            placement = [(1 - color, piece_type, square) for color, piece_type, square in placement]
+            stm = 1 - stm
+        remaining = list(placement)
+        index = stm
+        for color, piece_type in table.pieces:
+            for entry in remaining:
+                if entry[0] == color and entry[1] == piece_type:
+                    remaining.remove(entry)
+                    index = index * 64 + entry[2]
+                    break
+        return table.value(index)
+
+    def probe(self, board, color):
+        # (result, plies to mate) for color to move: result 1 win, 0 draw, -1 loss; None when the
+        # position has pawns, castling rights or material without a table
+        placement = []
+        for row in range(8):
+            for col in range(8):
+                piece = board.board[row][col]
+                if piece is None:
+                    continue
+                if piece.piece_type == "pawn":
+                    return None
+                placement.append((COLORS.index(piece.color), piece.piece_type, row * 8 + col))
+        if board.castling_rights():
+            return None
+        return decode_value(self.probe_placement(placement, COLORS.index(color)))
+
+    def best_move(self, board, color):
+        # The legal move that wins fastest, else draws, else loses slowest, with its (result, plies)
+        # from color's side; None when the position is not covered
+        if self.probe(board, color) is None:
+            return None
+        opponent = "Black" if color == "White" else "White"
+        best = None
+        for move in board.legal_moves(color):
+            board.make_move(*move)
+            reply = self.probe(board, opponent)
+            board.unmake_move()
+            if reply is None:
+                continue
+            result, plies = -reply[0], reply[1] + 1
+            # Order: faster wins, then draws, then slower losses
+            rank = (result, -plies if result > 0 else plies)
+            if best is None or rank > best[0]:
+                best = (rank, move, (result, plies))
+        return (best[1], best[2]) if best else None
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table.close()
+        self.tables = {}
+
+
+def decode_value(value):
+    if value is None or value == ILLEGAL:
+        return None
+    if value == DRAW:
+        return 0, 0
+    if value < LOSS:
+        return 1, value
+    return -1, value - LOSS
+
+
+def scan_chunk(signature, directory, stm, first_square):
+    # First pass over the positions with the given side to move and first piece square.
+    # Returns (values, quiet move counts, capture summaries), one byte per position.
+    pieces = parse_signature(signature)
+    tablebase = Tablebase(directory)
+    size = 64 ** (len(pieces) - 1)
+    values = bytearray(size)
+    counts = bytearray(size)
+    captures = bytearray(size)
+    opponent = 1 - stm
+    opponent_king = next(index for index, (color, piece_type) in enumerate(pieces)
+                         if color == opponent and piece_type == "king")
+    stm_pieces = [index for index, (color, _) in enumerate(pieces) if color == stm]
+    opponent_pieces = [index for index, (color, _) in enumerate(pieces) if color == opponent]
+    own_king = next(index for index in stm_pieces if pieces[index][1] == "king")
+
+    for offset, rest in enumerate(product(range(64), repeat=len(pieces) - 1)):
+        squares = (first_square,) + rest
+        occupied = set(squares)
+        if len(occupied) < len(squares) or is_attacked(
+                squares[opponent_king], [(pieces[index][1], squares[index]) for index in stm_pieces], occupied):
+            values[offset] = ILLEGAL
+            continue
+        moves = legal_moves(pieces, squares, stm)
+        if not moves:
+            in_check = is_attacked(squares[own_king],
+                                   [(pieces[index][1], squares[index]) for index in opponent_pieces], occupied)
+            values[offset] = LOSS if in_check else DRAW
+            captures[offset] = CAPTURE_DRAWS
+            continue
+        quiet = 0
+        fastest_win = None
+        slowest_loss = 0
+        for index, target, captured in moves:
+            if captured is None:
+                quiet += 1
+                continue
+            placement = [(color, piece_type, target if other == index else squares[other])
+                         for other, (color, piece_type) in enumerate(pieces) if other != captured]
+            reply = tablebase.probe_placement(placement, opponent)
+            if reply is None:
+                raise FileNotFoundError(f"{signature} needs the table for the material after a capture")
+            if reply == DRAW:
+                slowest_loss = CAPTURE_DRAWS
+            elif reply >= LOSS:
+                if fastest_win is None or reply - LOSS + 1 < fastest_win:
+                    fastest_win = reply - LOSS + 1
+            elif slowest_loss != CAPTURE_DRAWS:
+                slowest_loss = max(slowest_loss, reply)
+        counts[offset] = quiet
+        captures[offset] = slowest_loss
+        if fastest_win is not None:
+            values[offset] = fastest_win
+    tablebase.close()
+    return bytes(values), bytes(counts), bytes(captures)
+
+
+def retrograde(pieces, values, counts, captures):
+    # Propagate mates backwards one ply at a time. A position whose move leads to a lost position
+    # wins one ply later; a position whose every move leads to a won position loses one ply after
+    # the slowest of them. Buckets hold positions by plies to mate.
+    count = len(pieces)
+    side_size = 64 ** count
+    weights = [64 ** (count - 1 - index) for index in range(count)]
+    buckets = {}
+
+    def push(plies, index):
+        if plies >= LOSS - 1:
+            raise OverflowError("Mate distance does not fit in a table byte")
+        buckets.setdefault(plies, array("I")).append(index)
+
+    for index, value in enumerate(values):
+        if value == LOSS:
+            push(0, index)
+        elif DRAW < value < LOSS:
+            push(value, index)
+        elif value == DRAW and counts[index] == 0 and captures[index] != CAPTURE_DRAWS and captures[index]:
+            # Every move captures into a lost ending for us
+            values[index] = LOSS + captures[index] + 1
+            push(captures[index] + 1, index)
+
+    plies = 0
+    while buckets:
+        bucket = buckets.pop(plies, None)
+        plies += 1
+        if bucket is None:
+            continue
+        depth = plies - 1
+        expected = LOSS + depth if depth % 2 == 0 else depth
+        for index in bucket:
+            if values[index] != expected:
+                continue
+            stm, rest = divmod(index, side_size)
+            mover = 1 - stm
+            squares = []
+            for weight in weights:
+                square, rest = divmod(rest, weight)
+                squares.append(square)
+            occupied = set(squares)
+            base = index + (mover - stm) * side_size
+            for piece_index, (color, piece_type) in enumerate(pieces):
+                if color != mover:
+                    continue
+                start = squares[piece_index]
+                weight = weights[piece_index]
+                if piece_type in JUMPS:
+                    origins = [square for square in JUMPS[piece_type][start] if square not in occupied]
+                else:
+                    origins = []
+                    for ray in RAYS[piece_type][start]:
+                        for square in ray:
+                            if square in occupied:
+                                break
+                            origins.append(square)
+                for origin in origins:
+                    previous = base + (origin - start) * weight
+                    previous_value = values[previous]
+                    if previous_value == ILLEGAL:
+                        continue
+                    if depth % 2 == 0:
+                        # We were lost here, so the previous position wins by moving into it
+                        if previous_value == DRAW or DRAW < previous_value < LOSS and previous_value > depth + 1:
+                            values[previous] = depth + 1
+                            push(depth + 1, previous)
+                    elif previous_value == DRAW and counts[previous]:
+                        counts[previous] -= 1
+                        if counts[previous] == 0 and captures[previous] != CAPTURE_DRAWS:
+                            loss_plies = max(depth, captures[previous]) + 1
+                            values[previous] = LOSS + loss_plies
+                            push(loss_plies, previous)
+    return values
+
+
+def generate(signature, directory, workers=None):
+    # Build one table into directory; returns (path, seconds, bytes). The tables for every
+    # ending reachable by a capture must already be there.
+    pieces = parse_signature(signature)
+    signature = "{}v{}".format(*signature.upper().split("V"))
+    start = time.perf_counter()
+    chunks = [(stm, square) for stm in (0, 1) for square in range(64)]
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as pool:
+        results = list(pool.map(scan_chunk, [signature] * len(chunks), [directory] * len(chunks),
+                                *zip(*chunks)))
+    values = bytearray().join(result[0] for result in results)
+    counts = bytearray().join(result[1] for result in results)
+    captures = bytearray().join(result[2] for result in results)
+    del results
+    retrograde(pieces, values, counts, captures)
+
+    path = table_path(directory, signature)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER_FORMAT.pack(TABLE_MAGIC, signature.encode(), len(pieces)))
+        f.write(values)
+    os.replace(temporary_path, path)
+    return path, time.perf_counter() - start, os.path.getsize(path)
+
+
+def dependencies(signature):
+    # Tables reached by capturing one non-king piece
+    white, black = signature.upper().split("V")
+    needed = set()
+    for side, other, color in ((white, black, 0), (black, white, 1)):
+        for position in range(1, len(side)):
+            remaining = side[:position] + side[position + 1:]
+            if len(remaining) + len(other) > 2:
+                needed.add(canonical_signature(*((remaining, other) if color == 0 else (other, remaining)))[0])
+    return needed
+
+
+THREE_PIECE = ["KQvK", "KRvK", "KBvK", "KNvK"]
+FOUR_PIECE = ["KQQvK", "KQRvK", "KQBvK", "KQNvK", "KRRvK", "KRBvK", "KRNvK", "KBBvK", "KBNvK", "KNNvK",
+              "KQvKQ", "KQvKR", "KQvKB", "KQvKN", "KRvKR", "KRvKB", "KRvKN", "KBvKB", "KBvKN", "KNvKN"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or probe pawnless endgame tablebases")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="generate tables, smallest endings first")
+    build.add_argument("endings", nargs="*", help="endings such as KQvK (default: every 3-piece ending)")
+    build.add_argument("--four", action="store_true", help="also generate every 4-piece ending")
+    build.add_argument("--dir", default="tables")
+    build.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    probe = commands.add_parser("probe", help="show the result and best move of a position")
+    probe.add_argument("fen")
+    probe.add_argument("--dir", default="tables")
+    args = parser.parse_args()
+
+    if args.command == "probe":
+        from fen import load_fen
+        chess_set = load_fen(args.fen)
+        tablebase = Tablebase(args.dir)
+        start = time.perf_counter()
+        result = tablebase.probe(chess_set.board, chess_set.current_player)
+        elapsed = time.perf_counter() - start
+        if result is None:
+            print("not in the tablebase")
+            return
+        best = tablebase.best_move(chess_set.board, chess_set.current_player)
+        names = {1: "win", 0: "draw", -1: "loss"}
+        print(f"{names[result[0]]}, mate in {result[1]} plies" if result[0] else "draw")
+        if best:
+            print(f"best move {move_name(*best[0])}")
+        print(f"probed in {elapsed * 1e6:.0f}us")
+        return
+
+    os.makedirs(args.dir, exist_ok=True)
+    endings = args.endings or THREE_PIECE + (FOUR_PIECE if args.four else [])
+    pending = [ending.upper().replace("V", "v") for ending in endings]
+    # Generate dependencies first so captures can be looked up
+    ordered = []
+    while pending:
+        signature = pending.pop(0)
+        if signature in ordered:
+            continue
+        missing = [needed for needed in dependencies(signature)
+                   if needed not in ordered and not os.path.exists(table_path(args.dir, needed))]
+        if missing:
+            pending = missing + [signature] + pending
+            continue
+        ordered.append(signature)
+
+    total_seconds = total_bytes = 0
+    for signature in ordered:
+        path, seconds, size = generate(signature, args.dir, args.workers)
+        with open(path, "rb") as f:
+            histogram = Counter(f.read()[HEADER_FORMAT.size:])
+        wins = sum(count for value, count in histogram.items() if DRAW < value < LOSS)
+        losses = sum(count for value, count in histogram.items() if LOSS <= value < ILLEGAL)
+        draws = histogram[DRAW]
+        longest = max((abs(decode_value(value)[1]) for value in histogram if value != ILLEGAL), default=0)
+        print(f"{signature:<7} {seconds:>8.2f}s {size:>10} bytes  {wins} wins, {draws} draws, {losses} losses, "
+              f"longest mate {longest} plies")
+        total_seconds += seconds
+        total_bytes += size
+    print(f"{len(ordered)} tables, {total_bytes} bytes in {total_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
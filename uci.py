@@ -0,0 +1,215 @@
+import argparse
+import sys
+import threading
+
+from chess_core import ChessSet, IllegalMoveError, move_name, parse_move
+from engine import MATE_SCORE, MATE_THRESHOLD, Engine
+from fen import START_FEN, load_fen
+from match import move_budget
+from search_executor import SearchExecutor
+
+# go arguments that take a number; movestogo is read but not used, mate N only limits the depth
+# to 2N plies, and searchmoves and ponder are not supported
+GO_NUMBERS = {"depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo", "nodes", "mate"}
+
+
+def score_text(score):
+    # UCI score: "cp N", or "mate N" in moves, negative when the engine is the one being mated
+    if abs(score) >= MATE_THRESHOLD:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+def info_line(result):
+    pv = " ".join(move_name(*move) for move in result.pv)
+    return (f"info depth {result.depth} score {score_text(result.score)} nodes {result.nodes} "
+            f"time {int(result.elapsed * 1000)} nps {result.nodes_per_second}" + (f" pv {pv}" if pv else ""))
+
+
+class UciSession:
+    # The UCI protocol over one ChessSet. Commands are handled on the caller's thread, searches run
+    # on the SearchExecutor's worker, and a reporter thread writes their info lines and bestmove,
+    # so stop and isready are answered while a search is running.
+
+    def __init__(self, engine, output=sys.stdout):
+        self.engine = engine
+        self.executor = SearchExecutor(engine)
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.base = START_FEN
+        self.moves = []  # names of the moves played on top of base, as last sent by the GUI
+        self.chess_set = ChessSet()  # None after a position command that could not be set up
+        self.reporter = None  # thread reporting the current search
+        self.stop_requested = threading.Event()
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        # Act on one command line; returns False once the GUI says quit
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name ChessGUI")
+            self.send("id author ChessGUI authors")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            self.engine.tt.clear()
+        elif command == "position":
+            self.stop()
+            self.position(arguments)
+        elif command == "go":
+            self.stop()
+            self.go(arguments)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        elif command not in ("debug", "setoption", "register", "ponderhit"):
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def position(self, arguments):
+        # position startpos [moves ...] | position fen FIELDS [moves ...]
+        if "moves" in arguments:
+            split = arguments.index("moves")
+            arguments, moves = arguments[:split], arguments[split + 1:]
+        else:
+            moves = []
+        if arguments == ["startpos"]:
+            fen = START_FEN
+        elif arguments[:1] == ["fen"]:
+            fen = " ".join(arguments[1:])
+        else:
+            self.send("info string position needs startpos or fen")
+            return
+        try:
+            self.set_position(fen, moves)
+        except (ValueError, IndexError, KeyError) as error:
+            # Searching the previous position instead would answer for the wrong board
+            self.send(f"info string bad position: {error}")
+            self.base = None
+            self.moves = []
+            self.chess_set = None
+
+    def set_position(self, fen, moves):
+        # GUIs resend the whole game before every search. Moves already on the board that the
+        # new list starts with are kept, any others taken back, and only the new ones played.
+        if fen != self.base:
+            self.chess_set = load_fen(fen)  # raises ValueError for a malformed FEN
+            self.base = fen
+            self.moves = []
+        common = 0
+        while common < min(len(self.moves), len(moves)) and self.moves[common] == moves[common]:
+            common += 1
+        for _ in range(len(self.moves) - common):
+            self.chess_set.undo_move()
+        del self.moves[common:]
+        for name in moves[common:]:
+            try:
+                self.chess_set.play_move(*parse_move(name))
+            except IllegalMoveError as error:
+                # The position stays at the last legal move, and self.moves says so
+                self.send(f"info string illegal move {name}: {error}")
+                return
+            self.moves.append(name)
+
+    def go(self, arguments):
+        if self.chess_set is None:
+            self.send("info string no valid position to search")
+            self.send("bestmove 0000")
+            return
+        options = {}
+        for index, token in enumerate(arguments):
+            if token not in GO_NUMBERS:
+                continue
+            value = arguments[index + 1] if index + 1 < len(arguments) else ""
+            try:
+                options[token] = max(0, int(value))
+            except ValueError:
+                self.send(f"info string ignoring go {token} with bad value {value!r}")
+        color = self.chess_set.current_player
+        clock, increment = ("wtime", "winc") if color == "White" else ("btime", "binc")
+        max_depth = options.get("depth", 64)
+        if "mate" in options:
+            max_depth = min(max_depth, max(1, 2 * options["mate"]))
+        node_limit = options.get("nodes") or None
+        time_limit = None
+        if "movetime" in options:
+            time_limit = options["movetime"] / 1000
+        elif clock in options:
+            time_limit = move_budget(options[clock] / 1000, options.get(increment, 0) / 1000)
+        # With nothing to stop it, a search runs until stop, like go infinite
+        infinite = "infinite" in arguments or not ({"depth", "mate", "nodes"} & options.keys() or time_limit)
+
+        self.stop_requested.clear()
+        self.executor.start(self.chess_set.board, color, max_depth, time_limit, node_limit)
+        self.reporter = threading.Thread(target=self.report, args=(infinite,), daemon=True)
+        self.reporter.start()
+
+    def report(self, infinite):
+        while True:
+            kind, result = self.executor.next_event()
+            if kind == "info":
+                self.send(info_line(result))
+                continue
+            # An infinite search that runs out of depth still keeps its move until stop
+            if infinite:
+                self.stop_requested.wait()
+            if isinstance(result, Exception):
+                self.send(f"info string search failed: {result!r}")
+                result = None
+            self.send(f"bestmove {move_name(*result.best_move) if result and result.best_move else '0000'}")
+            return
+
+    def stop(self):
+        # Finish the current search now; returns once its bestmove has been sent
+        if self.reporter is None:
+            return
+        self.stop_requested.set()
+        self.executor.move_now()
+        self.reporter.join()
+        self.reporter = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the engine as a UCI process on stdin and stdout")
+    parser.add_argument("--tt-size", type=int, default=1 << 18, help="transposition table slots")
+    parser.add_argument("--book", help="opening book file to consult before searching")
+    parser.add_argument("--tablebase", help="directory of endgame tables built with tablebase.py")
+    parser.add_argument("--cache", help="position cache file to reuse earlier searches from")
+    args = parser.parse_args()
+
+    book = None
+    if args.book:
+        from book import OpeningBook
+        book = OpeningBook(args.book)
+    tablebase = None
+    if args.tablebase:
+        from tablebase import Tablebase
+        tablebase = Tablebase(args.tablebase)
+    cache = None
+    if args.cache:
+        from position_cache import PositionCache
+        cache = PositionCache(args.cache)
+
+    session = UciSession(Engine(args.tt_size, book, tablebase, cache))
+    for line in sys.stdin:
+        if not session.handle(line):
+            break
+    session.stop()
+    if cache:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()